@@ -36,6 +36,7 @@ TMP_DIR_ARG = typer.Option(help="Path to directory where intermediate files will
 OWNER_ARG = typer.Option(help="Name of the GitHub project owner, e.g. HHS")
 PROJECT_ARG = typer.Option(help="Number of the GitHub project, e.g. 13")
 EFFECTIVE_DATE_ARG = typer.Option(help="YYYY-MM-DD effective date to apply to each imported row")
+INCREMENTAL_ARG = typer.Option("--incremental/--full", help="Only export recently updated items")
 # fmt: on
 
 # instantiate the main CLI entrypoint
@@ -156,6 +157,7 @@ def transform_and_load(
 def extract_transform_and_load(
     config_file: Annotated[str, CONFIG_FILE_ARG],
     effective_date: Annotated[str, EFFECTIVE_DATE_ARG],
+    incremental: Annotated[bool, INCREMENTAL_ARG] = False,  # noqa: FBT002
 ) -> None:
     """Export data from GitHub, transform it, and load into analytics warehouse."""
     # get configuration
@@ -175,7 +177,9 @@ def extract_transform_and_load(
 
     # extract data from GitHub
     logger.info("extracting data from GitHub")
-    extracted_json = GitHubProjectETL(config).extract_and_transform_in_memory()
+    extracted_json = GitHubProjectETL(config).extract_and_transform_in_memory(
+        incremental=incremental,
+    )
     # hydrate a dataset instance from the input data
     logger.info("transforming data")
     dataset = EtlDataset.load_from_json_object(json_data=extracted_json)
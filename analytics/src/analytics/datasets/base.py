@@ -1,15 +1,20 @@
 # ruff: noqa: E501
 # pylint: disable=C0301
 """Base class for all datasets which provides an interface for metrics."""
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Self
+from typing import Literal, Self
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import Engine
+from psycopg import sql
+from sqlalchemy import Connection, Engine, inspect
 
 from analytics.datasets.utils import dump_to_json, load_json_file
 
+# How many rows of a DataFrame to serialize at once when streaming it with COPY
+COPY_CHUNK_ROWS = 10_000
+
 
 class BaseDataset:
     """Base class for all datasets."""
@@ -40,6 +45,8 @@ class BaseDataset:
         engine: Engine,
         *,
         replace_table: bool = True,
+        method: Literal["insert", "copy", "copy_binary"] = "copy",
+        upsert_keys: list[str] | None = None,
     ) -> None:
         """
         Write the contents of a pandas DataFrame to a SQL table.
@@ -47,7 +54,8 @@ class BaseDataset:
         This function takes a pandas DataFrame (`self.df`), an output table name (`output_table`),
         and a SQLAlchemy Engine object (`engine`) as required arguments. It optionally accepts
         a `replace_table` argument (default: True) that determines how existing data in the
-        target table is handled.
+        target table is handled, a `method` argument that determines how the rows are written,
+        and `upsert_keys` to update existing rows instead of appending duplicates.
 
         **Parameters:**
 
@@ -62,6 +70,17 @@ class BaseDataset:
             existing table with the data from the DataFrame. (if_exists="replace")
             * If False, the data from the DataFrame will be appended to the existing table.
             (if_exists="append")
+        * method (str, default="copy"):
+            * "copy" (default) streams the DataFrame into the table as CSV with COPY.
+            * "copy_binary" streams the rows with binary COPY, converting each value
+            to the type of its column, which avoids parsing text on the server.
+            * "insert" uses pandas.to_sql, which writes the rows with batched INSERTs.
+            Whichever method is used, the table is created with the same column types
+            pandas.to_sql would give it.
+        * upsert_keys (list[str], optional): The columns of a unique constraint on the
+            existing table. The rows are written to a staging table, then inserted into
+            the output table, updating any existing rows with the same keys. Requires
+            replace_table=False.
 
         **Returns:**
 
@@ -69,19 +88,122 @@ class BaseDataset:
 
         **Raises:**
 
-        * Potential exceptions raised by the underlying pandas.to_sql function, such as
-            database connection errors or errors related to data type mismatches.
+        * ValueError if upsert_keys are given and replace_table is True.
+        * Potential exceptions raised by the underlying pandas.to_sql function or COPY
+            statement, such as database connection errors or errors related to data type
+            mismatches.
         """
-        if replace_table:
-            self.df.to_sql(output_table, engine, if_exists="replace", index=False)
+        if upsert_keys and replace_table:
+            message = "upsert_keys can only be used to write to an existing table"
+            raise ValueError(message)
+
+        if method == "insert" and not upsert_keys:
+            if_exists = "replace" if replace_table else "append"
+            self.df.to_sql(output_table, engine, if_exists=if_exists, index=False)
+            return
+
+        with engine.begin() as conn:
+            if upsert_keys:
+                self._upsert_rows(conn, output_table, method, upsert_keys)
+                return
+
+            # Create the table as pandas.to_sql would, then stream the rows into it
+            if replace_table:
+                conn.exec_driver_sql(
+                    sql.SQL("drop table if exists {}")
+                    .format(sql.Identifier(output_table))
+                    .as_string(),
+                )
+            if replace_table or not inspect(conn).has_table(output_table):
+                schema = pd.io.sql.get_schema(self.df, output_table, con=conn)
+                conn.exec_driver_sql(schema)
+            self._copy_rows(conn, output_table, method)
+
+    def _upsert_rows(
+        self,
+        conn: Connection,
+        output_table: str,
+        method: str,
+        upsert_keys: list[str],
+    ) -> None:
+        """Write rows to a staging table, then upsert them into the output table."""
+        table = sql.Identifier(output_table)
+        staging_table = sql.Identifier(f"{output_table}_staging")
+        conn.exec_driver_sql(
+            sql.SQL("create temp table {} (like {} including defaults) on commit drop")
+            .format(staging_table, table)
+            .as_string(),
+        )
+        if method == "insert":
+            self.df.to_sql(
+                f"{output_table}_staging",
+                conn,
+                if_exists="append",
+                index=False,
+            )
         else:
-            self.df.to_sql(output_table, engine, if_exists="append", index=False)
+            self._copy_rows(conn, f"{output_table}_staging", method)
+
+        columns = [sql.Identifier(col) for col in self.df.columns]
+        updates = [
+            sql.SQL("{col} = excluded.{col}").format(col=sql.Identifier(col))
+            for col in self.df.columns
+            if col not in upsert_keys
+        ]
+        on_conflict = (
+            sql.SQL("do update set {}").format(sql.SQL(", ").join(updates))
+            if updates
+            else sql.SQL("do nothing")
+        )
+        statement = sql.SQL(
+            "insert into {table} ({columns}) select {columns} from {staging} "
+            "on conflict ({keys}) {on_conflict}",
+        ).format(
+            table=table,
+            columns=sql.SQL(", ").join(columns),
+            staging=staging_table,
+            keys=sql.SQL(", ").join(sql.Identifier(key) for key in upsert_keys),
+            on_conflict=on_conflict,
+        )
+        conn.exec_driver_sql(statement.as_string())
+
+    def _copy_rows(self, conn: Connection, table_name: str, method: str) -> None:
+        """Stream the rows of the DataFrame into an existing table with COPY."""
+        table = sql.Identifier(table_name)
+        columns = sql.SQL(", ").join(sql.Identifier(col) for col in self.df.columns)
+        cursor = conn.connection.dbapi_connection.cursor()  # type: ignore[union-attr]
+
+        if method == "copy_binary":
+            # Binary COPY needs every value dumped as the exact type of its column
+            result = cursor.execute(
+                "select attname, atttypid::regtype::text from pg_attribute "
+                "where attrelid = to_regclass(%s) and attnum > 0 and not attisdropped",
+                (table.as_string(cursor),),
+            )
+            column_types = dict(result.fetchall())
+            values = self.df.astype(object).where(self.df.notna(), None)
+
+            statement = sql.SQL("copy {} ({}) from stdin (format binary)")
+            with cursor.copy(statement.format(table, columns)) as copy:
+                copy.set_types([column_types[col] for col in self.df.columns])
+                for row in values.itertuples(index=False, name=None):
+                    copy.write_row(row)
+            return
+
+        # Write NULL as \N so that empty strings aren't loaded as NULL
+        statement = sql.SQL("copy {} ({}) from stdin (format csv, null '\\N')")
+        with cursor.copy(statement.format(table, columns)) as copy:
+            for start in range(0, len(self.df), COPY_CHUNK_ROWS):
+                chunk = self.df.iloc[start : start + COPY_CHUNK_ROWS]
+                copy.write(chunk.to_csv(index=False, header=False, na_rep="\\N"))
 
     @classmethod
     def from_sql(
         cls,
         source_table: str,
         engine: Engine,
+        *,
+        chunksize: int | None = None,
     ) -> Self:
         """
         Read data from a SQL table into a pandas DataFrame and creates an instance of the current class.
@@ -97,6 +219,9 @@ class BaseDataset:
         data will be read.
         * engine (sqlalchemy.engine.Engine, required): A SQLAlchemy Engine object representing
         the connection to the database.
+        * chunksize (int, optional): If set, the table is streamed from a server-side cursor
+        in chunks of this many rows, so the database driver never buffers the whole result.
+        Use `iter_from_sql` to process one chunk at a time instead of loading them all.
 
         **Returns:**
 
@@ -108,7 +233,27 @@ class BaseDataset:
         * Potential exceptions raised by the underlying pandas.read_sql function, such as
         database connection errors or errors related to data type mismatches.
         """
-        return cls(df=pd.read_sql(source_table, engine))
+        if chunksize is None:
+            return cls(df=pd.read_sql(source_table, engine))
+
+        chunks = [
+            dataset.df for dataset in cls.iter_from_sql(source_table, engine, chunksize)
+        ]
+        return cls(df=pd.concat(chunks, ignore_index=True))
+
+    @classmethod
+    def iter_from_sql(
+        cls,
+        source_table: str,
+        engine: Engine,
+        chunksize: int,
+    ) -> Iterator[Self]:
+        """Stream a SQL table from a server-side cursor, yielding a dataset per chunk of rows."""
+        with engine.connect().execution_options(stream_results=True) as conn:
+            yield from (
+                cls(df=chunk)
+                for chunk in pd.read_sql_table(source_table, conn, chunksize=chunksize)
+            )
 
     def to_csv(
         self,
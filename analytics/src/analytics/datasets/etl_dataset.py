@@ -62,6 +62,55 @@ class EtlDataset(BaseDataset):
         "quad_end": "quad_end",
     }
 
+    # String columns with few distinct values, repeated across many rows
+    CATEGORICAL_COLUMNS = (
+        "deliverable_pillar",
+        "deliverable_status",
+        "issue_status",
+        "issue_type",
+        "project_name",
+        "quad_name",
+        "sprint_name",
+    )
+
+    # The column holding the ghid of each entity type
+    GHID_COLUMNS = {
+        EtlEntityType.DELIVERABLE: "deliverable_ghid",
+        EtlEntityType.EPIC: "epic_ghid",
+        EtlEntityType.ISSUE: "issue_ghid",
+        EtlEntityType.PROJECT: "project_ghid",
+        EtlEntityType.QUAD: "quad_ghid",
+        EtlEntityType.SPRINT: "sprint_ghid",
+    }
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Instantiate the dataset and index the rows of each entity type by ghid.
+
+        Each entity's first row, and the positions of every row of each issue, are
+        looked up once here, so fetching an entity by ghid doesn't scan the dataset.
+        """
+        categorical_columns = [col for col in self.CATEGORICAL_COLUMNS if col in df]
+        df = df.astype(dict.fromkeys(categorical_columns, "category"))
+        super().__init__(df)
+
+        # the first row of each entity, and its position among those rows
+        self._first_rows: dict[EtlEntityType, pd.DataFrame] = {}
+        self._first_row_positions: dict[EtlEntityType, dict[str | int, int]] = {}
+        for entity_type, col in self.GHID_COLUMNS.items():
+            rows = df[df[col].notna()].drop_duplicates(subset=col, keep="first")
+            self._first_rows[entity_type] = rows
+            self._first_row_positions[entity_type] = {
+                ghid: position for position, ghid in enumerate(rows[col])
+            }
+
+        # every row of each issue, since an issue can appear in more than one project
+        self._issue_rows = df[df.issue_ghid.notna()]
+        self._issue_row_positions = self._issue_rows.groupby(
+            "issue_ghid",
+            sort=False,
+        ).indices
+
     @classmethod
     def load_from_json_file(cls, file_path: str) -> Self:
         """
@@ -127,79 +176,102 @@ class EtlDataset(BaseDataset):
 
         return df
 
+    # Generic getters
+
+    def _get_first_row(self, entity_type: EtlEntityType, ghid: str | int) -> pd.Series:
+        """Fetch the first row of data about an entity."""
+        position = self._first_row_positions[entity_type][ghid]
+        return self._first_rows[entity_type].iloc[position]
+
+    def _get_ghids(self, entity_type: EtlEntityType) -> NDArray[Any]:
+        """Fetch an array of unique non-null ghids, in the order they first appear."""
+        col = self.GHID_COLUMNS[entity_type]
+        return self._first_rows[entity_type][col].to_numpy()
+
     # QUAD getters
 
     def get_quad(self, quad_ghid: str) -> pd.Series:
         """Fetch data about a given quad."""
-        query_string = f"quad_ghid == '{quad_ghid}'"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.QUAD, quad_ghid)
 
     def get_quad_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null quad ghids."""
-        df = self.df[self.df.quad_ghid.notna()]
-        return df.quad_ghid.unique()
+        return self._get_ghids(EtlEntityType.QUAD)
+
+    def get_all_quads(self) -> pd.DataFrame:
+        """Fetch the first row of data about each quad, as returned by get_quad."""
+        return self._first_rows[EtlEntityType.QUAD]
 
     # DELIVERABLE getters
 
     def get_deliverable(self, deliverable_ghid: str) -> pd.Series:
         """Fetch data about a given deliverable."""
-        query_string = f"deliverable_ghid == '{deliverable_ghid}'"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.DELIVERABLE, deliverable_ghid)
 
     def get_deliverable_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null deliverable ghids."""
-        df = self.df[self.df.deliverable_ghid.notna()]
-        return df.deliverable_ghid.unique()
+        return self._get_ghids(EtlEntityType.DELIVERABLE)
+
+    def get_all_deliverables(self) -> pd.DataFrame:
+        """Fetch the first row of data about each deliverable, as returned by get_deliverable."""
+        return self._first_rows[EtlEntityType.DELIVERABLE]
 
     # SPRINT getters
 
     def get_sprint(self, sprint_ghid: str) -> pd.Series:
         """Fetch data about a given sprint."""
-        query_string = f"sprint_ghid == '{sprint_ghid}'"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.SPRINT, sprint_ghid)
 
     def get_sprint_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null sprint ghids."""
-        df = self.df[self.df.sprint_ghid.notna()]
-        return df.sprint_ghid.unique()
+        return self._get_ghids(EtlEntityType.SPRINT)
+
+    def get_all_sprints(self) -> pd.DataFrame:
+        """Fetch the first row of data about each sprint, as returned by get_sprint."""
+        return self._first_rows[EtlEntityType.SPRINT]
 
     # EPIC getters
 
     def get_epic(self, epic_ghid: str) -> pd.Series:
         """Fetch data about a given epic."""
-        query_string = f"epic_ghid == '{epic_ghid}'"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.EPIC, epic_ghid)
 
     def get_epic_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null epic ghids."""
-        df = self.df[self.df.epic_ghid.notna()]
-        return df.epic_ghid.unique()
+        return self._get_ghids(EtlEntityType.EPIC)
+
+    def get_all_epics(self) -> pd.DataFrame:
+        """Fetch the first row of data about each epic, as returned by get_epic."""
+        return self._first_rows[EtlEntityType.EPIC]
 
     # ISSUE getters
 
     def get_issue(self, issue_ghid: str) -> pd.Series:
         """Fetch data about a given issue."""
-        query_string = f"issue_ghid == '{issue_ghid}'"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.ISSUE, issue_ghid)
 
     def get_issues(self, issue_ghid: str) -> pd.DataFrame:
         """Fetch data about a given issue."""
-        query_string = f"issue_ghid == '{issue_ghid}'"
-        return self.df.query(query_string)
+        return self._issue_rows.iloc[self._issue_row_positions[issue_ghid]]
 
     def get_issue_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null issue ghids."""
-        df = self.df[self.df.issue_ghid.notna()]
-        return df.issue_ghid.unique()
+        return self._get_ghids(EtlEntityType.ISSUE)
+
+    def get_all_issues(self) -> pd.DataFrame:
+        """Fetch every row of data about every issue, in the order get_issues returns them."""
+        return self._issue_rows
 
     # PROJECT getters
 
     def get_project(self, project_ghid: int) -> pd.Series:
         """Fetch data about a given project."""
-        query_string = f"project_ghid == {project_ghid}"
-        return self.df.query(query_string).iloc[0]
+        return self._get_first_row(EtlEntityType.PROJECT, project_ghid)
 
     def get_project_ghids(self) -> NDArray[Any]:
         """Fetch an array of unique non-null project ghids."""
-        df = self.df[self.df.project_ghid.notna()]
-        return df.project_ghid.unique()
+        return self._get_ghids(EtlEntityType.PROJECT)
+
+    def get_all_projects(self) -> pd.DataFrame:
+        """Fetch the first row of data about each project, as returned by get_project."""
+        return self._first_rows[EtlEntityType.PROJECT]
@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
@@ -14,7 +17,7 @@ from analytics.datasets.issues import (
     IssueMetadata,
     IssueType,
 )
-from analytics.datasets.utils import load_json_file
+from analytics.datasets.utils import dump_to_json, load_json_file
 from analytics.integrations import github
 
 logger = logging.getLogger(__name__)
@@ -39,6 +42,8 @@ class GitHubProjectConfig(BaseModel):
     sprint_projects: list[SprintBoardConfig]
     temp_dir: str = "data"
     output_file: str = "data/delivery-data.json"
+    snapshot_dir: str = "data/snapshots"
+    full_refresh_days: int = 7
 
 
 class RoadmapConfig(BaseModel):
@@ -113,32 +118,45 @@ class GitHubProjectETL:
     def extract(self) -> None:
         """Run the extract step of the ETL pipeline."""
         temp_dir = Path(self.config.temp_dir)
-
-        # Export the roadmap data
         roadmap_file_path = str(temp_dir / "roadmap-data.json")
         roadmap = self.config.roadmap_project
-        self._export_roadmap_data_to_file(
-            roadmap=roadmap,
-            output_file_path=roadmap_file_path,
-        )
 
-        # Export sprint data for each GitHub project that the scrum teams use
-        # to manage their sprints, e.g. HHS/17 and HHS/13
-        input_files: list[InputFiles] = []
-        for sprint_board in self.config.sprint_projects:
-            n = sprint_board.project_number
-            sprint_file_path = str(temp_dir / f"sprint-data-{n}.json")
-            self._export_sprint_data_to_file(
-                sprint_board=sprint_board,
-                output_file_path=sprint_file_path,
-            )
-            # Add to file list
-            input_files.append(
-                InputFiles(
-                    roadmap=roadmap_file_path,
-                    sprint=sprint_file_path,
+        # The projects are independent of each other, so export them concurrently
+        with ThreadPoolExecutor(max_workers=self.client.max_concurrency) as executor:
+            # Export the roadmap data
+            futures = [
+                executor.submit(
+                    self._export_roadmap_data_to_file,
+                    roadmap=roadmap,
+                    output_file_path=roadmap_file_path,
                 ),
-            )
+            ]
+
+            # Export sprint data for each GitHub project that the scrum teams use
+            # to manage their sprints, e.g. HHS/17 and HHS/13
+            input_files: list[InputFiles] = []
+            for sprint_board in self.config.sprint_projects:
+                n = sprint_board.project_number
+                sprint_file_path = str(temp_dir / f"sprint-data-{n}.json")
+                futures.append(
+                    executor.submit(
+                        self._export_sprint_data_to_file,
+                        sprint_board=sprint_board,
+                        output_file_path=sprint_file_path,
+                    ),
+                )
+                # Add to file list
+                input_files.append(
+                    InputFiles(
+                        roadmap=roadmap_file_path,
+                        sprint=sprint_file_path,
+                    ),
+                )
+
+            # Re-raise the first error, if any of the exports failed
+            for future in futures:
+                future.result()
+
         # store transient files for re-use during the transform step
         self._transient_files = input_files
 
@@ -194,29 +212,53 @@ class GitHubProjectETL:
             output_file=output_file_path,
         )
 
-    def extract_and_transform_in_memory(self) -> list[dict]:
-        """Export from GitHub and transform to JSON."""
-        # export roadmap data
+    def extract_and_transform_in_memory(
+        self,
+        *,
+        incremental: bool = False,
+    ) -> list[dict]:
+        """
+        Export from GitHub and transform to JSON.
+
+        In incremental mode, only the items updated since the last successful
+        export are fetched from GitHub, and merged into the snapshot of each
+        project that the last export saved on disk.
+        """
         roadmap = self.config.roadmap_project
-        roadmap_json = github.export_roadmap_data_to_object(
-            client=self.client,
-            owner=roadmap.owner,
-            project=roadmap.project_number,
-            quad_field=roadmap.quad_field,
-            pillar_field=roadmap.pillar_field,
+        snapshots = (
+            ProjectSnapshots(self.config.snapshot_dir, self.config.full_refresh_days)
+            if incremental
+            else None
         )
 
-        # export sprint data
-        issues = []
-        for sprint_board in self.config.sprint_projects:
-            sprint_json = github.export_sprint_data_to_object(
-                client=self.client,
-                owner=sprint_board.owner,
-                project=sprint_board.project_number,
-                sprint_field=sprint_board.sprint_field,
-                points_field=sprint_board.points_field,
+        # The projects are independent of each other, so export them concurrently
+        with ThreadPoolExecutor(max_workers=self.client.max_concurrency) as executor:
+            # export roadmap data
+            roadmap_future = executor.submit(
+                self._export_roadmap_data_to_object,
+                roadmap=roadmap,
+                snapshots=snapshots,
             )
 
+            # export sprint data
+            sprint_futures = [
+                executor.submit(
+                    self._export_sprint_data_to_object,
+                    sprint_board=sprint_board,
+                    snapshots=snapshots,
+                )
+                for sprint_board in self.config.sprint_projects
+            ]
+
+            roadmap_json = roadmap_future.result()
+            sprint_jsons = [future.result() for future in sprint_futures]
+
+        # record the export only once every project has been exported
+        if snapshots is not None:
+            snapshots.save_state()
+
+        issues = []
+        for sprint_json in sprint_jsons:
             # flatten sprint and roadmap data into issue data
             issues.extend(
                 run_transformation_pipeline_on_json(
@@ -231,6 +273,134 @@ class GitHubProjectETL:
         # dump issue dataset to JSON
         return dataset.to_dict()
 
+    def _export_roadmap_data_to_object(
+        self,
+        roadmap: RoadmapConfig,
+        snapshots: ProjectSnapshots | None,
+    ) -> list[dict]:
+        key = f"roadmap-{roadmap.owner}-{roadmap.project_number}"
+        updated_since = snapshots.get_updated_since(key) if snapshots else None
+        items = github.export_roadmap_data_to_object(
+            client=self.client,
+            owner=roadmap.owner,
+            project=roadmap.project_number,
+            quad_field=roadmap.quad_field,
+            pillar_field=roadmap.pillar_field,
+            updated_since=updated_since,
+        )
+        if snapshots is None:
+            return items
+        return snapshots.merge(key, items, updated_since)
+
+    def _export_sprint_data_to_object(
+        self,
+        sprint_board: SprintBoardConfig,
+        snapshots: ProjectSnapshots | None,
+    ) -> list[dict]:
+        key = f"sprint-{sprint_board.owner}-{sprint_board.project_number}"
+        updated_since = snapshots.get_updated_since(key) if snapshots else None
+        items = github.export_sprint_data_to_object(
+            client=self.client,
+            owner=sprint_board.owner,
+            project=sprint_board.project_number,
+            sprint_field=sprint_board.sprint_field,
+            points_field=sprint_board.points_field,
+            updated_since=updated_since,
+        )
+        if snapshots is None:
+            return items
+        return snapshots.merge(key, items, updated_since)
+
+
+# ===============================================================
+# Incremental export helpers
+# ===============================================================
+
+
+class ProjectSnapshots:
+    """
+    Keep the last export of each project on disk for incremental exports.
+
+    The state file records when each project was last exported, and when it was
+    last exported in full. A project is exported in full when it has no snapshot,
+    or its last full export is older than the full refresh interval, which also
+    drops items that have since been removed from the project.
+    """
+
+    STATE_FILE = "export-state.json"
+
+    def __init__(self, snapshot_dir: str, full_refresh_days: int) -> None:
+        """Load the state of the last export."""
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.full_refresh_days = full_refresh_days
+        self.started_at = datetime.now(UTC)
+
+        state_path = self.snapshot_dir / self.STATE_FILE
+        self.state: dict = (
+            load_json_file(str(state_path)) if state_path.exists() else {}
+        )
+        self._new_state: dict = {}
+        self._lock = threading.Lock()
+
+    def get_updated_since(self, key: str) -> str | None:
+        """Return the date to export changes from, or None to export everything."""
+        entry = self.state.get(key)
+        if entry is None or not self._path(key).exists():
+            return None
+
+        last_full_export_at = datetime.fromisoformat(entry["last_full_export_at"])
+        full_refresh_interval = timedelta(days=self.full_refresh_days)
+        if self.started_at - last_full_export_at > full_refresh_interval:
+            return None
+
+        # GitHub only filters by date, so go back a day to cover any items
+        # updated between the start of the last export and midnight UTC
+        last_export_at = datetime.fromisoformat(entry["last_export_at"])
+        return (last_export_at - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def merge(
+        self,
+        key: str,
+        items: list[dict],
+        updated_since: str | None,
+    ) -> list[dict]:
+        """Merge updated items into a project's snapshot and return the merged items."""
+        if updated_since is not None:
+            previous = load_json_file(str(self._path(key)))
+            merged = {item["issue_url"]: item for item in previous}
+            merged.update({item["issue_url"]: item for item in items})
+            logger.info(
+                "Merged %d item(s) updated since %s into %d item(s) from %s",
+                len(items),
+                updated_since,
+                len(previous),
+                key,
+            )
+            items = list(merged.values())
+
+        dump_to_json(str(self._path(key)), items)
+
+        started_at = self.started_at.isoformat()
+        with self._lock:
+            self._new_state[key] = {
+                "last_export_at": started_at,
+                "last_full_export_at": (
+                    started_at
+                    if updated_since is None
+                    else self.state[key]["last_full_export_at"]
+                ),
+            }
+        return items
+
+    def save_state(self) -> None:
+        """Record the projects exported by this run for the next run to start from."""
+        state = {**self.state, **self._new_state}
+        dump_to_json(str(self.snapshot_dir / self.STATE_FILE), state)
+
+    def _path(self, key: str) -> Path:
+        return self.snapshot_dir / f"{key}.json"
+
 
 # ===============================================================
 # Transformation helper functions
@@ -1,12 +1,12 @@
 """Define EtlDeliverableModel class to encapsulate db CRUD operations."""
 
-from pandas import Series
+from pandas import DataFrame
 from psycopg.errors import InsufficientPrivilege
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, ProgrammingError
 
 from analytics.datasets.etl_dataset import EtlEntityType
-from analytics.integrations.etldb.etldb import EtlChangeType, EtlDb
+from analytics.integrations.etldb.etldb import EtlDb
 
 
 class EtlDeliverableModel:
@@ -16,29 +16,76 @@ class EtlDeliverableModel:
         """Instantiate a class instance."""
         self.dbh = dbh
 
-    def sync_deliverable(
-        self,
-        deliverable_df: Series,
-        ghid_map: dict,
-    ) -> tuple[int | None, EtlChangeType]:
-        """Write deliverable data to etl database."""
-        # initialize return value
-        deliverable_id = None
-        change_type = EtlChangeType.NONE
-
+    def sync_deliverables(self, deliverables_df: DataFrame, ghid_map: dict) -> dict:
+        """Write data about many deliverables to etl database and return a map of row ids."""
         try:
-            # insert dimensions
-            deliverable_id = self._insert_dimensions(deliverable_df)
-            if deliverable_id is not None:
-                change_type = EtlChangeType.INSERT
+            # keep the last row of each deliverable, as syncing row by row would
+            deliverables_df = deliverables_df.drop_duplicates(
+                "deliverable_ghid",
+                keep="last",
+            )
+
+            # resolve foreign keys in bulk
+            deliverables_df = deliverables_df.assign(
+                quad_id=deliverables_df["quad_ghid"]
+                .map(ghid_map[EtlEntityType.QUAD])
+                .astype("Int64"),
+            )
 
-            # if insert failed, select and update
-            if deliverable_id is None:
-                deliverable_id, change_type = self._update_dimensions(deliverable_df)
+            # stage the deliverables and upsert dimensions in one statement
+            self.dbh.copy_to_staging_table(
+                "deliverable_staging",
+                deliverables_df,
+                {
+                    "deliverable_ghid": "text",
+                    "deliverable_title": "text",
+                    "deliverable_pillar": "text",
+                    "deliverable_status": "text",
+                    "quad_id": "integer",
+                },
+            )
+            self.dbh.upsert_dimensions(
+                "gh_deliverable",
+                "deliverable_staging",
+                {
+                    "ghid": "deliverable_ghid",
+                    "title": "deliverable_title",
+                    "pillar": "deliverable_pillar",
+                },
+            )
+
+            # upsert facts
+            cursor = self.dbh.connection()
+            cursor.execute(
+                text(
+                    "insert into gh_deliverable_quad_map(deliverable_id, quad_id, d_effective) "
+                    "select d.id, s.quad_id, cast(:effective as date) "
+                    "from deliverable_staging s "
+                    "join gh_deliverable d on d.ghid = s.deliverable_ghid "
+                    "on conflict(deliverable_id, d_effective) do update "
+                    "set (quad_id, t_modified) = (excluded.quad_id, current_timestamp)",
+                ),
+                {"effective": self.dbh.effective_date},
+            )
+            cursor.execute(
+                text(
+                    "insert into gh_deliverable_history(deliverable_id, status, d_effective) "
+                    "select d.id, s.deliverable_status, cast(:effective as date) "
+                    "from deliverable_staging s "
+                    "join gh_deliverable d on d.ghid = s.deliverable_ghid "
+                    "on conflict(deliverable_id, d_effective) do update "
+                    "set (status, t_modified) = (excluded.status, current_timestamp)",
+                ),
+                {"effective": self.dbh.effective_date},
+            )
+            result = self.dbh.select_ghid_map(
+                "gh_deliverable",
+                "deliverable_staging",
+                "deliverable_ghid",
+            )
 
-            # insert facts
-            if deliverable_id is not None:
-                _ = self._insert_facts(deliverable_id, deliverable_df, ghid_map)
+            # commit
+            self.dbh.commit(cursor)
         except (
             InsufficientPrivilege,
             OperationalError,
@@ -48,133 +95,4 @@ class EtlDeliverableModel:
             message = f"FATAL: Failed to sync deliverable data: {e}"
             raise RuntimeError(message) from e
 
-        return deliverable_id, change_type
-
-    def _insert_dimensions(self, deliverable_df: Series) -> int | None:
-        """Write deliverable dimension data to etl database."""
-        # insert into dimension table: deliverable
-        new_row_id = None
-        cursor = self.dbh.connection()
-        result = cursor.execute(
-            text(
-                "insert into gh_deliverable(ghid, title, pillar) "
-                "values (:ghid, :title, :pillar) "
-                "on conflict(ghid) do nothing returning id",
-            ),
-            {
-                "ghid": deliverable_df["deliverable_ghid"],
-                "title": deliverable_df["deliverable_title"],
-                "pillar": deliverable_df["deliverable_pillar"],
-            },
-        )
-        row = result.fetchone()
-        if row:
-            new_row_id = row[0]
-
-        # commit
-        self.dbh.commit(cursor)
-
-        return new_row_id
-
-    def _insert_facts(
-        self,
-        deliverable_id: int,
-        deliverable_df: Series,
-        ghid_map: dict,
-    ) -> tuple[int | None, int | None]:
-        """Write deliverable fact data to etl database."""
-        # insert into fact table: deliverable_quad_map
-        map_id = None
-        cursor = self.dbh.connection()
-        result = cursor.execute(
-            text(
-                "insert into gh_deliverable_quad_map(deliverable_id, quad_id, d_effective) "
-                "values (:deliverable_id, :quad_id, :effective) "
-                "on conflict(deliverable_id, d_effective) do update "
-                "set (quad_id, t_modified) = (:quad_id, current_timestamp) returning id",
-            ),
-            {
-                "deliverable_id": deliverable_id,
-                "quad_id": ghid_map[EtlEntityType.QUAD].get(
-                    deliverable_df["quad_ghid"],
-                ),
-                "effective": self.dbh.effective_date,
-            },
-        )
-        row = result.fetchone()
-        if row:
-            map_id = row[0]
-
-        # insert into fact table: deliverable_history
-        history_id = None
-        result = cursor.execute(
-            text(
-                "insert into gh_deliverable_history(deliverable_id, status, d_effective) "
-                "values (:deliverable_id, :status, :effective) "
-                "on conflict(deliverable_id, d_effective) do update "
-                "set (status, t_modified) = (:status, current_timestamp) returning id",
-            ),
-            {
-                "deliverable_id": deliverable_id,
-                "status": deliverable_df["deliverable_status"],
-                "effective": self.dbh.effective_date,
-            },
-        )
-        row = result.fetchone()
-        if row:
-            history_id = row[0]
-
-        # commit
-        self.dbh.commit(cursor)
-
-        return history_id, map_id
-
-    def _update_dimensions(
-        self,
-        deliverable_df: Series,
-    ) -> tuple[int | None, EtlChangeType]:
-        """Update deliverable fact data in etl database."""
-        # initialize return value
-        change_type = EtlChangeType.NONE
-
-        # get new values
-        new_title = deliverable_df["deliverable_title"]
-        new_pillar = deliverable_df["deliverable_pillar"]
-        new_values = (new_title, new_pillar)
-
-        # select old values
-        deliverable_id, old_title, old_pillar = self._select(
-            deliverable_df["deliverable_ghid"],
-        )
-        old_values = (old_title, old_pillar)
-
-        # compare
-        if deliverable_id is not None and new_values != old_values:
-            change_type = EtlChangeType.UPDATE
-            cursor = self.dbh.connection()
-            update_sql = text(
-                "update gh_deliverable set title = :new_title, pillar = :new_pillar, "
-                "t_modified = current_timestamp where id = :deliverable_id",
-            )
-            update_values = {
-                "new_title": new_title,
-                "new_pillar": new_pillar,
-                "deliverable_id": deliverable_id,
-            }
-            cursor.execute(update_sql, update_values)
-            self.dbh.commit(cursor)
-
-        return deliverable_id, change_type
-
-    def _select(self, ghid: str) -> tuple[int | None, str | None, str | None]:
-        """Select deliverable data from etl database."""
-        cursor = self.dbh.connection()
-        result = cursor.execute(
-            text("select id, title, pillar from gh_deliverable where ghid = :ghid"),
-            {"ghid": ghid},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0], row[1], row[2]
-
-        return None, None, None
+        return result
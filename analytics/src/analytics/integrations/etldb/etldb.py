@@ -1,8 +1,8 @@
 """Define EtlDb as an abstraction layer for database connections."""
 
 import logging
-from enum import Enum
 
+import pandas as pd
 from sqlalchemy import Connection, text
 
 from analytics.integrations.db import PostgresDbClient
@@ -35,10 +35,100 @@ class EtlDb:
                 raise RuntimeError(message) from e
         return self._connection
 
+    def new_connection(self) -> Connection:
+        """Get a new connection, separate from the shared one, for concurrent work."""
+        try:
+            return self._db_client.connect()
+        except RuntimeError as e:
+            message = f"Failed to connect to database: {e}"
+            raise RuntimeError(message) from e
+
     def commit(self, connection: Connection) -> None:
         """Commit an open transaction."""
         connection.commit()
 
+    def copy_to_staging_table(
+        self,
+        staging_table: str,
+        df: pd.DataFrame,
+        column_types: dict[str, str],
+    ) -> None:
+        """
+        Create a temp table and COPY the given columns of a dataframe into it.
+
+        The table is dropped on commit, so it can only be used by statements
+        in the same transaction.
+        """
+        cursor = self.connection()
+        column_defs = ", ".join(
+            f"{name} {type_}" for name, type_ in column_types.items()
+        )
+        cursor.execute(
+            text(f"create temp table {staging_table} ({column_defs}) on commit drop"),
+        )
+
+        columns = list(column_types)
+        values = df[columns].astype(object).where(df[columns].notna(), None)
+
+        raw_cursor = cursor.connection.cursor()
+        with raw_cursor.copy(
+            f"copy {staging_table} ({', '.join(columns)}) from stdin",
+        ) as copy:
+            for row in values.itertuples(index=False, name=None):
+                copy.write_row(row)
+
+    def upsert_dimensions(
+        self,
+        table: str,
+        source: str,
+        column_map: dict[str, str],
+    ) -> tuple[int, int]:
+        """
+        Insert new rows, and update changed rows, of a dimension table in one statement.
+
+        The source is a table or an aliased subquery. The column map is of dimension
+        table column to the expression selecting its value from the source, and must
+        include ghid. Returns the count of rows
+        inserted and updated.
+        """
+        columns = list(column_map)
+        updatable = [column for column in columns if column != "ghid"]
+        set_values = ", ".join(f"{column} = excluded.{column}" for column in updatable)
+        old_values = ", ".join(f"{table}.{column}" for column in updatable)
+        new_values = ", ".join(f"excluded.{column}" for column in updatable)
+
+        cursor = self.connection()
+        result = cursor.execute(
+            text(
+                f"insert into {table} ({', '.join(columns)}) "  # noqa: S608
+                f"select {', '.join(column_map.values())} from {source} "
+                "on conflict(ghid) do update "
+                f"set {set_values}, t_modified = current_timestamp "
+                f"where ({old_values}) is distinct from ({new_values}) "
+                # xmax is only zero for newly inserted rows
+                "returning (xmax = 0) as is_insert",
+            ),
+        )
+        is_insert = [row[0] for row in result]
+        inserted = sum(is_insert)
+        updated = len(is_insert) - inserted
+
+        message = f"{table} row(s) inserted: {inserted}, updated: {updated}"
+        logger.info(message)
+
+        return inserted, updated
+
+    def select_ghid_map(self, table: str, staging_table: str, ghid_column: str) -> dict:
+        """Select the row id of every entity in a staging table, mapped by ghid."""
+        cursor = self.connection()
+        result = cursor.execute(
+            text(
+                f"select t.ghid, t.id from {table} t "  # noqa: S608
+                f"join {staging_table} s on t.ghid = s.{ghid_column}",
+            ),
+        )
+        return dict(result.tuples().all())
+
     def get_schema_version(self) -> int:
         """Select schema version from etl database."""
         version = 0
@@ -120,11 +210,3 @@ class EtlDb:
         )
         row = result.fetchone()
         return bool(row and row[0] == "schema_version")
-
-
-class EtlChangeType(Enum):
-    """An enum to describe ETL change types."""
-
-    NONE = 0
-    INSERT = 1
-    UPDATE = 2
@@ -126,83 +126,66 @@ def sync_data(dataset: EtlDataset, effective: str) -> None:
 
 def sync_deliverables(db: EtlDb, dataset: EtlDataset, ghid_map: dict) -> dict:
     """Insert or update (if necessary) a row for each deliverable and return a map of row ids."""
-    result = {}
     model = EtlDeliverableModel(db)
-    for ghid in dataset.get_deliverable_ghids():
-        deliverable_df = dataset.get_deliverable(ghid)
-        result[ghid], _ = model.sync_deliverable(deliverable_df, ghid_map)
-        if VERBOSE:
-            m = f"DELIVERABLE '{ghid}' row_id = {result[ghid]}"
+    result = model.sync_deliverables(dataset.get_all_deliverables(), ghid_map)
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"DELIVERABLE '{ghid}' row_id = {row_id}"
             logger.info(m)
     return result
 
 
 def sync_epics(db: EtlDb, dataset: EtlDataset, ghid_map: dict) -> dict:
     """Insert or update (if necessary) a row for each epic and return a map of row ids."""
-    result = {}
     model = EtlEpicModel(db)
-    for ghid in dataset.get_epic_ghids():
-        epic_df = dataset.get_epic(ghid)
-        result[ghid], _ = model.sync_epic(epic_df, ghid_map)
-        if VERBOSE:
-            m = f"EPIC '{ghid}' row_id = {result[ghid]}"
+    result = model.sync_epics(dataset.get_all_epics(), ghid_map)
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"EPIC '{ghid}' row_id = {row_id}"
             logger.info(m)
     return result
 
 
 def sync_issues(db: EtlDb, dataset: EtlDataset, ghid_map: dict) -> dict:
     """Insert or update (if necessary) a row for each issue and return a map of row ids."""
-    result = {}
     model = EtlIssueModel(db)
-    for ghid in dataset.get_issue_ghids():
-        all_rows = dataset.get_issues(ghid)
-        for _, issue_df in all_rows.iterrows():
-            result[ghid], _ = model.sync_issue(issue_df, ghid_map)
-            if VERBOSE:
-                m = f"ISSUE '{ghid}' issue_id = {result[ghid]}"
-                logger.info(m)
+    result = model.sync_issues(dataset.get_all_issues(), ghid_map)
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"ISSUE '{ghid}' issue_id = {row_id}"
+            logger.info(m)
     return result
 
 
 def sync_projects(db: EtlDb, dataset: EtlDataset) -> dict:
     """Insert or update (if necessary) a row for each project and return a map of row ids."""
-    result = {}
     model = EtlProjectModel(db)
-    for ghid in dataset.get_project_ghids():
-        project_df = dataset.get_project(ghid)
-        result[ghid], _ = model.sync_project(project_df)
-        if VERBOSE:
-            m = (
-                f"PROJECT '{ghid}' title = '{project_df['project_name']}', row_id = {result[ghid]}",
-            )
+    result = model.sync_projects(dataset.get_all_projects())
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"PROJECT '{ghid}' row_id = {row_id}"
             logger.info(m)
     return result
 
 
 def sync_sprints(db: EtlDb, dataset: EtlDataset, ghid_map: dict) -> dict:
     """Insert or update (if necessary) a row for each sprint and return a map of row ids."""
-    result = {}
     model = EtlSprintModel(db)
-    for ghid in dataset.get_sprint_ghids():
-        sprint_df = dataset.get_sprint(ghid)
-        result[ghid], _ = model.sync_sprint(sprint_df, ghid_map)
-        if VERBOSE:
-            m = f"SPRINT '{ghid}' row_id = {result[ghid]}"
+    result = model.sync_sprints(dataset.get_all_sprints(), ghid_map)
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"SPRINT '{ghid}' row_id = {row_id}"
             logger.info(m)
     return result
 
 
 def sync_quads(db: EtlDb, dataset: EtlDataset) -> dict:
     """Insert or update (if necessary) a row for each quad and return a map of row ids."""
-    result = {}
     model = EtlQuadModel(db)
-    for ghid in dataset.get_quad_ghids():
-        quad_df = dataset.get_quad(ghid)
-        result[ghid], _ = model.sync_quad(quad_df)
-        if VERBOSE:
-            m = (
-                f"QUAD '{ghid}' title = '{quad_df['quad_name']}', row_id = {result[ghid]}",
-            )
+    result = model.sync_quads(dataset.get_all_quads())
+    if VERBOSE:
+        for ghid, row_id in result.items():
+            m = f"QUAD '{ghid}' row_id = {row_id}"
             logger.info(m)
     return result
 
@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS opportunity_extract_load (
+    one_row BOOL GENERATED ALWAYS AS (TRUE) STORED,
+	extract_id TEXT NOT NULL,
+	t_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	t_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS oel_i1 ON opportunity_extract_load(one_row);
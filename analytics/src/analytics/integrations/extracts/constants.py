@@ -99,3 +99,19 @@ MAP_TABLES_TO_COLS: dict[OpportunityTables, tuple[str, ...]] = {
     OpportunityTables.OPPORTUNITY_SUMMARY: OPOORTUNITY_SUMMARY_COLS,
     OpportunityTables.CURRENT_OPPORTUNITY_SUMMARY: CURRENT_OPPORTUNITY_SUMMARY_COLS,
 }
+
+MAP_TABLES_TO_PRIMARY_KEYS: dict[OpportunityTables, tuple[str, ...]] = {
+    OpportunityTables.LK_OPPORTUNITY_STATUS: ("OPPORTUNITY_STATUS_ID",),
+    OpportunityTables.LK_OPPORTUNITY_CATEGORY: ("OPPORTUNITY_CATEGORY_ID",),
+    OpportunityTables.OPPORTUNITY: ("OPPORTUNITY_ID",),
+    OpportunityTables.OPPORTUNITY_SUMMARY: ("OPPORTUNITY_SUMMARY_ID",),
+    OpportunityTables.CURRENT_OPPORTUNITY_SUMMARY: (
+        "OPPORTUNITY_ID",
+        "OPPORTUNITY_SUMMARY_ID",
+    ),
+}
+
+# Written alongside the extracts, describes the files of the latest extract
+EXTRACT_MANIFEST_FILE_NAME = "extract_manifest.json"
+# The manifest each extract also writes under its own name
+EXTRACT_MANIFEST_FILE_NAME_FORMAT = "extract_manifest-{extract_id}.json"
@@ -1,23 +1,31 @@
 # pylint: disable=invalid-name, line-too-long
 """Loads opportunity tables with opportunity data from S3."""
 
+import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import ExitStack
 
 import smart_open  # type: ignore[import]
 from pydantic import Field
 from pydantic_settings import BaseSettings
-from sqlalchemy import Connection
+from sqlalchemy import Connection, text
 
 from analytics.integrations.etldb.etldb import EtlDb
 from analytics.integrations.extracts.constants import (
+    EXTRACT_MANIFEST_FILE_NAME,
+    EXTRACT_MANIFEST_FILE_NAME_FORMAT,
     MAP_TABLES_TO_COLS,
+    MAP_TABLES_TO_PRIMARY_KEYS,
     OpportunityTables,
 )
 
 logger = logging.getLogger(__name__)
 
+# How much of a file to read at once when streaming it into the database
+COPY_CHUNK_SIZE = 1024 * 1024
+
 
 class LoadOpportunityDataFileConfig(BaseSettings):
     """Configure S3 properties for opportunity data."""
@@ -26,54 +34,358 @@ class LoadOpportunityDataFileConfig(BaseSettings):
         default=None,
         alias="API_ANALYTICS_DB_EXTRACTS_PATH",
     )
+    load_opportunity_data_max_workers: int = Field(
+        default=5,
+        alias="LOAD_OPPORTUNITY_DATA_MAX_WORKERS",
+    )
 
 
 def extract_copy_opportunity_data() -> None:
-    """Instantiate Etldb class and call helper funcs to truncate and insert data in one txn."""
+    """
+    Instantiate Etldb class and call helper funcs to load the latest extract.
+
+    Every extract since the last one loaded is applied, oldest first. A full
+    extract is loaded into shadow tables which are then copied over the contents
+    of the live tables, while an incremental extract is merged in: deleted rows
+    are removed and changed rows are upserted. Either way, the live tables change
+    in a single transaction, so readers see the previous data until it commits.
+    """
     etldb_conn = EtlDb()
+    manifest = _fetch_extract_manifest()
+
+    if manifest is None:
+        tables = _fetch_insert_opportunity_data(etldb_conn)
+
+        with etldb_conn.connection() as conn, conn.begin():
+            _swap_shadow_tables(conn, tables)
+
+        _vacuum_tables(etldb_conn, tables)
+
+        logger.info("Extract opportunity data completed successfully")
+        return
+
+    with etldb_conn.new_connection() as conn:
+        loaded_extract_id = _get_loaded_extract_id(conn)
+
+    if manifest["extract_id"] == loaded_extract_id:
+        logger.info("Extract %s is already loaded", loaded_extract_id)
+        return
+
+    manifests = _get_manifests_to_load(manifest, loaded_extract_id)
+
+    # An incremental extract without a loaded base falls back to the last full extract
+    full_tables = None
+    if not manifests[0]["is_incremental"]:
+        full_tables = _fetch_insert_opportunity_data(etldb_conn, manifests.pop(0))
 
     with etldb_conn.connection() as conn, conn.begin():
-        _trancate_opportunity_table_records(conn)
+        if full_tables is not None:
+            _swap_shadow_tables(conn, full_tables)
 
-        _fetch_insert_opportunity_data(conn)
+        for incremental_manifest in manifests:
+            logger.info("Applying extract %s", incremental_manifest["extract_id"])
+            _delete_opportunity_data(conn, incremental_manifest)
+
+            _merge_opportunity_data(conn, incremental_manifest)
+
+        _set_loaded_extract_id(conn, manifest["extract_id"])
+
+    if full_tables is not None:
+        _vacuum_tables(etldb_conn, full_tables)
 
     logger.info("Extract opportunity data completed successfully")
 
 
-def _trancate_opportunity_table_records(conn: Connection) -> None:
-    """Truncate existing records from all tables."""
+def _fetch_extract_manifest(extract_id: str | None = None) -> dict | None:
+    """Fetch the manifest of the given extract, or of the latest, if one was written."""
+    s3_config = LoadOpportunityDataFileConfig()
+    file_name = (
+        EXTRACT_MANIFEST_FILE_NAME
+        if extract_id is None
+        else EXTRACT_MANIFEST_FILE_NAME_FORMAT.format(extract_id=extract_id)
+    )
+    manifest_path = f"{s3_config.load_opportunity_data_file_path}/{file_name}"
+
+    try:
+        with smart_open.open(manifest_path, "r") as file:
+            return json.load(file)
+    except OSError:
+        if extract_id is None:
+            # Extracts created before the manifest existed are always full extracts
+            logger.info("No extract manifest found, loading all tables")
+        return None
+
+
+def _get_manifests_to_load(
+    manifest: dict,
+    loaded_extract_id: str | None,
+) -> list[dict]:
+    """
+    Get the manifests of every extract not yet loaded, oldest first.
+
+    Each incremental extract only holds the changes since its base extract, so
+    the chain of bases is followed back from the latest extract until it reaches
+    the one last loaded, or failing that a full extract to load everything from.
+    """
+    manifests = [manifest]
+    while manifests[-1]["is_incremental"]:
+        base_extract_id = manifests[-1]["base_extract_id"]
+        if base_extract_id == loaded_extract_id:
+            break
+
+        base_manifest = _fetch_extract_manifest(base_extract_id)
+        if base_manifest is None:
+            message = (
+                f"Extract {base_extract_id} is missing, so the incremental extracts "
+                "since it can't be applied. Run a full extract to recover."
+            )
+            raise RuntimeError(message)
+        manifests.append(base_manifest)
+
+    return list(reversed(manifests))
+
+
+def _get_loaded_extract_id(conn: Connection) -> str | None:
+    """Select the id of the last extract loaded, if any."""
     cursor = conn.connection.cursor()
     schema = os.environ["DB_SCHEMA"]
-    for table in OpportunityTables:
-        stmt_trct = f"TRUNCATE TABLE {schema}.{table} CASCADE"
-        cursor.execute(stmt_trct)
-    logger.info("Truncated all records from all tables")
 
+    cursor.execute(
+        f"SELECT extract_id FROM {schema}.opportunity_extract_load",  # noqa: S608
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _set_loaded_extract_id(conn: Connection, extract_id: str) -> None:
+    """Record the id of the last extract loaded."""
+    cursor = conn.connection.cursor()
+    schema = os.environ["DB_SCHEMA"]
+
+    cursor.execute(
+        f"""
+        INSERT INTO {schema}.opportunity_extract_load (extract_id) VALUES (%s)
+        ON CONFLICT (one_row) DO UPDATE
+        SET extract_id = EXCLUDED.extract_id, t_modified = CURRENT_TIMESTAMP
+        """,  # noqa: S608
+        (extract_id,),
+    )
 
-def _fetch_insert_opportunity_data(conn: Connection) -> None:
-    """Streamlines opportunity tables from S3 and insert into the database."""
+
+def _get_table_file_path(
+    table: OpportunityTables,
+    manifest: dict | None,
+    file_key: str = "file_name",
+) -> str | None:
+    """Get the path of one of the extract files of a table."""
     s3_config = LoadOpportunityDataFileConfig()
 
+    if manifest is None:
+        return f"{s3_config.load_opportunity_data_file_path}/{table}.csv"
+
+    file_name = manifest["tables"].get(table, {}).get(file_key)
+    if file_name is None:
+        return None
+
+    return f"{s3_config.load_opportunity_data_file_path}/{file_name}"
+
+
+def _copy_file_into_table(
+    conn: Connection,
+    file_path: str,
+    table_name: str,
+    columns: tuple[str, ...],
+) -> None:
+    """Stream a CSV file into a table."""
     cursor = conn.connection.cursor()
+    query = f"""
+                   COPY {table_name} ({', '.join(columns)})
+                   FROM STDIN WITH (FORMAT CSV, DELIMITER ',', QUOTE '"', HEADER)
+                """
+
+    with ExitStack() as stack:
+        file = stack.enter_context(smart_open.open(file_path, "rb"))
+        copy = stack.enter_context(cursor.copy(query))
+
+        while data := file.read(COPY_CHUNK_SIZE):
+            copy.write(data)
+
+
+def _fetch_insert_opportunity_data(
+    etldb_conn: EtlDb,
+    manifest: dict | None = None,
+) -> list[OpportunityTables]:
+    """Streamlines opportunity tables from S3 into shadow tables, returning those loaded."""
+    s3_config = LoadOpportunityDataFileConfig()
+
+    tables = []
+    for table in OpportunityTables:
+        if _get_table_file_path(table, manifest) is None:
+            logger.warning("No extract found for table: %s", table)
+            continue
+        tables.append(table)
+
+    # The shadow tables have no foreign keys, so can be loaded in any order
+    with ThreadPoolExecutor(
+        max_workers=s3_config.load_opportunity_data_max_workers,
+    ) as executor:
+        futures = [
+            executor.submit(_load_shadow_table, etldb_conn, table, manifest)
+            for table in tables
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+    return tables
+
+
+def _load_shadow_table(
+    etldb_conn: EtlDb,
+    table: OpportunityTables,
+    manifest: dict | None,
+) -> None:
+    """Load the extract of a table into a fresh shadow table on its own connection."""
+    schema = os.environ["DB_SCHEMA"]
+    shadow_table = f"{schema}.{table}_shadow"
+    file_path = _get_table_file_path(table, manifest)
+    if file_path is None:
+        return
+
+    logger.info("Copying data for table: %s", table)
+
+    with etldb_conn.new_connection() as conn, conn.begin():
+        cursor = conn.connection.cursor()
+        # Unlogged as the data can be reloaded if lost, and any left
+        # behind by a previous failed load are replaced
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+        cursor.execute(
+            f"CREATE UNLOGGED TABLE {shadow_table} (LIKE {schema}.{table})",
+        )
+
+        _copy_file_into_table(
+            conn,
+            file_path,
+            shadow_table,
+            MAP_TABLES_TO_COLS.get(table, ()),
+        )
+
+    logger.info("Successfully loaded data for table: %s", table)
+
+
+def _swap_shadow_tables(conn: Connection, tables: list[OpportunityTables]) -> None:
+    """
+    Replace the contents of the live tables with those of their shadow tables.
+
+    Despite the name, this is not a swap by renaming: every row of the live tables
+    is deleted and every row of the shadow tables copied in, so it costs O(N) in
+    the size of the tables, writes each row twice and leaves the old rows behind as
+    dead tuples, which _vacuum_tables cleans up once the transaction commits.
+
+    Renaming would need the foreign keys between the tables, and the names of
+    their indexes and constraints, recreated on every load, and TRUNCATE would
+    block readers until the transaction commits, which DELETE doesn't.
+    """
+    cursor = conn.connection.cursor()
+    schema = os.environ["DB_SCHEMA"]
+
+    # Rows referencing other tables need to go first
+    for table in reversed(tables):
+        cursor.execute(f"DELETE FROM {schema}.{table}")  # noqa: S608
+
+    for table in tables:
+        column_list = ", ".join(MAP_TABLES_TO_COLS.get(table, ()))
+        cursor.execute(
+            f"""
+            INSERT INTO {schema}.{table} ({column_list})
+            SELECT {column_list} FROM {schema}.{table}_shadow
+            """,  # noqa: S608
+        )
+        logger.info("Replaced %s records in table: %s", cursor.rowcount, table)
+
+        cursor.execute(f"DROP TABLE {schema}.{table}_shadow")
+
+
+def _vacuum_tables(etldb_conn: EtlDb, tables: list[OpportunityTables]) -> None:
+    """Reclaim the rows deleted by _swap_shadow_tables and refresh table statistics."""
+    schema = os.environ["DB_SCHEMA"]
+
+    # VACUUM can't run inside a transaction
+    with etldb_conn.new_connection().execution_options(
+        isolation_level="AUTOCOMMIT",
+    ) as conn:
+        for table in tables:
+            conn.execute(text(f"VACUUM ANALYZE {schema}.{table}"))
+
+
+def _delete_opportunity_data(conn: Connection, manifest: dict) -> None:
+    """Delete the rows listed in the deleted keys files of an incremental extract."""
+    cursor = conn.connection.cursor()
+    schema = os.environ["DB_SCHEMA"]
+
+    # Rows referencing other tables need to go first
+    for table in reversed(OpportunityTables):
+        file_path = _get_table_file_path(table, manifest, "deleted_file_name")
+        if file_path is None:
+            continue
+
+        primary_key = MAP_TABLES_TO_PRIMARY_KEYS[table]
+        deleted_table = f"{table}_deleted"
+
+        # Table and column names all come from our constants, not the extract
+        cursor.execute(
+            f"""
+            CREATE TEMP TABLE {deleted_table} ON COMMIT DROP AS
+            SELECT {', '.join(primary_key)} FROM {schema}.{table} WITH NO DATA
+            """,  # noqa: S608
+        )
+        _copy_file_into_table(conn, file_path, deleted_table, primary_key)
+
+        key_match = " AND ".join(f"t.{key} = d.{key}" for key in primary_key)
+        cursor.execute(
+            f"DELETE FROM {schema}.{table} t USING {deleted_table} d WHERE {key_match}",  # noqa: S608
+        )
+
+        logger.info("Deleted %s records from table: %s", cursor.rowcount, table)
+
+        # Dropped now, as the next extract loaded in this transaction needs one too
+        cursor.execute(f"DROP TABLE {deleted_table}")
+
+
+def _merge_opportunity_data(conn: Connection, manifest: dict) -> None:
+    """Upsert the changed rows of an incremental extract."""
+    cursor = conn.connection.cursor()
+    schema = os.environ["DB_SCHEMA"]
+
     for table in OpportunityTables:
-        logger.info("Copying data for table: %s", table)
+        file_path = _get_table_file_path(table, manifest)
+        if file_path is None:
+            logger.warning("No extract found for table: %s", table)
+            continue
 
         columns = MAP_TABLES_TO_COLS.get(table, ())
-        query = f"""
-                       COPY {f"{os.getenv("DB_SCHEMA")}.{table} ({', '.join(columns)})"}
-                       FROM STDIN WITH (FORMAT CSV, DELIMITER ',', QUOTE '"', HEADER)
-                    """
-
-        with ExitStack() as stack:
-            file = stack.enter_context(
-                smart_open.open(
-                    f"{s3_config.load_opportunity_data_file_path}/{table}.csv",
-                    "r",
-                ),
-            )
-            copy = stack.enter_context(cursor.copy(query))
+        primary_key = MAP_TABLES_TO_PRIMARY_KEYS[table]
+        staging_table = f"{table}_staging"
+
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging_table} (LIKE {schema}.{table}) ON COMMIT DROP",
+        )
+        _copy_file_into_table(conn, file_path, staging_table, columns)
+
+        column_list = ", ".join(columns)
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in columns
+            if column not in primary_key
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {schema}.{table} ({column_list})
+            SELECT {column_list} FROM {staging_table}
+            ON CONFLICT ({', '.join(primary_key)}) DO UPDATE SET {updates}
+            """,  # noqa: S608
+        )
 
-            while data := file.read():
-                copy.write(data)
+        logger.info("Merged %s records into table: %s", cursor.rowcount, table)
 
-        logger.info("Successfully loaded data for table: %s", table)
+        # Dropped now, as the next extract loaded in this transaction needs one too
+        cursor.execute(f"DROP TABLE {staging_table}")
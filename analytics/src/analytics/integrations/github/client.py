@@ -1,14 +1,46 @@
 """Expose a client for making calls to GitHub's GraphQL API."""
 
+import hashlib
+import json
 import logging
+import time
+from pathlib import Path
 from typing import Any
 
 import requests
+from pydantic import Field
+from pydantic_settings import BaseSettings
+from requests.adapters import HTTPAdapter
 
 from config import get_db_settings
 
 logger = logging.getLogger(__name__)
 
+# Status codes that are worth retrying after a backoff
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# When fewer than this many requests remain in the rate limit window,
+# spread the remaining requests out evenly until the window resets
+RATE_LIMIT_LOW_WATERMARK = 100
+
+
+class GitHubClientConfig(BaseSettings):
+    """Configure how the GraphQL client connects to GitHub."""
+
+    endpoint: str = Field(
+        default="https://api.github.com/graphql",
+        alias="GITHUB_GRAPHQL_ENDPOINT",
+    )
+    max_concurrency: int = Field(default=4, alias="GITHUB_MAX_CONCURRENCY")
+    max_retries: int = Field(default=5, alias="GITHUB_MAX_RETRIES")
+    backoff_seconds: float = Field(default=1.0, alias="GITHUB_BACKOFF_SECONDS")
+    max_backoff_seconds: float = Field(default=60.0, alias="GITHUB_MAX_BACKOFF_SECONDS")
+    page_cache_dir: str | None = Field(default=None, alias="GITHUB_PAGE_CACHE_DIR")
+    page_cache_ttl_seconds: int = Field(
+        default=6 * 60 * 60,
+        alias="GITHUB_PAGE_CACHE_TTL_SECONDS",
+    )
+
 
 class GraphqlError(Exception):
     """
@@ -30,6 +62,46 @@ class GraphqlError(Exception):
         super().__init__(self.message)
 
 
+class PageCache:
+    """
+    Cache responses from the GraphQL API on disk.
+
+    Each response is stored in its own file, keyed by a hash of the query and its
+    variables (including the pagination cursor), so a rerun after a partial failure
+    only fetches the pages that weren't already downloaded. Entries older than the
+    TTL are ignored so that a later run picks up new changes.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: int) -> None:
+        """Initialize the cache, creating the cache directory if needed."""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, query: str, variables: dict[str, Any]) -> dict | None:
+        """Return the cached response for this query, if there is a fresh one."""
+        path = self._path(query, variables)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, query: str, variables: dict[str, Any], response: dict) -> None:
+        """Cache a response, writing it atomically so readers never see a partial file."""
+        path = self._path(query, variables)
+        temp_path = path.with_suffix(f".{time.monotonic_ns()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(response, f)
+        temp_path.replace(path)
+
+    def _path(self, query: str, variables: dict[str, Any]) -> Path:
+        key = json.dumps({"query": query, "variables": variables}, sort_keys=True)
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+
 class GitHubGraphqlClient:
     """
     A client to interact with GitHub's GraphQL API.
@@ -52,13 +124,31 @@ class GitHubGraphqlClient:
 
         """
         settings = get_db_settings()
-        self.endpoint = "https://api.github.com/graphql"
+        self.config = GitHubClientConfig()
+        self.endpoint = self.config.endpoint
+        self.max_concurrency = self.config.max_concurrency
         self.headers = {
             "Authorization": f"Bearer {settings.github_token}",
             "Content-Type": "application/json",
             "GraphQL-Features": "sub_issues,issue_types",
         }
 
+        # Reuse connections across requests, with enough of them in the pool
+        # for each of the concurrent exports to keep its own connection open
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_concurrency,
+            pool_maxsize=self.max_concurrency,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.page_cache = (
+            PageCache(self.config.page_cache_dir, self.config.page_cache_ttl_seconds)
+            if self.config.page_cache_dir
+            else None
+        )
+
     def execute_query(self, query: str, variables: dict[str, str | int]) -> dict:
         """
         Make a POST request to the GitHub GraphQL API.
@@ -75,14 +165,29 @@ class GitHubGraphqlClient:
         dict
             The JSON response from the API.
 
+        Requests that hit a rate limit, or fail with a transient server error,
+        are retried after backing off.
+
         """
-        response = requests.post(
-            self.endpoint,
-            headers=self.headers,
-            json={"query": query, "variables": variables},
-            timeout=60,
-        )
+        for attempt in range(self.config.max_retries + 1):
+            response = self.session.post(
+                self.endpoint,
+                headers=self.headers,
+                json={"query": query, "variables": variables},
+                timeout=60,
+            )
+            wait = self._get_retry_wait(response, attempt)
+            if wait is None or attempt == self.config.max_retries:
+                break
+            logger.warning(
+                "GitHub returned %s, retrying in %.1f seconds",
+                response.status_code,
+                wait,
+            )
+            time.sleep(wait)
+
         response.raise_for_status()
+        self._throttle(response)
         result = response.json()
         if "errors" in result:
             raise GraphqlError(result["errors"])
@@ -118,11 +223,11 @@ class GitHubGraphqlClient:
         """
         all_data = []
         has_next_page = True
-        variables["batch"] = batch_size
-        variables["endCursor"] = None
+        # Copy the variables so concurrent queries don't share a cursor
+        variables = {**variables, "batch": batch_size, "endCursor": None}
 
         while has_next_page:
-            response = self.execute_query(query, variables)
+            response = self._execute_cached_query(query, variables)
             data = response["data"]
 
             # Traverse the data path to extract nodes
@@ -137,3 +242,58 @@ class GitHubGraphqlClient:
             variables["endCursor"] = page_info["endCursor"]
 
         return all_data
+
+    def _execute_cached_query(self, query: str, variables: dict[str, Any]) -> dict:
+        """Return a cached response for this query, or execute it and cache it."""
+        if self.page_cache is None:
+            return self.execute_query(query, variables)
+
+        response = self.page_cache.get(query, variables)
+        if response is None:
+            response = self.execute_query(query, variables)
+            self.page_cache.put(query, variables, response)
+        return response
+
+    def _get_retry_wait(
+        self,
+        response: requests.Response,
+        attempt: int,
+    ) -> float | None:
+        """Return how long to wait before retrying a request, or None if it succeeded."""
+        headers = response.headers
+
+        # Secondary rate limits tell us exactly how long to wait
+        if response.status_code in (403, 429) and "Retry-After" in headers:
+            return float(headers["Retry-After"])
+
+        # Primary rate limits tell us when the window resets
+        if (
+            response.status_code in (403, 429)
+            and headers.get("X-RateLimit-Remaining") == "0"
+        ):
+            reset = float(headers.get("X-RateLimit-Reset", time.time()))
+            return max(reset - time.time(), 0) + 1
+
+        # Otherwise back off exponentially on transient errors
+        if response.status_code in RETRY_STATUS_CODES:
+            backoff = self.config.backoff_seconds * 2**attempt
+            return min(backoff, self.config.max_backoff_seconds)
+
+        return None
+
+    def _throttle(self, response: requests.Response) -> None:
+        """Slow down when the rate limit is nearly used up, rather than hitting it."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if (
+            remaining is None
+            or reset is None
+            or int(remaining) >= RATE_LIMIT_LOW_WATERMARK
+        ):
+            return
+
+        # Spread the remaining requests evenly across the rest of the window
+        window = max(float(reset) - time.time(), 0)
+        wait = min(window / max(int(remaining), 1), self.config.max_backoff_seconds)
+        logger.info("%s GitHub requests left, waiting %.1f seconds", remaining, wait)
+        time.sleep(wait)
@@ -103,8 +103,14 @@ def export_sprint_data_to_object(
     project: int,
     sprint_field: str,
     points_field: str,
+    updated_since: str | None = None,
 ) -> list[dict]:
-    """Export the issue and project data from a Sprint Board."""
+    """
+    Export the issue and project data from a Sprint Board.
+
+    If updated_since is a YYYY-MM-DD date, only items updated on or after
+    that date are exported.
+    """
     # Load query
     query_path = PARENT_DIR / "getSprintData.graphql"
     with open(query_path) as f:
@@ -116,6 +122,7 @@ def export_sprint_data_to_object(
         "project": project,
         "sprintField": sprint_field,
         "pointsField": points_field,
+        "query": _build_updated_since_filter(updated_since),
     }
 
     # Execute query
@@ -164,8 +171,14 @@ def export_roadmap_data_to_object(
     project: int,
     quad_field: str,
     pillar_field: str,
+    updated_since: str | None = None,
 ) -> list[dict]:
-    """Export the epic and deliverable data from GitHub."""
+    """
+    Export the epic and deliverable data from GitHub.
+
+    If updated_since is a YYYY-MM-DD date, only items updated on or after
+    that date are exported.
+    """
     # Load query
     query_path = PARENT_DIR / "getRoadmapData.graphql"
     with open(query_path) as f:
@@ -177,6 +190,7 @@ def export_roadmap_data_to_object(
         "project": project,
         "quadField": quad_field,
         "pillarField": pillar_field,
+        "query": _build_updated_since_filter(updated_since),
     }
 
     # Execute query
@@ -188,3 +202,10 @@ def export_roadmap_data_to_object(
 
     # Transform data
     return transform_project_data(data, owner, project)
+
+
+def _build_updated_since_filter(updated_since: str | None) -> str | None:
+    """Build a project items filter for items updated on or after a date."""
+    if updated_since is None:
+        return None
+    return f"updated:>={updated_since}"
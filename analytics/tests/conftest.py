@@ -39,13 +39,19 @@ LABEL_10K = "deliverable: 10k ft"
 
 
 def pytest_addoption(parser: pytest.Parser):
-    """Add a command line flag to collect tests that require a slack token."""
+    """Add command line flags to collect tests that are skipped by default."""
     parser.addoption(
         "--slack-token-set",
         action="store_true",
         default=False,
         help="Run tests that require a slack token",
     )
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run benchmarks, which are slow and assert on timings",
+    )
 
 
 class MockSlackbot:
@@ -353,6 +359,7 @@ def create_test_db(test_schema: str) -> EtlDb:
         _create_schema(conn, test_schema)
 
         _create_opportunity_table(conn, test_schema)
+        _create_github_tables(conn, test_schema)
         try:
             yield etldb_conn
 
@@ -386,7 +393,7 @@ def _create_opportunity_table(conn: EtlDb.connection, schema: str) -> None:
         # Get the path of the current file (test file)
         test_file_path = Path(__file__).resolve()
 
-        # Construct the path to the SQL file
+        # Construct the path to the SQL files
         sql_file_path = (
             test_file_path.parent.parent
             / "src"
@@ -395,11 +402,41 @@ def _create_opportunity_table(conn: EtlDb.connection, schema: str) -> None:
             / "etldb"
             / "migrations"
             / "versions"
-            / "0007_add_opportunity_tables.sql"
         )
 
-        with open(sql_file_path) as file:
-            create_table_commands = file.read()
-            conn.execute(text(create_table_commands))
+        for migration in [
+            "0007_add_opportunity_tables.sql",
+            "0008_create_opportunity_extract_load.sql",
+        ]:
+            with open(sql_file_path / migration) as file:
+                create_table_commands = file.read()
+                conn.execute(text(create_table_commands))
 
     logger.info("Created opportunity tables")
+
+
+def _create_github_tables(conn: EtlDb.connection, schema: str) -> None:
+    """Create the tables github data is synced to."""
+    migrations_path = (
+        Path(__file__).resolve().parent.parent
+        / "src"
+        / "analytics"
+        / "integrations"
+        / "etldb"
+        / "migrations"
+        / "versions"
+    )
+    migrations = [
+        "0002_create_tables_etldb.sql",
+        "0004_alter_tables_set_default_timestamp.sql",
+        "0005_create_tables_deliv_hist_and_project.sql",
+        "0006_add_proj_col_to_issue_hist.sql",
+    ]
+
+    with conn.begin():
+        conn.execute(text(f"SET search_path TO {schema};"))
+        for migration in migrations:
+            with open(migrations_path / migration) as file:
+                conn.execute(text(file.read()))
+
+    logger.info("Created github tables")
@@ -3,6 +3,7 @@
 from pathlib import Path  # noqa: I001
 
 import pandas as pd
+import pytest
 
 from analytics.datasets.base import BaseDataset
 
@@ -37,3 +38,10 @@ def test_to_and_from_dict():
     dict_out = dataset.to_dict()
     # validation
     assert dict_in == dict_out
+
+
+def test_to_sql_rejects_upsert_when_replacing_table():
+    """BaseDataset.to_sql() should only upsert rows into an existing table."""
+    dataset = BaseDataset(pd.DataFrame(TEST_DATA))
+    with pytest.raises(ValueError, match="existing table"):
+        dataset.to_sql("test_table", engine=None, upsert_keys=["Col A"])
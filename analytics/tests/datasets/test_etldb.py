@@ -1,7 +1,13 @@
 """Tests the code in datasets/etl_dataset.py."""
 
+import logging
+import time
+
+import pytest
 from analytics.datasets.etl_dataset import EtlDataset
 
+logger = logging.getLogger(__name__)
+
 
 class TestEtlDataset:
     """Test EtlDataset methods."""
@@ -97,3 +103,137 @@ class TestEtlDataset:
 
         project = dataset.get_project(ghid)
         assert project["project_name"] == "HHS"
+
+
+def synthetic_export(row_count: int) -> list[dict]:
+    """Create data shaped like a GitHub export, with each issue in two projects."""
+    rows = []
+    for i in range(row_count):
+        issue = i // 2
+        epic = issue // 50
+        deliverable = epic // 10
+        sprint = issue % 26
+        rows.append(
+            {
+                "project_owner": "HHS",
+                "project_number": 13 + 4 * (i % 2),
+                "issue_title": f"Issue {issue}",
+                "issue_url": f"https://github.com/HHS/repo/issues/{issue}",
+                "issue_parent": f"https://github.com/HHS/repo/epics/{epic}",
+                "issue_type": "Task",
+                "issue_is_closed": issue % 3 == 0,
+                "issue_opened_at": "2024-11-07",
+                "issue_closed_at": None,
+                "issue_points": float(issue % 5),
+                "issue_status": ("Todo", "In Progress", "Done")[issue % 3],
+                "sprint_id": f"sprint{sprint}",
+                "sprint_name": f"Sprint {sprint}",
+                "sprint_start": "2024-10-30",
+                "sprint_length": 14.0,
+                "sprint_end": "2024-11-13",
+                "quad_id": f"quad{deliverable % 4}",
+                "quad_name": f"Quad {deliverable % 4}",
+                "quad_start": "2024-09-09",
+                "quad_length": 122.0,
+                "quad_end": "2025-01-09",
+                "deliverable_pillar": "SimplerFind",
+                "deliverable_url": f"https://github.com/HHS/repo/deliverables/{deliverable}",
+                "deliverable_title": f"Deliverable {deliverable}",
+                "deliverable_status": "In Progress",
+                "epic_url": f"https://github.com/HHS/repo/epics/{epic}",
+                "epic_title": f"Epic {epic}",
+            },
+        )
+    return rows
+
+
+benchmark = pytest.mark.skipif(
+    "not config.getoption('--run-benchmarks')",
+    reason="benchmarks only run with --run-benchmarks",
+)
+
+
+@pytest.fixture(name="dataset", scope="module")
+def synthetic_dataset() -> EtlDataset:
+    """Load a small synthetic dataset once for every lookup test."""
+    return EtlDataset.load_from_json_object(
+        synthetic_export(TestEtlDatasetLookups.ROW_COUNT),
+    )
+
+
+@pytest.fixture(name="benchmark_dataset", scope="module")
+def synthetic_benchmark_dataset() -> EtlDataset:
+    """Load a large synthetic dataset once for every benchmark."""
+    return EtlDataset.load_from_json_object(
+        synthetic_export(TestEtlDatasetBenchmark.ROW_COUNT),
+    )
+
+
+class TestEtlDatasetLookups:
+    """Test EtlDataset lookups on a synthetic dataset."""
+
+    ROW_COUNT = 200
+
+    def test_indexed_lookup_matches_scan(self, dataset: EtlDataset):
+        """Indexed lookups should return the same rows as filtering the full dataset."""
+        for ghid in dataset.get_issue_ghids():
+            scan = dataset.df.query(f"issue_ghid == '{ghid}'")
+            index = dataset.get_issues(ghid)
+            assert scan.equals(index)
+
+    def test_repeated_strings_are_categorical(self, dataset: EtlDataset):
+        """Columns of repeated strings should be stored as categories."""
+        for col in EtlDataset.CATEGORICAL_COLUMNS:
+            assert dataset.df[col].dtype == "category"
+
+
+@benchmark
+class TestEtlDatasetBenchmark:
+    """Benchmark EtlDataset lookups on a large synthetic dataset."""
+
+    ROW_COUNT = 50_000
+
+    def test_lookup_every_entity(self, benchmark_dataset: EtlDataset):
+        """Looking up every entity by ghid should take time linear in the dataset size."""
+        dataset = benchmark_dataset
+        start = time.monotonic()
+        issue_rows = sum(len(dataset.get_issues(g)) for g in dataset.get_issue_ghids())
+        for ghid in dataset.get_epic_ghids():
+            dataset.get_epic(ghid)
+        for ghid in dataset.get_deliverable_ghids():
+            dataset.get_deliverable(ghid)
+        for ghid in dataset.get_sprint_ghids():
+            dataset.get_sprint(ghid)
+        elapsed = time.monotonic() - start
+
+        logger.info(
+            "Looked up every entity in %d rows in %.2fs",
+            self.ROW_COUNT,
+            elapsed,
+        )
+        assert issue_rows == self.ROW_COUNT
+        assert len(dataset.get_issue_ghids()) == self.ROW_COUNT // 2
+
+    def test_indexed_lookup_is_faster_than_scan(self, benchmark_dataset: EtlDataset):
+        """Indexed lookups should beat filtering the full dataset for each ghid."""
+        dataset = benchmark_dataset
+        ghids = dataset.get_issue_ghids()[:: len(dataset.get_issue_ghids()) // 100]
+
+        start = time.monotonic()
+        for ghid in ghids:
+            dataset.df.query(f"issue_ghid == '{ghid}'")
+        scan_elapsed = time.monotonic() - start
+
+        start = time.monotonic()
+        for ghid in ghids:
+            dataset.get_issues(ghid)
+        indexed_elapsed = time.monotonic() - start
+
+        logger.info(
+            "Fetched %d issues from %d rows in %.4fs by scan, %.4fs by index",
+            len(ghids),
+            self.ROW_COUNT,
+            scan_elapsed,
+            indexed_elapsed,
+        )
+        assert indexed_elapsed < scan_elapsed
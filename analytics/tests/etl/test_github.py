@@ -2,6 +2,7 @@
 # pylint: disable=protected-access
 """Test the GitHubProjectETL class."""
 
+from datetime import timedelta
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -12,6 +13,7 @@ from analytics.etl.github import (
     GitHubProjectConfig,
     GitHubProjectETL,
     InputFiles,
+    ProjectSnapshots,
     RoadmapConfig,
     SprintBoardConfig,
     get_parent_with_type,
@@ -210,6 +212,63 @@ class TestGitHubProjectETL:
         assert etl.dataset.to_dict() == dataset_wanted
 
 
+class TestProjectSnapshots:
+    """Test the snapshots kept on disk for incremental exports."""
+
+    def test_first_export_is_full(self, tmp_path: Path):
+        """Projects without a snapshot should be exported in full."""
+        # Arrange
+        snapshots = ProjectSnapshots(str(tmp_path), full_refresh_days=7)
+        items = [{"issue_url": "issue1", "issue_status": "todo"}]
+        # Act
+        updated_since = snapshots.get_updated_since("sprint-HHS-1")
+        merged = snapshots.merge("sprint-HHS-1", items, updated_since)
+        snapshots.save_state()
+        # Assert
+        assert updated_since is None
+        assert merged == items
+        assert (tmp_path / "sprint-HHS-1.json").exists()
+
+    def test_next_export_merges_updated_items(self, tmp_path: Path):
+        """Items updated since the last export should replace those in the snapshot."""
+        # Arrange - run a full export
+        first = ProjectSnapshots(str(tmp_path), full_refresh_days=7)
+        previous = [
+            {"issue_url": "issue1", "issue_status": "todo"},
+            {"issue_url": "issue2", "issue_status": "todo"},
+        ]
+        first.merge("sprint-HHS-1", previous, None)
+        first.save_state()
+        # Act - run an incremental export
+        second = ProjectSnapshots(str(tmp_path), full_refresh_days=7)
+        updated_since = second.get_updated_since("sprint-HHS-1")
+        updated = [
+            {"issue_url": "issue2", "issue_status": "done"},
+            {"issue_url": "issue3", "issue_status": "todo"},
+        ]
+        merged = second.merge("sprint-HHS-1", updated, updated_since)
+        # Assert
+        wanted_since = first.started_at - timedelta(days=1)
+        assert updated_since == wanted_since.strftime("%Y-%m-%d")
+        assert merged == [
+            {"issue_url": "issue1", "issue_status": "todo"},
+            {"issue_url": "issue2", "issue_status": "done"},
+            {"issue_url": "issue3", "issue_status": "todo"},
+        ]
+
+    def test_export_is_full_after_refresh_interval(self, tmp_path: Path):
+        """Projects should be exported in full once the last full export is too old."""
+        # Arrange
+        first = ProjectSnapshots(str(tmp_path), full_refresh_days=7)
+        first.merge("sprint-HHS-1", [{"issue_url": "issue1"}], None)
+        first.save_state()
+        # Act
+        second = ProjectSnapshots(str(tmp_path), full_refresh_days=7)
+        second.started_at += timedelta(days=8)
+        # Assert
+        assert second.get_updated_since("sprint-HHS-1") is None
+
+
 # ===========================================================
 # Test ETL helper functions
 # ===========================================================
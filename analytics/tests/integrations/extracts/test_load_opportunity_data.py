@@ -1,14 +1,16 @@
 """Tests the code in extracts/load_opportunity_data."""
 
 # pylint: disable=W0613,W0621
+import json
 import os
 import pathlib
 
 import boto3
 import pytest
 
-from sqlalchemy import text  # isort: skip
+from sqlalchemy import Connection, text  # isort: skip
 from analytics.integrations.etldb.etldb import EtlDb
+from analytics.integrations.extracts.constants import OpportunityTables
 from analytics.integrations.extracts.load_opportunity_data import (
     extract_copy_opportunity_data,
 )
@@ -85,5 +87,216 @@ def test_extract_copy_opportunity_data(
         assert opp_smry_result.fetchone()[0] == 32
         assert curr_opp_smry_result.fetchone()[0] == 32
 
+        # the shadow tables the data was loaded into are cleaned up
+        shadow_result = conn.execute(
+            text("SELECT to_regclass('opportunity_shadow') ;"),
+        )
+        assert shadow_result.fetchone()[0] is None
+
     # running again to verify that it does not break on the next call
     extract_copy_opportunity_data()
+
+
+OPPORTUNITY_HEADER = (
+    '"opportunity_id","opportunity_number","opportunity_title","agency_code",'
+    '"opportunity_category_id","category_explanation","is_draft","revision_number",'
+    '"modified_comments","publisher_user_id","publisher_profile_id","created_at",'
+    '"updated_at"'
+)
+
+
+def put_extract(
+    bucket: boto3.resource("s3").Bucket,
+    manifest: dict,
+    files: dict[str, str],
+) -> None:
+    """Upload the files and manifest of an extract, making it the latest."""
+    for file_name, body in files.items():
+        bucket.put_object(Key=f"public-extracts/{file_name}", Body=body.encode())
+
+    body = json.dumps(manifest).encode()
+    bucket.put_object(
+        Key=f"public-extracts/extract_manifest-{manifest['extract_id']}.json",
+        Body=body,
+    )
+    bucket.put_object(Key="public-extracts/extract_manifest.json", Body=body)
+
+
+def put_full_extract(bucket: boto3.resource("s3").Bucket) -> None:
+    """Upload a manifest for the full extract of the test files."""
+    manifest = {
+        "extract_id": "full-1",
+        "base_extract_id": None,
+        "is_incremental": False,
+        "tables": {table: {"file_name": f"{table}.csv"} for table in OpportunityTables},
+    }
+    put_extract(bucket, manifest, {})
+
+
+def put_incremental_extracts(bucket: boto3.resource("s3").Bucket) -> None:
+    """Upload two incremental extracts, the first building on the full extract."""
+    put_extract(
+        bucket,
+        {
+            "extract_id": "inc-1",
+            "base_extract_id": "full-1",
+            "is_incremental": True,
+            "tables": {
+                "opportunity": {
+                    "file_name": "opportunity.changes-inc-1.csv",
+                    "deleted_file_name": "opportunity.deleted-inc-1.csv",
+                },
+            },
+        },
+        {
+            "opportunity.changes-inc-1.csv": f"{OPPORTUNITY_HEADER}\n"
+            '1,"USAID-SAF-92-925","An updated title","USDA-FS",2,,false,0,,,,'
+            '"2024-12-06 20:25:05.164842+00","2024-12-10 20:25:05.164842+00"\n',
+            "opportunity.deleted-inc-1.csv": '"opportunity_id"\n30\n',
+        },
+    )
+    put_extract(
+        bucket,
+        {
+            "extract_id": "inc-2",
+            "base_extract_id": "inc-1",
+            "is_incremental": True,
+            "tables": {
+                "opportunity": {
+                    "file_name": "opportunity.changes-inc-2.csv",
+                    "deleted_file_name": "opportunity.deleted-inc-2.csv",
+                },
+            },
+        },
+        {
+            "opportunity.changes-inc-2.csv": f"{OPPORTUNITY_HEADER}\n"
+            '38,"NEW-OPP-1","A new opportunity","USDA-FS",1,,false,0,,,,'
+            '"2024-12-10 20:25:05.164842+00","2024-12-10 20:25:05.164842+00"\n',
+            "opportunity.deleted-inc-2.csv": '"opportunity_id"\n29\n',
+        },
+    )
+
+
+def select_loaded_state(conn: Connection) -> tuple[dict, str | None]:
+    """Select the titles of the loaded opportunities and the id of the extract loaded."""
+    with conn.begin():
+        opportunities = dict(
+            conn.execute(
+                text("SELECT opportunity_id, opportunity_title FROM opportunity ;"),
+            ).fetchall(),
+        )
+        extract_id = conn.execute(
+            text("SELECT extract_id FROM opportunity_extract_load ;"),
+        ).scalar()
+
+    return opportunities, extract_id
+
+
+@pytest.mark.usefixtures("upload_opportunity_tables_s3")
+def test_extract_copy_opportunity_data_incremental(
+    create_test_db: EtlDb,
+    test_schema: str,
+    monkeypatch: pytest.MonkeyPatch,
+    monkeypatch_session: pytest.MonkeyPatch,
+    mock_s3_bucket: str,
+    mock_s3_bucket_resource: boto3.resource("s3").Bucket,
+):
+    """Test every incremental extract since the last one loaded is merged in, in order."""
+    monkeypatch.setenv("DB_SCHEMA", test_schema)
+    monkeypatch_session.setenv(
+        "API_ANALYTICS_DB_EXTRACTS_PATH",
+        f"S3://{mock_s3_bucket}/public-extracts",
+    )
+    conn = create_test_db.connection()
+
+    # Load the full extract first
+    put_full_extract(mock_s3_bucket_resource)
+    extract_copy_opportunity_data()
+    opportunities, extract_id = select_loaded_state(conn)
+    assert len(opportunities) == 37
+    assert extract_id == "full-1"
+
+    # Two incremental extracts run before the next load, which applies both
+    put_incremental_extracts(mock_s3_bucket_resource)
+    extract_copy_opportunity_data()
+
+    opportunities, extract_id = select_loaded_state(conn)
+    assert len(opportunities) == 36
+    assert opportunities[1] == "An updated title"
+    assert opportunities[38] == "A new opportunity"
+    assert 30 not in opportunities
+    assert 29 not in opportunities
+    assert extract_id == "inc-2"
+
+    # other tables are untouched
+    with conn.begin():
+        opp_smry_result = conn.execute(
+            text("SELECT COUNT(*) FROM opportunity_summary ;"),
+        )
+        assert opp_smry_result.fetchone()[0] == 32
+
+    # Loading again changes nothing
+    extract_copy_opportunity_data()
+    assert select_loaded_state(conn) == (opportunities, "inc-2")
+
+
+@pytest.mark.usefixtures("upload_opportunity_tables_s3")
+def test_extract_copy_opportunity_data_incremental_without_loaded_base(
+    create_test_db: EtlDb,
+    test_schema: str,
+    monkeypatch: pytest.MonkeyPatch,
+    monkeypatch_session: pytest.MonkeyPatch,
+    mock_s3_bucket: str,
+    mock_s3_bucket_resource: boto3.resource("s3").Bucket,
+):
+    """Test the full extract the incremental extracts build on is loaded first."""
+    monkeypatch.setenv("DB_SCHEMA", test_schema)
+    monkeypatch_session.setenv(
+        "API_ANALYTICS_DB_EXTRACTS_PATH",
+        f"S3://{mock_s3_bucket}/public-extracts",
+    )
+    conn = create_test_db.connection()
+    with conn.begin():
+        conn.execute(text("UPDATE opportunity_extract_load SET extract_id = 'other'"))
+        conn.execute(text("UPDATE opportunity SET opportunity_title = 'Stale'"))
+
+    put_full_extract(mock_s3_bucket_resource)
+    put_incremental_extracts(mock_s3_bucket_resource)
+    extract_copy_opportunity_data()
+
+    opportunities, extract_id = select_loaded_state(conn)
+    assert len(opportunities) == 36
+    assert "Stale" not in opportunities.values()
+    assert opportunities[1] == "An updated title"
+    assert opportunities[38] == "A new opportunity"
+    assert extract_id == "inc-2"
+
+
+@pytest.mark.usefixtures("upload_opportunity_tables_s3")
+def test_extract_copy_opportunity_data_incremental_missing_base(
+    create_test_db: EtlDb,
+    test_schema: str,
+    monkeypatch: pytest.MonkeyPatch,
+    monkeypatch_session: pytest.MonkeyPatch,
+    mock_s3_bucket: str,
+    mock_s3_bucket_resource: boto3.resource("s3").Bucket,
+):
+    """Test nothing is loaded when an extract between the last loaded and latest is missing."""
+    monkeypatch.setenv("DB_SCHEMA", test_schema)
+    monkeypatch_session.setenv(
+        "API_ANALYTICS_DB_EXTRACTS_PATH",
+        f"S3://{mock_s3_bucket}/public-extracts",
+    )
+    conn = create_test_db.connection()
+    with conn.begin():
+        conn.execute(text("UPDATE opportunity_extract_load SET extract_id = 'full-1'"))
+    loaded_state = select_loaded_state(conn)
+
+    put_incremental_extracts(mock_s3_bucket_resource)
+    missing_manifest_key = "public-extracts/extract_manifest-inc-1.json"
+    mock_s3_bucket_resource.Object(missing_manifest_key).delete()
+
+    with pytest.raises(RuntimeError, match="Extract inc-1 is missing"):
+        extract_copy_opportunity_data()
+
+    assert select_loaded_state(conn) == loaded_state
@@ -0,0 +1,100 @@
+"""Create a fake GitHub GraphQL server for testing and benchmarking the client."""
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@dataclass
+class FakeGraphqlServer:
+    """
+    State shared between a test and the fake GraphQL server.
+
+    Every project has the same number of pages of items, and each response is
+    delayed by the given latency to simulate the round trip to GitHub. Queued
+    errors are returned, in order, before any successful responses.
+    """
+
+    url: str = ""
+    pages_per_project: int = 3
+    items_per_page: int = 2
+    latency_seconds: float = 0.0
+    queued_errors: list[tuple[int, dict[str, str]]] = field(default_factory=list)
+    request_count: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def respond(self, variables: dict) -> tuple[int, dict[str, str], dict]:
+        """Build the response to a query for one page of a project's items."""
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self.lock:
+            self.request_count += 1
+            if self.queued_errors:
+                status, headers = self.queued_errors.pop(0)
+                return status, headers, {"message": "rate limited"}
+
+        project = variables["project"]
+        page = int(variables["endCursor"] or 0)
+        nodes = [
+            {"project": project, "page": page, "item": i}
+            for i in range(self.items_per_page)
+        ]
+        has_next_page = page + 1 < self.pages_per_project
+        body = {
+            "data": {
+                "organization": {
+                    "projectV2": {
+                        "items": {
+                            "nodes": nodes,
+                            "pageInfo": {
+                                "hasNextPage": has_next_page,
+                                "endCursor": str(page + 1) if has_next_page else None,
+                            },
+                        },
+                    },
+                },
+            },
+        }
+        headers = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "0"}
+        return 200, headers, body
+
+
+@pytest.fixture(name="fake_graphql_server")
+def fake_graphql_server_fixture(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Iterator[FakeGraphqlServer]:
+    """Run a fake GraphQL server and point the client at it."""
+    state = FakeGraphqlServer()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            length = int(self.headers["Content-Length"])
+            payload = json.loads(self.rfile.read(length))
+            status, headers, body = state.respond(payload["variables"])
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args: object) -> None:
+            """Silence the default request logging."""
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    state.url = f"http://127.0.0.1:{server.server_port}/graphql"
+    monkeypatch.setenv("GITHUB_GRAPHQL_ENDPOINT", state.url)
+    yield state
+
+    server.shutdown()
+    server.server_close()
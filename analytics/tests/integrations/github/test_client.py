@@ -1,10 +1,18 @@
 """Test the GitHubGraphqlClient class."""
 
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 from analytics.integrations.github.client import GitHubGraphqlClient, GraphqlError
 
+from tests.integrations.github.conftest import FakeGraphqlServer
+
+PATH_TO_ITEMS = ["organization", "projectV2", "items"]
+
 
 @pytest.fixture(name="client")
 def mock_client() -> GitHubGraphqlClient:
@@ -32,14 +40,14 @@ def mock_query() -> str:
     """
 
 
-@patch("requests.post")  # Mocks the requests.post() method
+@patch("requests.Session.post")  # Mocks the session.post() method
 def test_paginated_query_success(
     mock_post: Mock,
     client: GitHubGraphqlClient,
     sample_query: str,
 ) -> None:
     """Test successfully making a paginated call and extracting data."""
-    # Arrange - Mock the response from requests.post()
+    # Arrange - Mock the response from session.post()
     mock_response = {
         "data": {
             "user": {
@@ -52,6 +60,7 @@ def test_paginated_query_success(
     }
     mock_post.return_value = Mock(
         status_code=200,
+        headers={},
         json=Mock(return_value=mock_response),
     )
 
@@ -67,14 +76,14 @@ def test_paginated_query_success(
     assert result == [{"name": "repo1"}]
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_invalid_path_to_nodes(
     mock_post: Mock,
     client: GitHubGraphqlClient,
     sample_query: str,
 ) -> None:
     """Test catching an error if the path_to_nodes is incorrect."""
-    # Arrange - Mock the response from requests.post()
+    # Arrange - Mock the response from session.post()
     mock_response = {
         "data": {
             "user": {
@@ -87,6 +96,7 @@ def test_invalid_path_to_nodes(
     }
     mock_post.return_value = Mock(
         status_code=200,
+        headers={},
         json=Mock(return_value=mock_response),
     )
 
@@ -99,16 +109,17 @@ def test_invalid_path_to_nodes(
         client.execute_paginated_query(sample_query, variables, path_to_nodes)
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_graphql_error(
     mock_post: Mock,
     client: GitHubGraphqlClient,
     sample_query: str,
 ) -> None:
     """Test raising a GraphqlError if errors are present in the response."""
-    # Arrange - Mock the response from requests.post() to include an error
+    # Arrange - Mock the response from session.post() to include an error
     mock_post.return_value = Mock(
         status_code=200,
+        headers={},
         json=Mock(return_value={"errors": [{"message": "Test GitHub error"}]}),
     )
 
@@ -122,3 +133,109 @@ def test_graphql_error(
 
     # Assert - Check that it contains the error message from the mock response
     assert "Test GitHub error" in str(excinfo.value)
+
+
+def test_paginated_query_against_server(
+    fake_graphql_server: FakeGraphqlServer,
+    sample_query: str,
+) -> None:
+    """Test fetching every page of results from the fake GraphQL server."""
+    # Act
+    client = GitHubGraphqlClient()
+    result = client.execute_paginated_query(sample_query, {"project": 1}, PATH_TO_ITEMS)
+
+    # Assert - Check that every page was fetched, in order
+    assert [(node["page"], node["item"]) for node in result] == [
+        (0, 0),
+        (0, 1),
+        (1, 0),
+        (1, 1),
+        (2, 0),
+        (2, 1),
+    ]
+    assert fake_graphql_server.request_count == 3
+
+
+def test_page_cache_skips_downloaded_pages(
+    fake_graphql_server: FakeGraphqlServer,
+    sample_query: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that rerunning a query reads its pages from the cache."""
+    # Arrange
+    monkeypatch.setenv("GITHUB_PAGE_CACHE_DIR", str(tmp_path))
+    client = GitHubGraphqlClient()
+    first = client.execute_paginated_query(sample_query, {"project": 1}, PATH_TO_ITEMS)
+
+    # Act - Rerun the same query, then a query for a different project
+    second = client.execute_paginated_query(sample_query, {"project": 1}, PATH_TO_ITEMS)
+    client.execute_paginated_query(sample_query, {"project": 2}, PATH_TO_ITEMS)
+
+    # Assert - Only the query for the new project went to the server
+    assert second == first
+    assert fake_graphql_server.request_count == 6
+    assert len(list(tmp_path.glob("*.json"))) == 6
+
+
+def test_retry_after_rate_limit(
+    fake_graphql_server: FakeGraphqlServer,
+    sample_query: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the client waits as long as GitHub asks before retrying."""
+    # Arrange - Hit a secondary rate limit, then a transient server error
+    fake_graphql_server.queued_errors = [(429, {"Retry-After": "7"}), (502, {})]
+    sleeps: list[float] = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    monkeypatch.setenv("GITHUB_BACKOFF_SECONDS", "0.5")
+
+    # Act
+    client = GitHubGraphqlClient()
+    result = client.execute_paginated_query(sample_query, {"project": 1}, PATH_TO_ITEMS)
+
+    # Assert - Check the waits, and that every page was still fetched
+    assert sleeps == [7.0, 1.0]
+    assert len(result) == 6
+
+
+def test_benchmark_concurrent_projects(
+    fake_graphql_server: FakeGraphqlServer,
+    sample_query: str,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Benchmark exporting several projects one after another vs concurrently."""
+    # Arrange - Simulate the round trip to GitHub
+    fake_graphql_server.latency_seconds = 0.05
+    fake_graphql_server.pages_per_project = 5
+    projects = [1, 2, 3, 4]
+    client = GitHubGraphqlClient()
+
+    def export(project: int) -> list[dict]:
+        return client.execute_paginated_query(
+            sample_query,
+            {"project": project},
+            PATH_TO_ITEMS,
+        )
+
+    # Act
+    start = time.monotonic()
+    sequential = [export(project) for project in projects]
+    sequential_seconds = time.monotonic() - start
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=client.max_concurrency) as executor:
+        concurrent = list(executor.map(export, projects))
+    concurrent_seconds = time.monotonic() - start
+
+    with caplog.at_level(logging.INFO):
+        logging.getLogger(__name__).info(
+            "Exported %d projects in %.2fs sequentially, %.2fs concurrently",
+            len(projects),
+            sequential_seconds,
+            concurrent_seconds,
+        )
+
+    # Assert
+    assert concurrent == sequential
+    assert concurrent_seconds < sequential_seconds
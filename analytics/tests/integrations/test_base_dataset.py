@@ -0,0 +1,79 @@
+"""Test writing BaseDataset to and reading it from the database."""
+
+import uuid
+from collections.abc import Iterator
+
+import pandas as pd
+import pytest
+from analytics.datasets.base import BaseDataset
+from analytics.integrations.db import PostgresDbClient
+from sqlalchemy import Engine, text
+
+TEST_DATA = [
+    {"id": 1, "name": "One", "points": 1.5, "is_done": True},
+    {"id": 2, "name": "", "points": None, "is_done": False},
+    {"id": 3, "name": None, "points": 3.0, "is_done": True},
+]
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Engine:
+    """Return an engine connected to the test database."""
+    return PostgresDbClient().engine()
+
+
+@pytest.fixture(name="table")
+def table_fixture(engine: Engine) -> Iterator[str]:
+    """Return the name of a table that is dropped after the test."""
+    table_name = f"test_dataset_{uuid.uuid4().hex}"
+    yield table_name
+    with engine.begin() as conn:
+        conn.execute(text(f"drop table if exists {table_name}"))
+
+
+@pytest.mark.parametrize("method", ["insert", "copy", "copy_binary"])
+def test_to_and_from_sql(engine: Engine, table: str, method: str):
+    """Every write method should round trip the dataset, including nulls and empty strings."""
+    dataset_in = BaseDataset(pd.DataFrame(TEST_DATA))
+    # execution - write the table twice, replacing then appending
+    dataset_in.to_sql(table, engine, method=method)
+    dataset_in.to_sql(table, engine, method=method, replace_table=False)
+    dataset_out = BaseDataset.from_sql(table, engine)
+    # validation
+    expected = pd.concat([dataset_in.df, dataset_in.df], ignore_index=True)
+    pd.testing.assert_frame_equal(dataset_out.df, expected)
+
+
+def test_to_sql_upserts_existing_rows(engine: Engine, table: str):
+    """Rows with the same keys should be updated rather than duplicated."""
+    BaseDataset(pd.DataFrame(TEST_DATA)).to_sql(table, engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"alter table {table} add primary key (id)"))
+    # execution - update one existing row and add a new one
+    changes = pd.DataFrame(
+        [
+            {"id": 1, "name": "Uno", "points": 1.0, "is_done": False},
+            {"id": 4, "name": "Four", "points": 4.0, "is_done": True},
+        ],
+    )
+    BaseDataset(changes).to_sql(table, engine, replace_table=False, upsert_keys=["id"])
+    # validation
+    df = BaseDataset.from_sql(table, engine).df.set_index("id").sort_index()
+    assert df.index.tolist() == [1, 2, 3, 4]
+    assert df.loc[1, "name"] == "Uno"
+    assert df.loc[4, "points"] == 4.0
+
+
+def test_from_sql_in_chunks(engine: Engine, table: str):
+    """Streaming the table in chunks should return the same rows as reading it at once."""
+    dataset_in = BaseDataset(pd.DataFrame(TEST_DATA))
+    dataset_in.to_sql(table, engine)
+    # execution
+    chunks = list(BaseDataset.iter_from_sql(table, engine, chunksize=2))
+    dataset_out = BaseDataset.from_sql(table, engine, chunksize=2)
+    # validation
+    assert [len(chunk.df) for chunk in chunks] == [2, 1]
+    pd.testing.assert_frame_equal(
+        dataset_out.df,
+        BaseDataset.from_sql(table, engine).df,
+    )
@@ -0,0 +1,544 @@
+"""
+Tests the batch sync methods of the etldb models.
+
+Each test states the rows, ghid maps and counts that syncing the same frames
+one row at a time produced, so the batch path is held to the same results.
+"""
+
+# pylint: disable=W0621
+from collections.abc import Callable, Iterator
+
+import pandas as pd
+import pytest
+
+from sqlalchemy import text  # isort: skip
+from analytics.datasets.etl_dataset import EtlEntityType
+from analytics.integrations.etldb.deliverable_model import EtlDeliverableModel
+from analytics.integrations.etldb.epic_model import EtlEpicModel
+from analytics.integrations.etldb.etldb import EtlDb
+from analytics.integrations.etldb.issue_model import EtlIssueModel
+from analytics.integrations.etldb.project_model import EtlProjectModel
+from analytics.integrations.etldb.quad_model import EtlQuadModel
+from analytics.integrations.etldb.sprint_model import EtlSprintModel
+
+EFFECTIVE_DATE = "2024-11-18"
+
+GITHUB_TABLES = [
+    "gh_project",
+    "gh_quad",
+    "gh_deliverable",
+    "gh_deliverable_quad_map",
+    "gh_deliverable_history",
+    "gh_sprint",
+    "gh_epic",
+    "gh_epic_deliverable_map",
+    "gh_issue",
+    "gh_issue_history",
+    "gh_issue_sprint_map",
+]
+
+
+@pytest.fixture
+def dbh(
+    create_test_db: EtlDb,  # noqa: ARG001
+    test_schema: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Iterator[EtlDb]:
+    """Connect to the test schema, with every github table emptied."""
+    monkeypatch.setenv("DB_SCHEMA", test_schema)
+    etldb = EtlDb(EFFECTIVE_DATE)
+    conn = etldb.connection()
+    with conn.begin():
+        conn.execute(
+            text(f"truncate {', '.join(GITHUB_TABLES)} restart identity"),
+        )
+    yield etldb
+    conn.close()
+
+
+@pytest.fixture
+def upsert_counts(dbh: EtlDb, monkeypatch: pytest.MonkeyPatch) -> list:
+    """Record the (inserted, updated) counts of every dimension upsert."""
+    counts = []
+    upsert_dimensions = dbh.upsert_dimensions
+
+    def spy(*args, **kwargs) -> tuple[int, int]:  # noqa: ANN002,ANN003
+        result = upsert_dimensions(*args, **kwargs)
+        counts.append(result)
+        return result
+
+    monkeypatch.setattr(dbh, "upsert_dimensions", spy)
+    return counts
+
+
+def sync_and_count(
+    sync: Callable[..., dict],
+    upsert_counts: list,
+    *args,  # noqa: ANN002
+) -> tuple[dict, dict]:
+    """Sync a frame and return its ghid map and its insert/update/unchanged counts."""
+    ghid_map = sync(*args)
+    inserted, updated = upsert_counts.pop()
+    counts = {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": len(ghid_map) - inserted - updated,
+    }
+    return ghid_map, counts
+
+
+def select_rows(dbh: EtlDb, sql: str) -> list[tuple]:
+    """Select rows from the test schema."""
+    return list(dbh.connection().execute(text(sql)).tuples())
+
+
+def empty_ghid_map() -> dict:
+    """Build a ghid map with no known entities."""
+    return {entity_type: {} for entity_type in EtlEntityType}
+
+
+class TestSyncProjects:
+    """Test EtlProjectModel.sync_projects."""
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlProjectModel(dbh)
+        first = pd.DataFrame(
+            {"project_ghid": [13, 17], "project_name": ["Project 13", "Project 17"]},
+        )
+        ghid_map, counts = sync_and_count(model.sync_projects, upsert_counts, first)
+        assert ghid_map == {13: 1, 17: 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        second = pd.DataFrame(
+            {
+                "project_ghid": [13, 17, 19],
+                "project_name": ["Project 13", "Renamed 17", "Project 19"],
+            },
+        )
+        ghid_map, counts = sync_and_count(model.sync_projects, upsert_counts, second)
+        assert ghid_map == {13: 1, 17: 2, 19: 3}
+        assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+        assert select_rows(
+            dbh,
+            "select id, ghid, name from gh_project order by id",
+        ) == [
+            (1, 13, "Project 13"),
+            (2, 17, "Renamed 17"),
+            (3, 19, "Project 19"),
+        ]
+
+    def test_duplicate_ghids(self, dbh: EtlDb, upsert_counts: list):
+        """The last row of a duplicated ghid should win."""
+        model = EtlProjectModel(dbh)
+        projects = pd.DataFrame(
+            {"project_ghid": [13, 13], "project_name": ["First", "Last"]},
+        )
+        ghid_map, counts = sync_and_count(model.sync_projects, upsert_counts, projects)
+        assert ghid_map == {13: 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, name from gh_project") == [(13, "Last")]
+
+
+class TestSyncQuads:
+    """Test EtlQuadModel.sync_quads."""
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlQuadModel(dbh)
+        first = pd.DataFrame(
+            {
+                "quad_ghid": ["Q1", "Q2"],
+                "quad_name": ["Quad 1", "Quad 2"],
+                "quad_start": ["2024-01-01", "2024-04-01"],
+                "quad_end": ["2024-03-31", "2024-06-30"],
+                "quad_length": [91, 91],
+            },
+        )
+        ghid_map, counts = sync_and_count(model.sync_quads, upsert_counts, first)
+        assert ghid_map == {"Q1": 1, "Q2": 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        # the end date of Q2 changed
+        second = first.assign(quad_end=["2024-03-31", "2024-07-07"])
+        ghid_map, counts = sync_and_count(model.sync_quads, upsert_counts, second)
+        assert ghid_map == {"Q1": 1, "Q2": 2}
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+        assert select_rows(
+            dbh,
+            "select ghid, cast(end_date as text) from gh_quad order by id",
+        ) == [("Q1", "2024-03-31"), ("Q2", "2024-07-07")]
+
+    def test_duplicate_ghids(self, dbh: EtlDb, upsert_counts: list):
+        """The last row of a duplicated ghid should win."""
+        model = EtlQuadModel(dbh)
+        quads = pd.DataFrame(
+            {
+                "quad_ghid": ["Q1", "Q1"],
+                "quad_name": ["First", "Last"],
+                "quad_start": ["2024-01-01", "2024-01-01"],
+                "quad_end": ["2024-03-31", "2024-03-31"],
+                "quad_length": [91, 91],
+            },
+        )
+        ghid_map, counts = sync_and_count(model.sync_quads, upsert_counts, quads)
+        assert ghid_map == {"Q1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, name from gh_quad") == [("Q1", "Last")]
+
+
+class TestSyncSprints:
+    """Test EtlSprintModel.sync_sprints."""
+
+    def sprints(self, **columns: list) -> pd.DataFrame:
+        """Build a frame of two sprints, overriding the given columns."""
+        return pd.DataFrame(
+            {
+                "sprint_ghid": ["S1", "S2"],
+                "sprint_name": ["Sprint 1", "Sprint 2"],
+                "sprint_start": ["2024-01-01", "2024-01-15"],
+                "sprint_end": ["2024-01-14", "2024-01-28"],
+                "sprint_length": [14, 14],
+                "quad_ghid": ["Q1", "Q1"],
+                "project_ghid": [13, 13],
+            }
+            | columns,
+        )
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlSprintModel(dbh)
+        ghid_map = empty_ghid_map()
+        ghid_map[EtlEntityType.QUAD] = {"Q1": 7}
+        ghid_map[EtlEntityType.PROJECT] = {13: 5}
+
+        sprint_map, counts = sync_and_count(
+            model.sync_sprints,
+            upsert_counts,
+            self.sprints(),
+            ghid_map,
+        )
+        assert sprint_map == {"S1": 1, "S2": 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        # S2 moves to another quad, which also changes the row
+        ghid_map[EtlEntityType.QUAD]["Q2"] = 8
+        sprint_map, counts = sync_and_count(
+            model.sync_sprints,
+            upsert_counts,
+            self.sprints(quad_ghid=["Q1", "Q2"]),
+            ghid_map,
+        )
+        assert sprint_map == {"S1": 1, "S2": 2}
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+        assert select_rows(
+            dbh,
+            "select ghid, quad_id, project_id from gh_sprint order by id",
+        ) == [("S1", 7, 5), ("S2", 8, 5)]
+
+    def test_duplicate_and_missing_parent_ghids(
+        self,
+        dbh: EtlDb,
+        upsert_counts: list,
+    ):
+        """The last row should win, and parents missing from the map should be null."""
+        model = EtlSprintModel(dbh)
+        sprints = self.sprints(
+            sprint_ghid=["S1", "S1"],
+            sprint_name=["First", "Last"],
+            quad_ghid=["Q1", "Q9"],
+            project_ghid=[13, 99],
+        )
+        sprint_map, counts = sync_and_count(
+            model.sync_sprints,
+            upsert_counts,
+            sprints,
+            empty_ghid_map() | {EtlEntityType.QUAD: {"Q1": 7}},
+        )
+        assert sprint_map == {"S1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(
+            dbh,
+            "select ghid, name, quad_id, project_id from gh_sprint",
+        ) == [("S1", "Last", None, None)]
+
+
+class TestSyncDeliverables:
+    """Test EtlDeliverableModel.sync_deliverables."""
+
+    def deliverables(self, **columns: list) -> pd.DataFrame:
+        """Build a frame of two deliverables, overriding the given columns."""
+        return pd.DataFrame(
+            {
+                "deliverable_ghid": ["D1", "D2"],
+                "deliverable_title": ["Deliverable 1", "Deliverable 2"],
+                "deliverable_pillar": ["Pillar", "Pillar"],
+                "deliverable_status": ["In progress", "Planning"],
+                "quad_ghid": ["Q1", "Q1"],
+            }
+            | columns,
+        )
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlDeliverableModel(dbh)
+        ghid_map = empty_ghid_map() | {EtlEntityType.QUAD: {"Q1": 7}}
+
+        deliverable_map, counts = sync_and_count(
+            model.sync_deliverables,
+            upsert_counts,
+            self.deliverables(),
+            ghid_map,
+        )
+        assert deliverable_map == {"D1": 1, "D2": 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        # a status change is a fact, so only the title change updates the dimension
+        deliverable_map, counts = sync_and_count(
+            model.sync_deliverables,
+            upsert_counts,
+            self.deliverables(
+                deliverable_title=["Deliverable 1", "Retitled 2"],
+                deliverable_status=["Done", "Planning"],
+            ),
+            ghid_map,
+        )
+        assert deliverable_map == {"D1": 1, "D2": 2}
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+        assert select_rows(
+            dbh,
+            "select ghid, title from gh_deliverable order by id",
+        ) == [("D1", "Deliverable 1"), ("D2", "Retitled 2")]
+        assert select_rows(
+            dbh,
+            "select deliverable_id, status, cast(d_effective as text) "
+            "from gh_deliverable_history order by deliverable_id",
+        ) == [(1, "Done", EFFECTIVE_DATE), (2, "Planning", EFFECTIVE_DATE)]
+
+    def test_duplicate_and_missing_parent_ghids(
+        self,
+        dbh: EtlDb,
+        upsert_counts: list,
+    ):
+        """The last row should win, and parents missing from the map should be null."""
+        model = EtlDeliverableModel(dbh)
+        deliverables = self.deliverables(
+            deliverable_ghid=["D1", "D1"],
+            deliverable_title=["First", "Last"],
+            deliverable_status=["Planning", "Done"],
+            quad_ghid=["Q1", "Q9"],
+        )
+        deliverable_map, counts = sync_and_count(
+            model.sync_deliverables,
+            upsert_counts,
+            deliverables,
+            empty_ghid_map() | {EtlEntityType.QUAD: {"Q1": 7}},
+        )
+        assert deliverable_map == {"D1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, title from gh_deliverable") == [
+            ("D1", "Last"),
+        ]
+        assert select_rows(
+            dbh,
+            "select deliverable_id, quad_id from gh_deliverable_quad_map",
+        ) == [(1, None)]
+        assert select_rows(
+            dbh,
+            "select deliverable_id, status from gh_deliverable_history",
+        ) == [(1, "Done")]
+
+
+class TestSyncEpics:
+    """Test EtlEpicModel.sync_epics."""
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlEpicModel(dbh)
+        ghid_map = empty_ghid_map() | {EtlEntityType.DELIVERABLE: {"D1": 3}}
+        first = pd.DataFrame(
+            {
+                "epic_ghid": ["E1", "E2"],
+                "epic_title": ["Epic 1", "Epic 2"],
+                "deliverable_ghid": ["D1", "D1"],
+            },
+        )
+        epic_map, counts = sync_and_count(
+            model.sync_epics,
+            upsert_counts,
+            first,
+            ghid_map,
+        )
+        assert epic_map == {"E1": 1, "E2": 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        second = first.assign(epic_title=["Epic 1", "Retitled 2"])
+        epic_map, counts = sync_and_count(
+            model.sync_epics,
+            upsert_counts,
+            second,
+            ghid_map,
+        )
+        assert epic_map == {"E1": 1, "E2": 2}
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+        assert select_rows(dbh, "select ghid, title from gh_epic order by id") == [
+            ("E1", "Epic 1"),
+            ("E2", "Retitled 2"),
+        ]
+
+    def test_duplicate_and_missing_parent_ghids(
+        self,
+        dbh: EtlDb,
+        upsert_counts: list,
+    ):
+        """The last row should win, and parents missing from the map should be null."""
+        model = EtlEpicModel(dbh)
+        epics = pd.DataFrame(
+            {
+                "epic_ghid": ["E1", "E1"],
+                "epic_title": ["First", "Last"],
+                "deliverable_ghid": ["D1", "D9"],
+            },
+        )
+        epic_map, counts = sync_and_count(
+            model.sync_epics,
+            upsert_counts,
+            epics,
+            empty_ghid_map() | {EtlEntityType.DELIVERABLE: {"D1": 3}},
+        )
+        assert epic_map == {"E1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, title from gh_epic") == [("E1", "Last")]
+        assert select_rows(
+            dbh,
+            "select epic_id, deliverable_id from gh_epic_deliverable_map",
+        ) == [(1, None)]
+
+
+class TestSyncIssues:
+    """Test EtlIssueModel.sync_issues."""
+
+    def issues(self, **columns: list) -> pd.DataFrame:
+        """Build a frame of two issues, overriding the given columns."""
+        return pd.DataFrame(
+            {
+                "issue_ghid": ["I1", "I2"],
+                "issue_title": ["Issue 1", "Issue 2"],
+                "issue_type": ["Task", "Bug"],
+                "issue_opened_at": ["2024-01-02", "2024-01-03"],
+                "issue_closed_at": [None, None],
+                "issue_parent": ["E1", "E1"],
+                "epic_ghid": ["E1", "E1"],
+                "issue_status": ["Todo", "Todo"],
+                "issue_is_closed": [False, False],
+                "issue_points": [2, 3],
+                "sprint_ghid": ["S1", "S1"],
+                "project_ghid": [13, 13],
+            }
+            | columns,
+        )
+
+    def ghid_map(self) -> dict:
+        """Build a ghid map holding the parents of the issues."""
+        return empty_ghid_map() | {
+            EtlEntityType.EPIC: {"E1": 4},
+            EtlEntityType.SPRINT: {"S1": 6},
+            EtlEntityType.PROJECT: {13: 5, 17: 9},
+        }
+
+    def test_new_changed_and_unchanged_rows(self, dbh: EtlDb, upsert_counts: list):
+        """New rows should be inserted, changed rows updated, the rest left alone."""
+        model = EtlIssueModel(dbh)
+        issue_map, counts = sync_and_count(
+            model.sync_issues,
+            upsert_counts,
+            self.issues(),
+            self.ghid_map(),
+        )
+        assert issue_map == {"I1": 1, "I2": 2}
+        assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+        # closing I2 changes its dimensions and its facts, only the facts of I1 change
+        issue_map, counts = sync_and_count(
+            model.sync_issues,
+            upsert_counts,
+            self.issues(
+                issue_closed_at=[None, "2024-01-09"],
+                issue_status=["In progress", "Done"],
+                issue_is_closed=[False, True],
+            ),
+            self.ghid_map(),
+        )
+        assert issue_map == {"I1": 1, "I2": 2}
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+        assert select_rows(
+            dbh,
+            "select ghid, cast(closed_date as text), epic_id from gh_issue order by id",
+        ) == [("I1", None, 4), ("I2", "2024-01-09", 4)]
+        assert select_rows(
+            dbh,
+            "select issue_id, status, is_closed, points, project_id, sprint_id "
+            "from gh_issue_history order by issue_id",
+        ) == [(1, "In progress", 0, 2, 5, 6), (2, "Done", 1, 3, 5, 6)]
+        assert select_rows(
+            dbh,
+            "select issue_id, sprint_id from gh_issue_sprint_map order by issue_id",
+        ) == [(1, 6), (2, 6)]
+
+    def test_duplicate_ghids(self, dbh: EtlDb, upsert_counts: list):
+        """An issue in two projects should get history for each, with the last row's dimensions."""
+        model = EtlIssueModel(dbh)
+        issues = self.issues(
+            issue_ghid=["I1", "I1"],
+            issue_title=["First", "Last"],
+            issue_status=["Todo", "Done"],
+            project_ghid=[13, 17],
+        )
+        issue_map, counts = sync_and_count(
+            model.sync_issues,
+            upsert_counts,
+            issues,
+            self.ghid_map(),
+        )
+        assert issue_map == {"I1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, title from gh_issue") == [("I1", "Last")]
+        assert select_rows(
+            dbh,
+            "select issue_id, project_id, status from gh_issue_history "
+            "order by project_id",
+        ) == [(1, 5, "Todo"), (1, 9, "Done")]
+
+    def test_missing_parent_ghids_and_facts(self, dbh: EtlDb, upsert_counts: list):
+        """Unknown parents should be null, a blank type 'None' and missing facts zero."""
+        model = EtlIssueModel(dbh)
+        issues = self.issues(
+            issue_ghid=["I1"],
+            issue_title=["Issue 1"],
+            issue_type=[""],
+            issue_opened_at=["2024-01-02"],
+            issue_closed_at=[None],
+            issue_parent=[None],
+            epic_ghid=["E9"],
+            issue_status=[None],
+            issue_is_closed=[None],
+            issue_points=[None],
+            sprint_ghid=["S9"],
+            project_ghid=[13],
+        )
+        issue_map, counts = sync_and_count(
+            model.sync_issues,
+            upsert_counts,
+            issues,
+            self.ghid_map(),
+        )
+        assert issue_map == {"I1": 1}
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+        assert select_rows(dbh, "select ghid, type, epic_id from gh_issue") == [
+            ("I1", "None", None),
+        ]
+        assert select_rows(
+            dbh,
+            "select status, is_closed, points, project_id, sprint_id "
+            "from gh_issue_history",
+        ) == [("0", 0, 0, 5, None)]
@@ -0,0 +1,135 @@
+# Micro-benchmark for converting opportunities to CSV, comparing the
+# precompiled row extractor against flattening each opportunity
+#
+# Run with: poetry run python -m bin.benchmark_opportunity_to_csv
+import csv
+import io
+import logging
+import time
+from typing import Callable, Iterable, TextIO
+
+import click
+
+import src.logging
+from src.services.opportunities_v1.opportunity_to_csv import CSV_FIELDS, opportunities_to_csv
+from src.util.dict_util import flatten_dict
+
+logger = logging.getLogger(__name__)
+
+
+def build_opportunity(opportunity_id: int) -> dict:
+    return {
+        "opportunity_id": opportunity_id,
+        "opportunity_number": f"ABC-{opportunity_id}",
+        "opportunity_title": f"Research opportunity {opportunity_id}",
+        "agency": "US-ABC",
+        "agency_code": "US-ABC",
+        "agency_name": "Agency for Business and Commerce",
+        "top_level_agency_name": "Department of Commerce",
+        "category": "discretionary",
+        "category_explanation": None,
+        "opportunity_assistance_listings": [
+            {"assistance_listing_number": "12.345", "program_title": "Program A"},
+            {"assistance_listing_number": "67.890", "program_title": "Program B"},
+        ],
+        "summary": {
+            "summary_description": "A description of the opportunity " * 20,
+            "is_cost_sharing": True,
+            "is_forecast": False,
+            "post_date": "2025-01-01",
+            "close_date": "2025-06-01",
+            "close_date_description": "Close date description",
+            "archive_date": "2025-07-01",
+            "expected_number_of_awards": 10,
+            "estimated_total_program_funding": 1_000_000,
+            "award_floor": 1000,
+            "award_ceiling": 100_000,
+            "additional_info_url": "https://example.com",
+            "additional_info_url_description": "Example",
+            "forecasted_post_date": None,
+            "forecasted_close_date": None,
+            "forecasted_close_date_description": None,
+            "forecasted_award_date": None,
+            "forecasted_project_start_date": None,
+            "fiscal_year": None,
+            "funding_category_description": "Funding category description",
+            "applicant_eligibility_description": "Applicant eligibility description",
+            "agency_phone_number": "123-456-7890",
+            "agency_contact_description": "Contact description",
+            "agency_email_address": "contact@example.com",
+            "agency_email_address_description": "Email us",
+            "version_number": 1,
+            "funding_instruments": ["grant", "cooperative_agreement"],
+            "funding_categories": [
+                "education",
+                "science_technology_and_other_research_and_development",
+            ],
+            "applicant_types": ["state_governments", "county_governments", "individuals"],
+            "created_at": "2024-01-01T00:00:00+00:00",
+            "updated_at": "2024-01-02T00:00:00+00:00",
+        },
+        "opportunity_status": "posted",
+        "created_at": "2025-01-01T00:00:00+00:00",
+        "updated_at": "2025-01-02T00:00:00+00:00",
+    }
+
+
+def flatten_opportunities_to_csv(opportunities: Iterable[dict], output: TextIO) -> None:
+    # The original implementation, which flattened every opportunity
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, quoting=csv.QUOTE_ALL)
+    writer.writeheader()
+
+    csv_fields = set(CSV_FIELDS)
+    for opportunity in opportunities:
+        out_opportunity = {}
+        for k, v in flatten_dict(opportunity).items():
+            k = k.removeprefix("summary.")
+            if k not in csv_fields:
+                continue
+
+            if k == "opportunity_assistance_listings":
+                v = ";".join(f"{a['assistance_listing_number']}|{a['program_title']}" for a in v)
+            elif k in ["funding_instruments", "funding_categories", "applicant_types"]:
+                v = ";".join(v)
+
+            out_opportunity[k] = v
+
+        writer.writerow(out_opportunity)
+
+
+def benchmark(
+    name: str, func: Callable[[Iterable[dict], TextIO], None], opportunities: list[dict]
+) -> str:
+    output = io.StringIO()
+
+    start = time.perf_counter()
+    func(opportunities, output)
+    duration = time.perf_counter() - start
+
+    logger.info(
+        "Converted opportunities to CSV",
+        extra={
+            "implementation": name,
+            "opportunity_count": len(opportunities),
+            "duration_sec": round(duration, 4),
+            "rows_per_sec": round(len(opportunities) / duration),
+        },
+    )
+    return output.getvalue()
+
+
+@click.command()
+@click.option("--count", default=50_000, help="Number of opportunities to convert")
+def main(count: int) -> None:
+    with src.logging.init(__package__):
+        opportunities = [build_opportunity(i) for i in range(count)]
+
+        flattened = benchmark("flatten_dict", flatten_opportunities_to_csv, opportunities)
+        extracted = benchmark("row_extractor", opportunities_to_csv, opportunities)
+
+        if flattened != extracted:
+            raise Exception("CSV output of the implementations does not match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Micro-benchmark for presigning URLs and making HEAD requests to S3, comparing
+# constructing a client for every call against the process-wide cached client
+#
+# Requires an S3 bucket to run against, for example localstack (see setup_localstack.py)
+#
+# Run with: poetry run python -m bin.benchmark_s3_client
+import logging
+import time
+from typing import Callable
+
+import botocore.client
+import click
+
+import src.logging
+from src.adapters.aws import (
+    get_boto_session,
+    get_cached_s3_client,
+    get_default_s3_config,
+    get_s3_client,
+    s3_client_cache_stats,
+)
+from src.util import file_util
+
+logger = logging.getLogger(__name__)
+
+
+def get_uncached_s3_client() -> botocore.client.BaseClient:
+    # How the clients were made before they were cached
+    return get_s3_client(get_default_s3_config(), get_boto_session())
+
+
+def benchmark(
+    name: str,
+    get_client: Callable[[], botocore.client.BaseClient],
+    bucket: str,
+    key: str,
+    count: int,
+) -> None:
+    start = time.perf_counter()
+    for _ in range(count):
+        get_client().generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=3600
+        )
+    presign_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        get_client().head_object(Bucket=bucket, Key=key)
+    head_duration = time.perf_counter() - start
+
+    logger.info(
+        "Benchmarked s3 client",
+        extra={
+            "implementation": name,
+            "call_count": count,
+            "presigns_per_sec": round(count / presign_duration),
+            "heads_per_sec": round(count / head_duration),
+        },
+    )
+
+
+@click.command()
+@click.option("--count", default=1000, help="Number of presign and HEAD calls to make")
+@click.option("--key", default="benchmark/benchmark_s3_client.txt", help="Key of the test file")
+def main(count: int, key: str) -> None:
+    with src.logging.init(__package__):
+        s3_config = get_default_s3_config()
+        bucket = file_util.get_s3_bucket(s3_config.public_files_bucket_path)
+
+        get_cached_s3_client().put_object(Bucket=bucket, Key=key, Body=b"benchmark")
+
+        benchmark("uncached", get_uncached_s3_client, bucket, key, count)
+        benchmark("cached", get_cached_s3_client, bucket, key, count)
+
+        logger.info(
+            "S3 client cache stats",
+            extra={
+                "s3_client_cache_hits": s3_client_cache_stats.hits,
+                "s3_client_cache_constructions": s3_client_cache_stats.constructions,
+            },
+        )
+
+        file_util.delete_file(f"s3://{bucket}/{key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,19 @@
 from .aws_session import get_boto_session
-from .s3_adapter import S3Config, get_s3_client
+from .s3_adapter import (
+    S3Config,
+    get_cached_s3_client,
+    get_default_s3_config,
+    get_s3_client,
+    reset_s3_client_cache,
+    s3_client_cache_stats,
+)
 
-__all__ = ["get_s3_client", "S3Config", "get_boto_session"]
+__all__ = [
+    "get_s3_client",
+    "get_cached_s3_client",
+    "get_default_s3_config",
+    "reset_s3_client_cache",
+    "s3_client_cache_stats",
+    "S3Config",
+    "get_boto_session",
+]
@@ -1,3 +1,8 @@
+import dataclasses
+import logging
+import os
+import threading
+
 import boto3
 import botocore.client
 import botocore.config
@@ -6,6 +11,12 @@ from pydantic import Field
 from src.adapters.aws import get_boto_session
 from src.util.env_config import PydanticBaseEnvConfig
 
+logger = logging.getLogger(__name__)
+
+# The default size of the connection pool of cached clients, enough for
+# the threads of an API worker or a batch file operation to share one
+DEFAULT_S3_MAX_POOL_CONNECTIONS = 50
+
 
 class S3Config(PydanticBaseEnvConfig):
     # We should generally not need to set this except
@@ -13,6 +24,11 @@ class S3Config(PydanticBaseEnvConfig):
     s3_endpoint_url: str | None = None
     presigned_s3_duration: int = 7200  # 2 hours in seconds
 
+    # Presigned URLs are cached and reused until this fraction of their
+    # duration has passed, so a cached URL always has the remainder left
+    presigned_url_cache_reuse_fraction: float = Field(0.5, ge=0, lt=1)
+    presigned_url_cache_max_size: int = 10_000
+
     ### S3 Buckets
     # note that we default these to None
     # so that we don't need to set all of these for every
@@ -44,3 +60,88 @@ def get_s3_client(
         session = get_boto_session()
 
     return session.client("s3", **params)
+
+
+@dataclasses.dataclass
+class S3ClientCacheStats:
+    hits: int = 0
+    constructions: int = 0
+
+
+# Constructing a client (and the config and session behind it) is expensive
+# relative to the calls we make with it, like presigning a URL, so clients
+# are cached for the whole process, keyed by endpoint and pool size.
+_s3_client_cache: dict[tuple[str | None, int], botocore.client.BaseClient] = {}
+_s3_client_cache_lock = threading.Lock()
+_default_s3_config: S3Config | None = None
+
+s3_client_cache_stats = S3ClientCacheStats()
+
+
+def get_default_s3_config() -> S3Config:
+    """Get an S3Config loaded from the environment, shared across the process"""
+    global _default_s3_config
+    if _default_s3_config is None:
+        _default_s3_config = S3Config()
+
+    return _default_s3_config
+
+
+def get_cached_s3_client(
+    s3_config: S3Config | None = None,
+    max_pool_connections: int = DEFAULT_S3_MAX_POOL_CONNECTIONS,
+) -> botocore.client.BaseClient:
+    """
+    Get an s3 client shared across the process
+
+    Clients are thread-safe, and keep their connections alive in a pool
+    so repeat requests skip the TCP and TLS handshakes. A client isn't safe
+    to use across a fork though, so a forked process starts a new cache.
+    """
+    if s3_config is None:
+        s3_config = get_default_s3_config()
+
+    key = (s3_config.s3_endpoint_url, max_pool_connections)
+
+    with _s3_client_cache_lock:
+        s3_client = _s3_client_cache.get(key)
+        if s3_client is not None:
+            s3_client_cache_stats.hits += 1
+            return s3_client
+
+        s3_client = get_s3_client(
+            s3_config,
+            boto_config=botocore.config.Config(
+                signature_version="s3v4",
+                max_pool_connections=max_pool_connections,
+                tcp_keepalive=True,
+            ),
+        )
+        _s3_client_cache[key] = s3_client
+        s3_client_cache_stats.constructions += 1
+
+    logger.info(
+        "Constructed cached s3 client",
+        extra={
+            "max_pool_connections": max_pool_connections,
+            "s3_client_cache_hits": s3_client_cache_stats.hits,
+            "s3_client_cache_constructions": s3_client_cache_stats.constructions,
+        },
+    )
+    return s3_client
+
+
+def reset_s3_client_cache() -> None:
+    """Clear the cached clients and config, eg. after the environment changes"""
+    global _s3_client_cache_lock, _default_s3_config
+
+    # The lock may have been held by another thread at the time of a fork
+    _s3_client_cache_lock = threading.Lock()
+    _s3_client_cache.clear()
+    _default_s3_config = None
+
+    s3_client_cache_stats.hits = 0
+    s3_client_cache_stats.constructions = 0
+
+
+os.register_at_fork(after_in_child=reset_s3_client_cache)
@@ -49,6 +49,13 @@ class ExtractMetadataResponseSchema(FileResponseSchema):
     extract_type = fields.String(
         metadata={"description": "The type of extract", "example": "opportunity_data_extract"}
     )
+    base_extract_metadata_id = fields.Integer(
+        allow_none=True,
+        metadata={
+            "description": "For delta extracts, the ID of the full extract the changes apply to",
+            "example": 1,
+        },
+    )
 
 
 class ExtractMetadataListResponseSchema(AbstractResponseSchema, PaginationMixinSchema):
@@ -121,6 +121,12 @@ class AgencySubmissionNotificationSetting(StrEnum):
 class ExtractType(StrEnum):
     OPPORTUNITIES_JSON = "opportunities_json"
     OPPORTUNITIES_CSV = "opportunities_csv"
+    OPPORTUNITIES_JSON_GZIP = "opportunities_json_gzip"
+    OPPORTUNITIES_CSV_GZIP = "opportunities_csv_gzip"
+    OPPORTUNITIES_JSON_ZSTD = "opportunities_json_zstd"
+    OPPORTUNITIES_CSV_ZSTD = "opportunities_csv_zstd"
+    OPPORTUNITIES_PARQUET = "opportunities_parquet"
+    OPPORTUNITIES_DELTA_JSON = "opportunities_delta_json"
 
 
 class ExternalUserType(StrEnum):
@@ -10,6 +10,7 @@ import src.adapters.db as db
 import src.adapters.db.flask_db as flask_db
 import src.db.models.foreign
 import src.db.models.staging
+from src.task.checkpoint import PipelineCheckpoints
 from src.task.ecs_background_task import ecs_background_task
 from src.task.opportunities.set_current_opportunities_task import SetCurrentOpportunitiesTask
 
@@ -31,6 +32,33 @@ logger = logging.getLogger(__name__)
 @click.option(
     "--insert-chunk-size", default=800, help="chunk size for load inserts", show_default=True
 )
+@click.option(
+    "--delete-chunk-size",
+    default=10_000,
+    help="number of keys to check per chunk when finding deleted rows",
+    show_default=True,
+)
+@click.option(
+    "--load-max-workers",
+    default=1,
+    help="number of tables to load concurrently",
+    show_default=True,
+)
+@click.option(
+    "--incremental-load/--full-load",
+    default=False,
+    help="only load legacy rows changed since the previous load, with a periodic full load",
+)
+@click.option(
+    "--bulk-transfer/--chunked-transfer",
+    default=False,
+    help="copy changed legacy rows through a temporary table rather than in chunks of keys",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=False,
+    help="skip the stages, tables and subtasks completed since the last successful run",
+)
 @click.option("--tables-to-load", "-t", help="table to load", multiple=True)
 @flask_db.with_db_session()
 @ecs_background_task(task_name="load-transform")
@@ -40,6 +68,11 @@ def load_transform(
     transform: bool,
     set_current: bool,
     insert_chunk_size: int,
+    delete_chunk_size: int,
+    load_max_workers: int,
+    incremental_load: bool,
+    bulk_transfer: bool,
+    resume: bool,
     tables_to_load: list[str],
 ) -> None:
     logger.info("load and transform start")
@@ -47,13 +80,34 @@ def load_transform(
     foreign_tables = {t.name: t for t in src.db.models.foreign.metadata.tables.values()}
     staging_tables = {t.name: t for t in src.db.models.staging.metadata.tables.values()}
 
+    # Tables and subtasks record a checkpoint as they complete, so that
+    # a run which fails part way through can be resumed from where it stopped
+    checkpoints = PipelineCheckpoints(db_session, "load-transform", resume=resume)
+
     if load:
         LoadOracleDataTask(
-            db_session, foreign_tables, staging_tables, tables_to_load, insert_chunk_size
+            db_session,
+            foreign_tables,
+            staging_tables,
+            tables_to_load,
+            insert_chunk_size,
+            max_workers=load_max_workers,
+            is_incremental=incremental_load,
+            bulk_transfer=bulk_transfer,
+            delete_chunk_size=delete_chunk_size,
+            checkpoints=checkpoints,
         ).run()
     if transform:
-        TransformOracleDataTask(db_session).run()
+        TransformOracleDataTask(db_session, checkpoints=checkpoints).run()
     if set_current:
-        SetCurrentOpportunitiesTask(db_session).run()
+        if checkpoints.is_complete(SetCurrentOpportunitiesTask.__name__):
+            logger.info("Skipping SetCurrentOpportunitiesTask, already completed")
+        else:
+            SetCurrentOpportunitiesTask(db_session).run()
+            checkpoints.mark_complete(db_session, SetCurrentOpportunitiesTask.__name__)
+
+    # Only a run of every stage is a point that later runs can resume after
+    if load and transform and set_current:
+        checkpoints.mark_pipeline_complete(db_session)
 
     logger.info("load and transform complete")
@@ -1,18 +1,24 @@
 #
 # Load data from legacy (Oracle) tables to staging tables.
 #
+import datetime
 import itertools
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import sqlalchemy
+from pydantic import Field
 
 import src.db.models.foreign
 import src.db.models.staging
 import src.logging
 import src.task.task
 from src.adapters import db
+from src.db.models.task_models import LegacyLoadWatermark
+from src.task.checkpoint import PipelineCheckpoints
 from src.util import datetime_util
+from src.util.env_config import PydanticBaseEnvConfig
 
 from . import sql
 
@@ -41,6 +47,23 @@ TABLES_TO_LOAD = [
 ]
 
 
+class LoadOracleDataConfig(PydanticBaseEnvConfig):
+    # LOAD_ORACLE_DATA_INCREMENTAL_OVERLAP_MINUTES
+    # How far before a table's watermark an incremental load starts from. A legacy row's
+    # last_upd_date is set before its transaction commits, so a transaction still in progress
+    # during the previous load can commit rows older than the watermark it recorded.
+    incremental_overlap_minutes: int = Field(
+        default=60, alias="LOAD_ORACLE_DATA_INCREMENTAL_OVERLAP_MINUTES"
+    )
+
+    # LOAD_ORACLE_DATA_FULL_LOAD_INTERVAL_HOURS
+    # How often an incremental load instead fully compares a table against the legacy
+    # table. Deleted rows, and anything an incremental load missed, are only found then.
+    full_load_interval_hours: int = Field(
+        default=24, alias="LOAD_ORACLE_DATA_FULL_LOAD_INTERVAL_HOURS"
+    )
+
+
 class LoadOracleDataTask(src.task.task.Task):
     """Task to load data from legacy tables to staging tables."""
 
@@ -51,6 +74,12 @@ class LoadOracleDataTask(src.task.task.Task):
         staging_tables: dict[str, sqlalchemy.Table],
         tables_to_load: list[str] | None = None,
         insert_chunk_size: int = 800,
+        max_workers: int = 1,
+        is_incremental: bool = False,
+        config: LoadOracleDataConfig | None = None,
+        bulk_transfer: bool = False,
+        delete_chunk_size: int = 10_000,
+        checkpoints: PipelineCheckpoints | None = None,
     ) -> None:
 
         if tables_to_load is None or len(tables_to_load) == 0:
@@ -66,6 +95,16 @@ class LoadOracleDataTask(src.task.task.Task):
         self.foreign_tables = foreign_tables
         self.staging_tables = staging_tables
         self.insert_chunk_size = insert_chunk_size
+        self.delete_chunk_size = delete_chunk_size
+        # How many tables to load at once, each on its own DB connection
+        self.max_workers = max_workers
+        self.is_incremental = is_incremental
+        self.bulk_transfer = bulk_transfer
+        self.checkpoints = checkpoints
+
+        if config is None:
+            config = LoadOracleDataConfig()
+        self.config = config
 
     def run_task(self) -> None:
         """Main task process, called by run()."""
@@ -100,34 +139,165 @@ class LoadOracleDataTask(src.task.task.Task):
 
     def load_data(self) -> None:
         """Load the data for all tables defined in the mapping."""
-        for table_name in self.foreign_tables:
-            try:
-                self.load_data_for_table(table_name)
-            except Exception:
-                logger.exception("table load error", extra={"table": table_name})
+        table_names = self.get_table_load_order()
+
+        if self.checkpoints is not None:
+            skipped_table_names = [
+                table_name
+                for table_name in table_names
+                if self.checkpoints.is_complete(self.cls_name(), table_name)
+            ]
+            if skipped_table_names:
+                logger.info("Skipping tables already loaded", extra={"tables": skipped_table_names})
+                self.set_metrics({"count.skipped_tables": len(skipped_table_names)})
+                table_names = [name for name in table_names if name not in skipped_table_names]
+
+        if self.max_workers <= 1:
+            for table_name in table_names:
+                self.load_data_for_table_isolated(table_name, self.db_session)
+            return
+
+        # Most of the time loading a table is spent waiting on the foreign data wrapper,
+        # so tables are loaded concurrently, each on a session with its own connection
+        engine = self.db_session.get_bind()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self.load_data_for_table_in_new_session, table_name, engine)
+                for table_name in table_names
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    def get_table_load_order(self) -> list[str]:
+        """When loading concurrently, order the tables so the large history tables are
+        loaded first, which keeps the longest loads from being started last and holding
+        up the end of the run. Serial loads keep the order of the table mapping.
+        """
+        if self.max_workers <= 1:
+            return list(self.foreign_tables)
+
+        return sorted(self.foreign_tables, key=lambda table_name: not table_name.endswith("_hist"))
+
+    def load_data_for_table_in_new_session(
+        self, table_name: str, engine: sqlalchemy.engine.Engine | sqlalchemy.engine.Connection
+    ) -> None:
+        with db.Session(bind=engine, expire_on_commit=False) as db_session:
+            self.load_data_for_table_isolated(table_name, db_session)
+
+    def load_data_for_table_isolated(self, table_name: str, db_session: db.Session) -> None:
+        """Load a single table, logging rather than raising errors so other tables still load."""
+        try:
+            self.load_data_for_table(table_name, db_session)
+        except Exception:
+            logger.exception("table load error", extra={"table": table_name})
+            return
+
+        if self.checkpoints is not None:
+            self.checkpoints.mark_complete(
+                db_session,
+                self.cls_name(),
+                table_name,
+                job_id=self.job.job_id if self.job is not None else None,
+            )
 
-    def load_data_for_table(self, table_name: str) -> None:
+    def load_data_for_table(self, table_name: str, db_session: db.Session | None = None) -> None:
         """Load new and updated rows for a single table from the foreign table to the staging table."""
+        if db_session is None:
+            db_session = self.db_session
+
         logger.info("process table", extra={"table": table_name})
         foreign_table = self.foreign_tables[table_name]
         staging_table = self.staging_tables[table_name]
 
-        self.log_row_count("before", foreign_table, staging_table)
+        t0 = time.monotonic()
+        changed_since = self.get_changed_since(staging_table, db_session)
+        self.set_metrics({f"is_incremental.{staging_table.name}": changed_since is not None})
+
+        # Counting the foreign table reads all of it over the link, which an
+        # incremental load otherwise avoids
+        if changed_since is None:
+            self.log_row_count("before", foreign_table, staging_table, db_session=db_session)
+        else:
+            self.log_row_count("before", staging_table, db_session=db_session)
+
+        if self.bulk_transfer:
+            self.do_bulk_transfer(foreign_table, staging_table, db_session, changed_since)
+        else:
+            self.do_update(foreign_table, staging_table, db_session, changed_since)
+            self.do_insert(foreign_table, staging_table, db_session, changed_since)
+        # Deleted rows leave nothing behind to filter on, so only a full load can find them
+        if changed_since is None:
+            self.do_mark_deleted(foreign_table, staging_table, db_session)
+
+        self.update_watermark(staging_table, db_session, is_full_load=changed_since is None)
+
+        self.log_row_count("after", staging_table, db_session=db_session)
+        t1 = time.monotonic()
+        self.set_metrics({f"time.load.{staging_table.name}": round(t1 - t0, 3)})
+
+    def get_changed_since(
+        self, staging_table: sqlalchemy.Table, db_session: db.Session
+    ) -> datetime.datetime | None:
+        """Get the time an incremental load of the table starts from, or None for a full load."""
+        if not self.is_incremental:
+            return None
+
+        with db_session.begin():
+            watermark = db_session.get(LegacyLoadWatermark, staging_table.name)
+
+        if watermark is None or watermark.watermark is None or watermark.last_full_load_at is None:
+            logger.info(
+                "No watermark for table, doing a full load", extra={"table": staging_table.name}
+            )
+            return None
 
-        self.do_update(foreign_table, staging_table)
-        self.do_insert(foreign_table, staging_table)
-        self.do_mark_deleted(foreign_table, staging_table)
+        full_load_due_at = watermark.last_full_load_at + datetime.timedelta(
+            hours=self.config.full_load_interval_hours
+        )
+        if full_load_due_at <= datetime_util.utcnow():
+            logger.info("Periodic full load of table is due", extra={"table": staging_table.name})
+            return None
 
-        self.log_row_count("after", staging_table)
+        changed_since = watermark.watermark - datetime.timedelta(
+            minutes=self.config.incremental_overlap_minutes
+        )
+        logger.info(
+            "Incremental load of table",
+            extra={"table": staging_table.name, "changed_since": changed_since.isoformat()},
+        )
+        return changed_since
 
-    def do_insert(self, foreign_table: sqlalchemy.Table, staging_table: sqlalchemy.Table) -> int:
+    def update_watermark(
+        self, staging_table: sqlalchemy.Table, db_session: db.Session, is_full_load: bool
+    ) -> None:
+        """Record the latest change loaded into the staging table, for the next incremental load."""
+        with db_session.begin():
+            watermark = db_session.get(LegacyLoadWatermark, staging_table.name)
+            if watermark is None:
+                watermark = LegacyLoadWatermark(table_name=staging_table.name)
+                db_session.add(watermark)
+
+            watermark.watermark = db_session.scalar(sql.build_select_watermark_sql(staging_table))
+            if is_full_load:
+                watermark.last_full_load_at = datetime_util.utcnow()
+
+    def do_insert(
+        self,
+        foreign_table: sqlalchemy.Table,
+        staging_table: sqlalchemy.Table,
+        db_session: db.Session | None = None,
+        changed_since: datetime.datetime | None = None,
+    ) -> int:
         """Determine new rows by primary key, and copy them into the staging table."""
+        if db_session is None:
+            db_session = self.db_session
+
         log_extra = {"table": foreign_table.name}
 
         logger.info("Fetching records to be inserted", extra=log_extra)
-        select_sql = sql.build_select_new_rows_sql(foreign_table, staging_table)
-        with self.db_session.begin():
-            new_ids = self.db_session.execute(select_sql).all()
+        select_sql = sql.build_select_new_rows_sql(foreign_table, staging_table, changed_since)
+        with db_session.begin():
+            new_ids = db_session.execute(select_sql).all()
 
         t0 = time.monotonic()
         insert_chunk_count = []
@@ -138,8 +308,8 @@ class LoadOracleDataTask(src.task.task.Task):
             )
 
             # Execute the INSERT.
-            with self.db_session.begin():
-                self.db_session.execute(insert_from_select_sql)
+            with db_session.begin():
+                db_session.execute(insert_from_select_sql)
 
             insert_chunk_count.append(len(batch_of_new_ids))
             logger.info(
@@ -164,14 +334,23 @@ class LoadOracleDataTask(src.task.task.Task):
 
         return total_insert_count
 
-    def do_update(self, foreign_table: sqlalchemy.Table, staging_table: sqlalchemy.Table) -> int:
+    def do_update(
+        self,
+        foreign_table: sqlalchemy.Table,
+        staging_table: sqlalchemy.Table,
+        db_session: db.Session | None = None,
+        changed_since: datetime.datetime | None = None,
+    ) -> int:
         """Find updated rows using last_upd_date, copy them, and reset transformed_at to NULL."""
+        if db_session is None:
+            db_session = self.db_session
+
         log_extra = {"table": foreign_table.name}
 
         logger.info("Fetching records to be updated", extra=log_extra)
-        select_sql = sql.build_select_updated_rows_sql(foreign_table, staging_table)
-        with self.db_session.begin():
-            update_ids = self.db_session.execute(select_sql).all()
+        select_sql = sql.build_select_updated_rows_sql(foreign_table, staging_table, changed_since)
+        with db_session.begin():
+            update_ids = db_session.execute(select_sql).all()
 
         t0 = time.monotonic()
         update_chunk_count = []
@@ -181,8 +360,8 @@ class LoadOracleDataTask(src.task.task.Task):
                 foreign_table, staging_table, batch_of_update_ids
             ).values(transformed_at=None)
 
-            with self.db_session.begin():
-                self.db_session.execute(update_sql)
+            with db_session.begin():
+                db_session.execute(update_sql)
 
             update_chunk_count.append(len(batch_of_update_ids))
             logger.info(
@@ -203,38 +382,146 @@ class LoadOracleDataTask(src.task.task.Task):
 
         return total_update_count
 
-    def do_mark_deleted(
-        self, foreign_table: sqlalchemy.Table, staging_table: sqlalchemy.Table
-    ) -> int:
-        """Find deleted rows, set is_deleted=TRUE, and reset transformed_at to NULL."""
+    def do_bulk_transfer(
+        self,
+        foreign_table: sqlalchemy.Table,
+        staging_table: sqlalchemy.Table,
+        db_session: db.Session,
+        changed_since: datetime.datetime | None = None,
+    ) -> tuple[int, int]:
+        """Copy the new and updated rows into the staging table with set-based statements.
+
+        Rather than fetching the primary keys and then querying the foreign table again for
+        each chunk of them, the changed rows are read from the foreign table once into a
+        temporary table, which the staging table is then updated and inserted into from.
+        """
         log_extra = {"table": foreign_table.name}
+        transfer_table = sql.build_transfer_table(foreign_table)
+
+        t0 = time.monotonic()
+        with db_session.begin():
+            transfer_table.create(db_session.connection())
+
+            logger.info("Fetching new and updated records", extra=log_extra)
+            result = db_session.execute(
+                sqlalchemy.insert(transfer_table).from_select(
+                    [c.name for c in foreign_table.columns],
+                    sql.build_select_changed_rows_sql(foreign_table, staging_table, changed_since),
+                )
+            )
+            transfer_count = result.rowcount  # type: ignore[attr-defined]
+            logger.info(
+                "Fetched new and updated records", extra=log_extra | {"count": transfer_count}
+            )
+            t1 = time.monotonic()
+
+            update_sql = sql.build_update_from_table_sql(transfer_table, staging_table).values(
+                transformed_at=None
+            )
+            update_count = db_session.execute(update_sql).rowcount  # type: ignore[attr-defined]
+
+            insert_sql = sql.build_insert_missing_rows_sql(transfer_table, staging_table)
+            insert_count = db_session.execute(insert_sql).rowcount  # type: ignore[attr-defined]
+        t2 = time.monotonic()
+
+        logger.info(
+            "Transfer done",
+            extra=log_extra | {"update_count": update_count, "insert_count": insert_count},
+        )
 
-        logger.info("Fetching records to be deleted", extra=log_extra)
-        update_sql = sql.build_mark_deleted_sql(foreign_table, staging_table).values(
-            transformed_at=None,
-            deleted_at=datetime_util.utcnow(),
+        self.increment("count.insert.total", insert_count)
+        self.increment(f"count.insert.{staging_table.name}", insert_count)
+        self.increment("count.update.total", update_count)
+        self.increment(f"count.update.{staging_table.name}", update_count)
+        self.set_metrics(
+            {
+                f"time.fetch.{staging_table.name}": round(t1 - t0, 3),
+                f"time.transfer.{staging_table.name}": round(t2 - t0, 3),
+            }
         )
 
+        return insert_count, update_count
+
+    def do_mark_deleted(
+        self,
+        foreign_table: sqlalchemy.Table,
+        staging_table: sqlalchemy.Table,
+        db_session: db.Session | None = None,
+    ) -> int:
+        """Find deleted rows, set is_deleted=TRUE, and reset transformed_at to NULL.
+
+        The staging table is checked one range of primary keys at a time. The keys in the
+        foreign table for each range are copied into a temporary table and compared against
+        locally, and each range is committed separately, so that no one transaction runs for
+        long or holds locks on many rows.
+        """
+        if db_session is None:
+            db_session = self.db_session
+
+        log_extra = {"table": foreign_table.name}
+        key_table = sql.build_key_table(foreign_table)
+        deleted_at = datetime_util.utcnow()
+
         t0 = time.monotonic()
-        logger.info("Fetched records to be deleted", extra=log_extra)
-        with self.db_session.begin():
-            result = self.db_session.execute(update_sql)
+        delete_chunk_count = []
+        checked_count = 0
+        last_key: tuple | None = None
+        logger.info("Checking for deleted records, beginning batches", extra=log_extra)
+        while True:
+            with db_session.begin():
+                keys = db_session.execute(
+                    sql.build_select_key_range_sql(staging_table, last_key, self.delete_chunk_size)
+                ).all()
+                if len(keys) == 0:
+                    break
+
+                first_key, last_key = tuple(keys[0]), tuple(keys[-1])
+                key_table.create(db_session.connection())
+                db_session.execute(
+                    sql.build_insert_keys_in_range_sql(
+                        foreign_table, key_table, first_key, last_key
+                    )
+                )
+
+                update_sql = sql.build_mark_deleted_in_range_sql(
+                    key_table, staging_table, first_key, last_key
+                ).values(transformed_at=None, deleted_at=deleted_at)
+                result = db_session.execute(update_sql)
+
+            delete_chunk_count.append(result.rowcount)  # type: ignore[attr-defined]
+            checked_count += len(keys)
+            logger.info(
+                "delete chunk done",
+                extra=log_extra | {"count": sum(delete_chunk_count), "checked": checked_count},
+            )
+
         t1 = time.monotonic()
-        delete_count = result.rowcount
+        delete_count = sum(delete_chunk_count)
 
         self.increment("count.delete.total", delete_count)
-        self.set_metrics({f"count.delete.{staging_table.name}": delete_count})
-        self.set_metrics({f"time.delete.{staging_table.name}": round(t1 - t0, 3)})
+        self.set_metrics(
+            {
+                f"count.delete.{staging_table.name}": delete_count,
+                f"count.delete.chunk.{staging_table.name}": ",".join(map(str, delete_chunk_count)),
+                f"count.delete.checked.{staging_table.name}": checked_count,
+                f"time.delete.{staging_table.name}": round(t1 - t0, 3),
+            }
+        )
         logger.info("Delete done", extra=log_extra | {"count": delete_count})
 
         return delete_count
 
-    def log_row_count(self, message: str, *tables: sqlalchemy.Table) -> None:
+    def log_row_count(
+        self, message: str, *tables: sqlalchemy.Table, db_session: db.Session | None = None
+    ) -> None:
         """Log the number of rows in each of the tables using SQL COUNT()."""
+        if db_session is None:
+            db_session = self.db_session
+
         extra: dict = {}
-        with self.db_session.begin():
+        with db_session.begin():
             for table in tables:
-                count = self.db_session.query(table).count()
+                count = db_session.query(table).count()
                 extra["table"] = table.name
                 extra[f"count.{table.schema}.{table.name}"] = count
                 self.set_metrics({f"count.{message}.{table.schema}.{table.name}": count})
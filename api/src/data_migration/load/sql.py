@@ -2,29 +2,43 @@
 # SQL building for data load process.
 #
 
+import datetime
 from typing import Iterable
 
 import sqlalchemy
 
 
 def build_select_new_rows_sql(
-    source_table: sqlalchemy.Table, destination_table: sqlalchemy.Table
+    source_table: sqlalchemy.Table,
+    destination_table: sqlalchemy.Table,
+    changed_since: datetime.datetime | None = None,
 ) -> sqlalchemy.Select:
-    """Build a `SELECT id1, id2, ... FROM <source_table>` query that finds new rows in source_table."""
+    """Build a `SELECT id1, id2, ... FROM <source_table>` query that finds new rows in source_table.
+
+    If changed_since is set, only rows created or updated after it are considered, with the
+    filter on the source table itself so that it can be pushed down to the foreign server.
+    """
 
     # `SELECT id1, id2, id3, ... FROM <source_table>`    (id1, id2, ... is the multipart primary key)
-    return (
-        sqlalchemy.select(*source_table.primary_key.columns)
-        .where(
-            # `WHERE (id1, id2, id3, ...) NOT IN`
-            sqlalchemy.tuple_(*source_table.primary_key.columns).not_in(
-                # `(SELECT (id1, id2, id3, ...) FROM <destination_table>)`    (subquery)
-                sqlalchemy.select(*destination_table.primary_key.columns)
-            )
+    select_sql = sqlalchemy.select(*source_table.primary_key.columns).where(
+        # `WHERE (id1, id2, id3, ...) NOT IN`
+        sqlalchemy.tuple_(*source_table.primary_key.columns).not_in(
+            # `(SELECT (id1, id2, id3, ...) FROM <destination_table>)`    (subquery)
+            sqlalchemy.select(*destination_table.primary_key.columns)
         )
-        .order_by(*source_table.primary_key.columns)
     )
 
+    if changed_since is not None:
+        # `AND (last_upd_date > :changed_since OR created_date > :changed_since)`
+        select_sql = select_sql.where(
+            sqlalchemy.or_(
+                source_table.c.last_upd_date > changed_since,
+                source_table.c.created_date > changed_since,
+            )
+        )
+
+    return select_sql.order_by(*source_table.primary_key.columns)
+
 
 def build_insert_select_sql(
     source_table: sqlalchemy.Table,
@@ -52,14 +66,19 @@ def build_insert_select_sql(
 
 
 def build_select_updated_rows_sql(
-    source_table: sqlalchemy.Table, destination_table: sqlalchemy.Table
+    source_table: sqlalchemy.Table,
+    destination_table: sqlalchemy.Table,
+    changed_since: datetime.datetime | None = None,
 ) -> sqlalchemy.Select:
-    """Build a `SELECT id1, id2, ... FROM <source_table>` query that finds updated rows in source_table."""
+    """Build a `SELECT id1, id2, ... FROM <source_table>` query that finds updated rows in source_table.
+
+    If changed_since is set, only rows updated after it are considered, with the filter on
+    the source table itself so that it can be pushed down to the foreign server.
+    """
 
     # `SELECT id1, id2, id3, ... FROM <destination_table>`
-    return (
-        sqlalchemy.select(*destination_table.primary_key.columns)
-        .join(
+    select_sql = (
+        sqlalchemy.select(*destination_table.primary_key.columns).join(
             # `JOIN <source_table>
             #  ON (id1, id2, ...) = (id1, id2, ...)`
             source_table,
@@ -76,9 +95,14 @@ def build_select_updated_rows_sql(
             )
             < source_table.c.last_upd_date
         )
-        .order_by(*source_table.primary_key.columns)
     )
 
+    if changed_since is not None:
+        # `AND <source_table>.last_upd_date > :changed_since`
+        select_sql = select_sql.where(source_table.c.last_upd_date > changed_since)
+
+    return select_sql.order_by(*source_table.primary_key.columns)
+
 
 def build_update_sql(
     source_table: sqlalchemy.Table,
@@ -101,10 +125,186 @@ def build_update_sql(
     )
 
 
-def build_mark_deleted_sql(
+def build_select_changed_rows_sql(
+    source_table: sqlalchemy.Table,
+    destination_table: sqlalchemy.Table,
+    changed_since: datetime.datetime | None = None,
+) -> sqlalchemy.Select:
+    """Build a `SELECT <source_table>.* FROM ...` query for the rows that are new or updated.
+
+    This finds the same rows as build_select_new_rows_sql and build_select_updated_rows_sql
+    together, with a single scan of the source table.
+    """
+
+    # `SELECT <source_table>.* FROM <source_table>
+    #  LEFT OUTER JOIN <destination_table> ON (id1, id2, ...) = (id1, id2, ...)`
+    select_sql = (
+        sqlalchemy.select(source_table)
+        .outerjoin(
+            destination_table,
+            sqlalchemy.tuple_(*destination_table.primary_key.columns)
+            == sqlalchemy.tuple_(*source_table.primary_key.columns),
+        )
+        .where(
+            sqlalchemy.or_(
+                # `WHERE <destination_table>.id1 IS NULL`    (a new row)
+                destination_table.primary_key.columns[0].is_(None),
+                # `OR coalesce(last_upd_date, created_date) < <source_table>.last_upd_date`
+                # (an updated row, see build_select_updated_rows_sql for why the coalesce)
+                sqlalchemy.func.coalesce(
+                    destination_table.c.last_upd_date, destination_table.c.created_date
+                )
+                < source_table.c.last_upd_date,
+            )
+        )
+    )
+
+    if changed_since is not None:
+        # `AND (<source_table>.last_upd_date > :changed_since
+        #       OR <source_table>.created_date > :changed_since)`
+        select_sql = select_sql.where(
+            sqlalchemy.or_(
+                source_table.c.last_upd_date > changed_since,
+                source_table.c.created_date > changed_since,
+            )
+        )
+
+    return select_sql
+
+
+def build_transfer_table(source_table: sqlalchemy.Table) -> sqlalchemy.Table:
+    """Build a temporary table with the same columns and primary key as source_table.
+
+    The table is dropped when the transaction it's created in ends. Temporary tables
+    aren't written to the WAL, so filling one is about as cheap as a write can be.
+    """
+    return sqlalchemy.Table(
+        f"{source_table.name}_transfer",
+        sqlalchemy.MetaData(),
+        *(
+            sqlalchemy.Column(column.name, column.type, primary_key=column.primary_key)
+            for column in source_table.columns
+        ),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+
+
+def build_update_from_table_sql(
     source_table: sqlalchemy.Table, destination_table: sqlalchemy.Table
 ) -> sqlalchemy.Update:
-    """Build an `UPDATE ... SET is_deleted = TRUE WHERE ...` statement for deleted rows."""
+    """Build an `UPDATE ... SET ... FROM <source_table>` statement updating every matching row."""
+
+    return (
+        # `UPDATE <destination_table>`
+        sqlalchemy.update(destination_table)
+        # `SET col1=source_table.col1, col2=source_table.col2, ...`
+        .values(dict(source_table.columns))
+        # `WHERE (id1, id2, ...) = (id1, id2, ...)`
+        .where(
+            sqlalchemy.tuple_(*destination_table.primary_key.columns)
+            == sqlalchemy.tuple_(*source_table.primary_key.columns),
+        )
+    )
+
+
+def build_insert_missing_rows_sql(
+    source_table: sqlalchemy.Table, destination_table: sqlalchemy.Table
+) -> sqlalchemy.Insert:
+    """Build an `INSERT INTO ... SELECT ...` statement for rows not yet in destination_table."""
+
+    all_columns = tuple(c.name for c in source_table.columns)
+
+    # `SELECT col1, col2, ..., FALSE AS is_deleted FROM <source_table>`
+    select_sql = sqlalchemy.select(
+        source_table, sqlalchemy.literal_column("FALSE").label("is_deleted")
+    ).where(
+        # `WHERE NOT EXISTS (SELECT * FROM <destination_table>
+        #  WHERE (id1, id2, ...) = (id1, id2, ...))`
+        ~sqlalchemy.exists().where(
+            sqlalchemy.tuple_(*destination_table.primary_key.columns)
+            == sqlalchemy.tuple_(*source_table.primary_key.columns)
+        )
+    )
+    # `INSERT INTO <destination_table> (col1, col2, ..., is_deleted) SELECT ...`
+    return sqlalchemy.insert(destination_table).from_select(
+        all_columns + (destination_table.c.is_deleted,), select_sql
+    )
+
+
+def build_select_key_range_sql(
+    destination_table: sqlalchemy.Table, after_key: tuple | None, limit: int
+) -> sqlalchemy.Select:
+    """Build a `SELECT id1, id2, ... FROM <destination_table>` query for the next range of keys.
+
+    Ranges are found by keyset pagination, starting after the last key of the previous range.
+    """
+
+    # `SELECT id1, id2, id3, ... FROM <destination_table> WHERE is_deleted = FALSE`
+    select_sql = sqlalchemy.select(*destination_table.primary_key.columns).where(
+        destination_table.c.is_deleted == False  # noqa: E712
+    )
+
+    if after_key is not None:
+        # `AND (id1, id2, ...) > (:after_id1, :after_id2, ...)`
+        select_sql = select_sql.where(
+            sqlalchemy.tuple_(*destination_table.primary_key.columns)
+            > sqlalchemy.tuple_(*after_key)
+        )
+
+    # `ORDER BY id1, id2, ... LIMIT :limit`
+    return select_sql.order_by(*destination_table.primary_key.columns).limit(limit)
+
+
+def build_key_table(source_table: sqlalchemy.Table) -> sqlalchemy.Table:
+    """Build a temporary table with the primary key columns of source_table.
+
+    Like build_transfer_table, the table is dropped when its transaction ends.
+    """
+    return sqlalchemy.Table(
+        f"{source_table.name}_keys",
+        sqlalchemy.MetaData(),
+        *(
+            sqlalchemy.Column(column.name, column.type, primary_key=True)
+            for column in source_table.primary_key.columns
+        ),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+
+
+def build_insert_keys_in_range_sql(
+    source_table: sqlalchemy.Table,
+    key_table: sqlalchemy.Table,
+    first_key: tuple,
+    last_key: tuple,
+) -> sqlalchemy.Insert:
+    """Build an `INSERT INTO <key_table> SELECT id1, id2, ... FROM <source_table>` statement.
+
+    Only the first primary key column is filtered on, as a simple range that can be pushed
+    down to the foreign server. This can copy a few keys outside of the range, which is harmless.
+    """
+    first_column = source_table.primary_key.columns[0]
+
+    # `INSERT INTO <key_table> (id1, id2, ...)
+    #  SELECT id1, id2, ... FROM <source_table> WHERE id1 >= :first_id1 AND id1 <= :last_id1`
+    return sqlalchemy.insert(key_table).from_select(
+        [column.name for column in source_table.primary_key.columns],
+        sqlalchemy.select(*source_table.primary_key.columns).where(
+            first_column >= first_key[0], first_column <= last_key[0]
+        ),
+    )
+
+
+def build_mark_deleted_in_range_sql(
+    key_table: sqlalchemy.Table,
+    destination_table: sqlalchemy.Table,
+    first_key: tuple,
+    last_key: tuple,
+) -> sqlalchemy.Update:
+    """Build an `UPDATE ... SET is_deleted = TRUE WHERE ...` statement for deleted rows in a range."""
+    destination_key = sqlalchemy.tuple_(*destination_table.primary_key.columns)
+
     return (
         # `UPDATE <destination_table>`
         sqlalchemy.update(destination_table)
@@ -114,10 +314,24 @@ def build_mark_deleted_sql(
         .where(
             # `is_deleted == FALSE`
             destination_table.c.is_deleted == False,  # noqa: E712
-            # `AND (id1, id2, id3, ...) NOT IN`    (id1, id2, ... is the multipart primary key)
-            sqlalchemy.tuple_(*destination_table.primary_key.columns).not_in(
-                # `(SELECT (id1, id2, id3, ...) FROM <source_table>)`    (subquery)
-                sqlalchemy.select(*source_table.primary_key.columns)
+            # `AND (id1, id2, ...) >= (:first_id1, ...) AND (id1, id2, ...) <= (:last_id1, ...)`
+            destination_key >= sqlalchemy.tuple_(*first_key),
+            destination_key <= sqlalchemy.tuple_(*last_key),
+            # `AND NOT EXISTS (SELECT * FROM <key_table> WHERE (id1, id2, ...) = (id1, id2, ...))`
+            ~sqlalchemy.exists().where(
+                destination_key == sqlalchemy.tuple_(*key_table.primary_key.columns)
             ),
         )
     )
+
+
+def build_select_watermark_sql(destination_table: sqlalchemy.Table) -> sqlalchemy.Select:
+    """Build a `SELECT MAX(...) FROM <destination_table>` query for the latest change loaded."""
+    # `SELECT MAX(COALESCE(last_upd_date, created_date)) FROM <destination_table>`
+    return sqlalchemy.select(
+        sqlalchemy.func.max(
+            sqlalchemy.func.coalesce(
+                destination_table.c.last_upd_date, destination_table.c.created_date
+            )
+        )
+    )
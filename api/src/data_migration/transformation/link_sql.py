@@ -0,0 +1,314 @@
+#
+# SQL building for the set-based transformation of the opportunity summary link tables.
+#
+# The applicant type, funding category and funding instrument link tables are
+# pure code lookups, so rather than loading every staging row as an ORM object,
+# these statements translate the legacy codes with a lookup CTE and apply all
+# of the deletes, updates and inserts for a staging table at once.
+#
+
+import dataclasses
+import datetime
+from enum import StrEnum
+from typing import Mapping, Type
+
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert
+
+import src.data_migration.transformation.transform_constants as transform_constants
+from src.adapters.db.type_decorators.postgres_type_decorators import LookupColumn
+from src.db.models.base import ApiSchemaTable
+from src.db.models.lookup import LookupRegistry
+from src.db.models.opportunity_models import OpportunitySummary
+from src.db.models.staging.staging_base import StagingBase
+
+# The legacy timestamps have no timezone info, but are in US Eastern time,
+# see transform_util.convert_est_timestamp_to_utc
+LEGACY_TIMEZONE = "US/Eastern"
+
+
+@dataclasses.dataclass(frozen=True)
+class LinkTableMapping:
+    """How a (non-historical) staging table maps onto an opportunity summary link table"""
+
+    source_model: Type[StagingBase]
+    # The column with the legacy ID, eg. at_frcst_id
+    source_legacy_id_column: str
+    # The column with the legacy lookup code, eg. at_id
+    source_code_column: str
+
+    link_model: Type[ApiSchemaTable]
+    # The columns the legacy ID and lookup value are stored in, eg. legacy_applicant_type_id
+    link_legacy_id_column: str
+    link_lookup_column: str
+
+    # The legacy code -> lookup enum mapping, eg. transform_util.APPLICANT_TYPE_MAP
+    lookup_map: Mapping[str, StrEnum]
+    is_forecast: bool
+
+    @property
+    def source_table(self) -> sqlalchemy.Table:
+        return self.source_model.__table__  # type: ignore[return-value]
+
+    @property
+    def link_table(self) -> sqlalchemy.Table:
+        return self.link_model.__table__  # type: ignore[return-value]
+
+
+def build_lookup_cte(mapping: LinkTableMapping) -> sqlalchemy.CTE:
+    """Build a `lookup(legacy_code, lookup_id)` CTE from the legacy code mapping."""
+    lookup_column_type = mapping.link_table.c[mapping.link_lookup_column].type
+    if not isinstance(lookup_column_type, LookupColumn):
+        raise Exception(f"Column {mapping.link_lookup_column} is not a lookup column")
+
+    # `SELECT * FROM (VALUES ('00', 1), ('01', 2), ...) AS lookup_values (legacy_code, lookup_id)`
+    lookup_values = sqlalchemy.values(
+        sqlalchemy.column("legacy_code", sqlalchemy.Text),
+        sqlalchemy.column("lookup_id", sqlalchemy.Integer),
+        name="lookup_values",
+    ).data(
+        [
+            (
+                legacy_code,
+                LookupRegistry.get_lookup_int_for_enum(lookup_column_type.lookup_table, value),
+            )
+            for legacy_code, value in mapping.lookup_map.items()
+        ]
+    )
+
+    return sqlalchemy.select(lookup_values).cte("lookup")
+
+
+def build_candidates_cte(
+    mapping: LinkTableMapping, lookup: sqlalchemy.CTE, now: datetime.datetime
+) -> sqlalchemy.CTE:
+    """Build a CTE of every staging row that needs transforming, alongside the opportunity
+    summary, lookup value and existing link record it corresponds to.
+
+    Rows with no opportunity summary or an unrecognized code have a null
+    opportunity_summary_id or lookup_id respectively.
+    """
+    source = mapping.source_table
+    link = mapping.link_table
+    summary: sqlalchemy.Table = OpportunitySummary.__table__  # type: ignore[assignment]
+
+    return (
+        sqlalchemy.select(
+            *source.primary_key.columns,
+            source.c[mapping.source_legacy_id_column].label("legacy_id"),
+            source.c.is_deleted,
+            source.c.creator_id,
+            source.c.last_upd_id,
+            _build_timestamp(source.c.created_date, now).label("created_at"),
+            _build_timestamp(
+                source.c.last_upd_date, _build_timestamp(source.c.created_date, now)
+            ).label("updated_at"),
+            summary.c.opportunity_summary_id,
+            lookup.c.lookup_id,
+            link.c[mapping.link_legacy_id_column].is_not(None).label("has_link"),
+        )
+        .select_from(source)
+        # `LEFT OUTER JOIN opportunity_summary ON opportunity_id = ... AND is_forecast IS ...`
+        .outerjoin(
+            summary,
+            sqlalchemy.and_(
+                source.c.opportunity_id == summary.c.opportunity_id,
+                summary.c.is_forecast.is_(mapping.is_forecast),
+                summary.c.revision_number.is_(None),
+            ),
+        )
+        # `LEFT OUTER JOIN lookup ON lookup.legacy_code = <source_code_column>`
+        .outerjoin(lookup, lookup.c.legacy_code == source.c[mapping.source_code_column])
+        # `LEFT OUTER JOIN <link_table> ON <link_legacy_id_column> = ... AND opportunity_summary_id = ...`
+        .outerjoin(
+            link,
+            sqlalchemy.and_(
+                link.c[mapping.link_legacy_id_column] == source.c[mapping.source_legacy_id_column],
+                link.c.opportunity_summary_id == summary.c.opportunity_summary_id,
+            ),
+        )
+        .where(source.c.transformed_at.is_(None))
+        .cte("candidates")
+    )
+
+
+def _build_timestamp(
+    legacy_timestamp: sqlalchemy.ColumnElement,
+    default: sqlalchemy.ColumnElement | datetime.datetime,
+) -> sqlalchemy.ColumnElement:
+    # Take the timestamp as it reads in the session's timezone, and reinterpret
+    # it as US Eastern, matching what convert_est_timestamp_to_utc does in Python
+    return sqlalchemy.func.coalesce(
+        sqlalchemy.func.timezone(
+            LEGACY_TIMEZONE,
+            sqlalchemy.func.timezone(sqlalchemy.func.current_setting("TimeZone"), legacy_timestamp),
+        ),
+        default,
+    )
+
+
+def _is_transformable(candidates: sqlalchemy.CTE) -> sqlalchemy.ColumnElement[bool]:
+    # A non-deleted row can only be transformed if its summary exists and its code is recognized
+    return sqlalchemy.and_(
+        candidates.c.is_deleted.is_(False),
+        candidates.c.opportunity_summary_id.is_not(None),
+        candidates.c.lookup_id.is_not(None),
+    )
+
+
+def _is_error(candidates: sqlalchemy.CTE) -> sqlalchemy.ColumnElement[bool]:
+    return sqlalchemy.and_(
+        candidates.c.is_deleted.is_(False),
+        sqlalchemy.or_(
+            candidates.c.opportunity_summary_id.is_(None), candidates.c.lookup_id.is_(None)
+        ),
+    )
+
+
+def build_count_candidates_sql(candidates: sqlalchemy.CTE) -> sqlalchemy.Select:
+    """Build a query that counts the candidates by what will happen to them."""
+
+    def count_where(*criteria: sqlalchemy.ColumnElement) -> sqlalchemy.ColumnElement:
+        return sqlalchemy.func.count().filter(sqlalchemy.and_(*criteria))
+
+    return sqlalchemy.select(
+        sqlalchemy.func.count().label("processed"),
+        count_where(candidates.c.is_deleted, candidates.c.has_link).label("deleted"),
+        count_where(candidates.c.is_deleted, candidates.c.has_link.is_(False)).label(
+            "delete_orphans"
+        ),
+        count_where(_is_transformable(candidates), candidates.c.has_link).label("updated"),
+        count_where(_is_transformable(candidates), candidates.c.has_link.is_(False)).label(
+            "to_insert"
+        ),
+        count_where(_is_error(candidates)).label("errors"),
+    ).select_from(candidates)
+
+
+def build_mark_orphaned_deletes_sql(
+    mapping: LinkTableMapping, candidates: sqlalchemy.CTE
+) -> sqlalchemy.Update:
+    """Build an update noting on the staging rows which delete a link that doesn't exist."""
+    source = mapping.source_table
+
+    return (
+        sqlalchemy.update(source)
+        .where(
+            sqlalchemy.tuple_(*source.primary_key.columns).in_(
+                sqlalchemy.select(
+                    *[candidates.c[column.name] for column in source.primary_key.columns]
+                ).where(candidates.c.is_deleted, candidates.c.has_link.is_(False))
+            )
+        )
+        .values(transformation_notes=transform_constants.ORPHANED_DELETE_RECORD)
+    )
+
+
+def build_delete_links_sql(
+    mapping: LinkTableMapping, candidates: sqlalchemy.CTE
+) -> sqlalchemy.Delete:
+    """Build a `DELETE FROM <link_table>` for the links whose staging rows are deleted."""
+    link = mapping.link_table
+
+    # `DELETE FROM <link_table> WHERE (opportunity_summary_id, <link_legacy_id_column>) IN (...)`
+    return sqlalchemy.delete(link).where(
+        sqlalchemy.tuple_(link.c.opportunity_summary_id, link.c[mapping.link_legacy_id_column]).in_(
+            sqlalchemy.select(candidates.c.opportunity_summary_id, candidates.c.legacy_id).where(
+                candidates.c.is_deleted, candidates.c.has_link
+            )
+        )
+    )
+
+
+def build_update_links_sql(
+    mapping: LinkTableMapping, candidates: sqlalchemy.CTE
+) -> sqlalchemy.Update:
+    """Build an `UPDATE <link_table> ... FROM candidates` for the links that already exist."""
+    link = mapping.link_table
+
+    return (
+        sqlalchemy.update(link)
+        .where(
+            link.c.opportunity_summary_id == candidates.c.opportunity_summary_id,
+            link.c[mapping.link_legacy_id_column] == candidates.c.legacy_id,
+            _is_transformable(candidates),
+        )
+        .values(
+            {
+                mapping.link_lookup_column: candidates.c.lookup_id,
+                "updated_by": candidates.c.last_upd_id,
+                "created_by": candidates.c.creator_id,
+                "created_at": candidates.c.created_at,
+                "updated_at": candidates.c.updated_at,
+            }
+        )
+    )
+
+
+def build_insert_links_sql(
+    mapping: LinkTableMapping, candidates: sqlalchemy.CTE
+) -> sqlalchemy.Insert:
+    """Build an `INSERT INTO <link_table> ... SELECT ... FROM candidates` for the new links.
+
+    The legacy tables can have the same lookup value several times for an opportunity
+    summary under different legacy IDs. Only the first is inserted, and any that are
+    already attached to the opportunity summary are skipped.
+    """
+    link = mapping.link_table
+
+    select_sql = (
+        sqlalchemy.select(
+            candidates.c.opportunity_summary_id,
+            candidates.c.lookup_id,
+            candidates.c.legacy_id,
+            candidates.c.last_upd_id,
+            candidates.c.creator_id,
+            candidates.c.created_at,
+            candidates.c.updated_at,
+        )
+        .where(_is_transformable(candidates), candidates.c.has_link.is_(False))
+        # `SELECT DISTINCT ON (opportunity_summary_id, lookup_id) ... ORDER BY ..., legacy_id`
+        .distinct(candidates.c.opportunity_summary_id, candidates.c.lookup_id)
+        .order_by(
+            candidates.c.opportunity_summary_id, candidates.c.lookup_id, candidates.c.legacy_id
+        )
+    )
+
+    return (
+        insert(link).from_select(
+            [
+                "opportunity_summary_id",
+                mapping.link_lookup_column,
+                mapping.link_legacy_id_column,
+                "updated_by",
+                "created_by",
+                "created_at",
+                "updated_at",
+            ],
+            select_sql,
+        )
+        # `ON CONFLICT (opportunity_summary_id, <link_lookup_column>) DO NOTHING`
+        .on_conflict_do_nothing(index_elements=link.primary_key.columns)
+    )
+
+
+def build_mark_transformed_sql(
+    mapping: LinkTableMapping, candidates: sqlalchemy.CTE, transform_time: datetime.datetime
+) -> sqlalchemy.Update:
+    """Build an update setting transformed_at on every staging row that didn't error.
+
+    Rows that errored are left untransformed so that they get picked up again next run.
+    """
+    source = mapping.source_table
+
+    return (
+        sqlalchemy.update(source)
+        .where(
+            sqlalchemy.tuple_(*source.primary_key.columns).in_(
+                sqlalchemy.select(
+                    *[candidates.c[column.name] for column in source.primary_key.columns]
+                ).where(sqlalchemy.not_(_is_error(candidates)))
+            )
+        )
+        .values(transformed_at=transform_time)
+    )
@@ -1,20 +1,34 @@
 import abc
 import logging
+import resource
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Any, Sequence, Tuple, Type, cast
+from typing import Any, ClassVar, Iterable, Iterator, Sequence, Tuple, Type, cast
 
-from sqlalchemy import and_, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Column, Select, and_, inspect, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapper, object_mapper, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.base import ExecutableOption
 
+import src.data_migration.transformation.link_sql as link_sql
 import src.data_migration.transformation.transform_constants as transform_constants
+from src.db.models.base import ApiSchemaTable
 from src.db.models.opportunity_models import Opportunity, OpportunitySummary
+from src.db.models.staging.staging_base import StagingParamMixin
 from src.task.subtask import SubTask
 from src.task.task import Task
+from src.util import datetime_util
 
 logger = logging.getLogger(__name__)
 
 
 class AbstractTransformSubTask(SubTask):
+    # The subtasks whose records this one relies on existing. When the
+    # subtasks are run concurrently, this subtask waits for them to finish.
+    depends_on: ClassVar[tuple[type["AbstractTransformSubTask"], ...]] = ()
+
     def __init__(self, task: Task):
         super().__init__(task)
 
@@ -27,6 +41,17 @@ class AbstractTransformSubTask(SubTask):
 
         self.transform_time: datetime = transform_time
 
+        # If set, records are fetched and committed in batches of this size, and removed
+        # from the session after each commit, rather than processed in one transaction
+        transform_config = getattr(task, "transform_config", None)
+        self.commit_batch_size: int | None = getattr(transform_config, "commit_batch_size", None)
+
+        # Tracking of the records fetched in the current commit batch
+        self._last_fetched_keys: dict[type, tuple] = {}
+        self._batch_records: list[Any] = []
+        self._batch_row_count = 0
+        self._is_batch_full = False
+
     def has_more_to_process(self) -> bool:
         """Method for the derived classes to override if
         they want to indicate they have more batches to process
@@ -36,6 +61,10 @@ class AbstractTransformSubTask(SubTask):
         return False
 
     def run_subtask(self) -> None:
+        if self.commit_batch_size is not None:
+            self.run_subtask_in_commit_batches()
+            return
+
         batch_num = 0
         while True:
             batch_num += 1
@@ -64,6 +93,105 @@ class AbstractTransformSubTask(SubTask):
             # our db session creation logic disables it, so it's the ordinary behavior.
             self.db_session.expire_all()
 
+    def run_subtask_in_commit_batches(self) -> None:
+        """Process the records a batch at a time, committing each batch and then
+        removing its records from the session, so memory use stays bounded
+        however many records there are to process.
+
+        Each fetch picks up after the last record the previous batch fetched, so records
+        that fail to transform aren't fetched again until the next run.
+        """
+        start = time.perf_counter()
+        total_row_count = 0
+        batch_num = 0
+        self._last_fetched_keys = {}
+
+        while True:
+            batch_num += 1
+            self._batch_records = []
+            self._batch_row_count = 0
+            self._is_batch_full = False
+
+            with self.db_session.begin():
+                self.transform_records()
+
+            # The records are committed, so they don't need to be held in the session anymore
+            for record in self._batch_records:
+                if record in self.db_session:
+                    self.db_session.expunge(record)
+
+            total_row_count += self._batch_row_count
+            logger.info(
+                "Committed batch %s of transformations for %s",
+                batch_num,
+                self.cls_name(),
+                extra={"batch_row_count": self._batch_row_count},
+            )
+
+            if self._is_batch_full:
+                continue
+
+            if not self.has_more_to_process():
+                break
+
+            # As a sanity check, if more than 100 batches run, stop processing
+            # and we'll assume the job got stuck.
+            if batch_num > 100:
+                logger.error(
+                    "Job %s has run 100 batches, stopping further processing in case job is stuck",
+                    self.cls_name(),
+                )
+                break
+
+        duration = time.perf_counter() - start
+        self.set_metrics(
+            {
+                f"{self.cls_name()}_commit_batch_count": batch_num,
+                f"{self.cls_name()}_rows_per_sec": round(total_row_count / duration, 1),
+                # This is the peak of the whole process, in kilobytes on Linux
+                f"{self.cls_name()}_peak_rss_mb": round(
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+                ),
+            }
+        )
+
+    def _paginate_commit_batch(self, select_query: Select, source_model: type) -> Select:
+        # Fetch the next batch of records, ordered by primary key
+        # and picking up after the last record already fetched
+        if self.commit_batch_size is None:
+            return select_query
+
+        primary_key: Sequence[Column] = inspect(source_model).primary_key
+        last_key = self._last_fetched_keys.get(source_model)
+        if last_key is not None:
+            select_query = select_query.where(tuple_(*primary_key) > tuple_(*last_key))
+
+        return select_query.order_by(*primary_key).limit(self.commit_batch_size)
+
+    def _track_commit_batch(self, rows: Iterable[Any], source_model: type) -> Iterable[Any]:
+        if self.commit_batch_size is None:
+            return rows
+
+        return self._iter_commit_batch(rows, source_model, self.commit_batch_size)
+
+    def _iter_commit_batch(
+        self, rows: Iterable[Any], source_model: type, commit_batch_size: int
+    ) -> Iterator[Any]:
+        mapper: Mapper = inspect(source_model)
+        row_count = 0
+
+        for row in rows:
+            row_count += 1
+            self._batch_row_count += 1
+            self._last_fetched_keys[source_model] = tuple(mapper.primary_key_from_instance(row[0]))
+            self._batch_records.extend(record for record in row if record is not None)
+
+            # If a whole batch was fetched, there may be more to process
+            if row_count == commit_batch_size:
+                self._is_batch_full = True
+
+            yield row
+
     @abc.abstractmethod
     def transform_records(self) -> None:
         """Abstract method implemented by derived, returns True when done processing"""
@@ -118,6 +246,111 @@ class AbstractTransformSubTask(SubTask):
         )
         source_record.transformation_notes = transform_constants.ORPHANED_HISTORICAL_RECORD
 
+    def bulk_upsert(self, records: Sequence[ApiSchemaTable]) -> None:
+        """Write transformed records with INSERT ... ON CONFLICT DO UPDATE statements
+
+        Unlike merging each record into the session, this doesn't select the existing
+        record first, and only the columns set on each record are written. As the
+        statement is an insert, each record still needs every non-null column set.
+        """
+        # A new record may not set every column an updated one does (eg. the primary key
+        # of an opportunity summary), so the records are grouped by the columns they set
+        grouped_values: dict[tuple[Any, frozenset[str]], list[dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            state = inspect(record)
+            values = {
+                attr.columns[0].key: state.dict[attr.key]
+                for attr in state.mapper.column_attrs
+                if attr.key in state.dict
+            }
+            grouped_values[(state.mapper.local_table, frozenset(values))].append(values)
+
+        for (table, columns), values_list in grouped_values.items():
+            primary_key = [column.name for column in table.primary_key.columns]
+
+            insert_stmt = insert(table).values(values_list)
+            self.db_session.execute(
+                insert_stmt.on_conflict_do_update(
+                    index_elements=primary_key,
+                    set_={
+                        column: insert_stmt.excluded[column]
+                        for column in columns
+                        if column not in primary_key
+                    },
+                )
+            )
+
+    def bulk_mark_transformed(self, source_records: Sequence[StagingParamMixin]) -> None:
+        """Set transformed_at on the source records with one UPDATE per table"""
+        grouped_records: dict[Any, list[StagingParamMixin]] = defaultdict(list)
+        for source_record in source_records:
+            grouped_records[object_mapper(source_record)].append(source_record)
+
+        for mapper, records in grouped_records.items():
+            table = mapper.local_table
+            self.db_session.execute(
+                update(table)
+                .where(
+                    tuple_(*table.primary_key.columns).in_(
+                        [mapper.primary_key_from_instance(record) for record in records]
+                    )
+                )
+                .values(transformed_at=self.transform_time)
+            )
+
+            # Keep the records in the session in sync, without them being flushed again
+            for record in records:
+                set_committed_value(record, "transformed_at", self.transform_time)
+
+    def transform_link_records_with_sql(
+        self, mapping: link_sql.LinkTableMapping, record_type: str
+    ) -> None:
+        """Transform a staging table into its opportunity summary link table
+        with a handful of set-based statements rather than row by row.
+
+        Produces the same records and metrics as processing each row with the ORM,
+        except that errors are only logged as a count rather than per record.
+        """
+        lookup = link_sql.build_lookup_cte(mapping)
+        candidates = link_sql.build_candidates_cte(mapping, lookup, datetime_util.utcnow())
+
+        counts = self.db_session.execute(link_sql.build_count_candidates_sql(candidates)).one()
+
+        # The orphaned deletes need noting before the deletes remove the links
+        # that the other deleted records are matched up with
+        self.db_session.execute(link_sql.build_mark_orphaned_deletes_sql(mapping, candidates))
+        self.db_session.execute(link_sql.build_delete_links_sql(mapping, candidates))
+        self.db_session.execute(link_sql.build_update_links_sql(mapping, candidates))
+        inserted = self.db_session.execute(
+            link_sql.build_insert_links_sql(mapping, candidates)
+        ).rowcount  # type: ignore[attr-defined]
+        self.db_session.execute(
+            link_sql.build_mark_transformed_sql(mapping, candidates, self.transform_time)
+        )
+
+        if counts.errors > 0:
+            logger.warning(
+                "Failed to process %s records, they either have no opportunity summary or an unrecognized value",
+                record_type,
+                extra={"table_name": mapping.source_table.name, "error_count": counts.errors},
+            )
+
+        for metric, value in [
+            (transform_constants.Metrics.TOTAL_RECORDS_PROCESSED, counts.processed),
+            (transform_constants.Metrics.TOTAL_RECORDS_DELETED, counts.deleted),
+            (transform_constants.Metrics.TOTAL_DELETE_ORPHANS_SKIPPED, counts.delete_orphans),
+            (transform_constants.Metrics.TOTAL_RECORDS_UPDATED, counts.updated),
+            (transform_constants.Metrics.TOTAL_RECORDS_INSERTED, inserted),
+            (
+                transform_constants.Metrics.TOTAL_DUPLICATE_RECORDS_SKIPPED,
+                counts.to_insert - inserted,
+            ),
+            (transform_constants.Metrics.TOTAL_ERROR_COUNT, counts.errors),
+        ]:
+            # Only record the metrics that occurred, same as the row by row processing does
+            if value > 0:
+                self.increment(metric, value, prefix=record_type)
+
     def fetch(
         self,
         source_model: Type[transform_constants.S],
@@ -130,11 +363,17 @@ class AbstractTransformSubTask(SubTask):
         # So just cast it to a simpler type that doesn't confuse anything
         return cast(
             list[Tuple[transform_constants.S, transform_constants.D | None]],
-            self.db_session.execute(
-                select(source_model, destination_model)
-                .join(destination_model, and_(*join_clause), isouter=True)
-                .where(source_model.transformed_at.is_(None))
-                .execution_options(yield_per=5000)
+            self._track_commit_batch(
+                self.db_session.execute(
+                    self._paginate_commit_batch(
+                        select(source_model, destination_model)
+                        .join(destination_model, and_(*join_clause), isouter=True)
+                        .where(source_model.transformed_at.is_(None))
+                        .execution_options(yield_per=5000),
+                        source_model,
+                    )
+                ),
+                source_model,
             ),
         )
 
@@ -145,9 +384,11 @@ class AbstractTransformSubTask(SubTask):
         join_clause: Sequence,
         batch_size: int = 5000,
         limit: int | None = None,
+        options: Sequence[ExecutableOption] = (),
     ) -> list[Tuple[transform_constants.S, transform_constants.D | None, Opportunity | None]]:
         # Similar to the above fetch function, but also grabs an opportunity record
         # Note that this requires your source_model to have an opportunity_id field defined.
+        # Any loader options (eg. to defer loading a column) are applied to the query.
 
         select_query = (
             select(source_model, destination_model, Opportunity)
@@ -158,15 +399,25 @@ class AbstractTransformSubTask(SubTask):
                 isouter=True,
             )
             .where(source_model.transformed_at.is_(None))
+            .options(*options)
             .execution_options(yield_per=batch_size)
         )
 
         if limit is not None:
             select_query = select_query.limit(limit)
+            return cast(
+                list[
+                    Tuple[transform_constants.S, transform_constants.D | None, Opportunity | None]
+                ],
+                self.db_session.execute(select_query),
+            )
 
         return cast(
             list[Tuple[transform_constants.S, transform_constants.D | None, Opportunity | None]],
-            self.db_session.execute(select_query),
+            self._track_commit_batch(
+                self.db_session.execute(self._paginate_commit_batch(select_query, source_model)),
+                source_model,
+            ),
         )
 
     def fetch_with_opportunity_summary(
@@ -200,12 +451,22 @@ class AbstractTransformSubTask(SubTask):
                     transform_constants.S, transform_constants.D | None, OpportunitySummary | None
                 ]
             ],
-            self.db_session.execute(
-                select(source_model, destination_model, OpportunitySummary)
-                .join(OpportunitySummary, and_(*opportunity_summary_join_clause), isouter=True)
-                .join(destination_model, and_(*join_clause), isouter=True)
-                .where(source_model.transformed_at.is_(None))
-                .options(selectinload(relationship_load_value))
-                .execution_options(yield_per=5000, populate_existing=True)
+            self._track_commit_batch(
+                self.db_session.execute(
+                    self._paginate_commit_batch(
+                        select(source_model, destination_model, OpportunitySummary)
+                        .join(
+                            OpportunitySummary,
+                            and_(*opportunity_summary_join_clause),
+                            isouter=True,
+                        )
+                        .join(destination_model, and_(*join_clause), isouter=True)
+                        .where(source_model.transformed_at.is_(None))
+                        .options(selectinload(relationship_load_value))
+                        .execution_options(yield_per=5000, populate_existing=True),
+                        source_model,
+                    )
+                ),
+                source_model,
             ),
         )
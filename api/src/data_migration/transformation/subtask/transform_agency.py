@@ -275,6 +275,9 @@ class TransformAgency(AbstractTransformSubTask):
 
 
 class TransformAgencyHierarchy(AbstractTransformSubTask):
+    # The hierarchy is built from the agencies TransformAgency creates
+    depends_on = (TransformAgency,)
+
     def __init__(self, task: Task):
         super().__init__(task)
 
@@ -1,20 +1,63 @@
 import logging
 from typing import Sequence, Tuple
 
+import src.data_migration.transformation.link_sql as link_sql
 import src.data_migration.transformation.transform_constants as transform_constants
 import src.data_migration.transformation.transform_util as transform_util
 from src.data_migration.transformation.subtask.abstract_transform_subtask import (
     AbstractTransformSubTask,
 )
+from src.data_migration.transformation.subtask.transform_opportunity_summary import (
+    TransformOpportunitySummary,
+)
 from src.db.models.opportunity_models import LinkOpportunitySummaryApplicantType, OpportunitySummary
 from src.db.models.staging.forecast import TapplicanttypesForecast
 from src.db.models.staging.synopsis import TapplicanttypesSynopsis
+from src.task.task import Task
 
 logger = logging.getLogger(__name__)
 
+FORECAST_LINK_MAPPING = link_sql.LinkTableMapping(
+    source_model=TapplicanttypesForecast,
+    source_legacy_id_column="at_frcst_id",
+    source_code_column="at_id",
+    link_model=LinkOpportunitySummaryApplicantType,
+    link_legacy_id_column="legacy_applicant_type_id",
+    link_lookup_column="applicant_type_id",
+    lookup_map=transform_util.APPLICANT_TYPE_MAP,
+    is_forecast=True,
+)
+
+SYNOPSIS_LINK_MAPPING = link_sql.LinkTableMapping(
+    source_model=TapplicanttypesSynopsis,
+    source_legacy_id_column="at_syn_id",
+    source_code_column="at_id",
+    link_model=LinkOpportunitySummaryApplicantType,
+    link_legacy_id_column="legacy_applicant_type_id",
+    link_lookup_column="applicant_type_id",
+    lookup_map=transform_util.APPLICANT_TYPE_MAP,
+    is_forecast=False,
+)
+
 
 class TransformApplicantType(AbstractTransformSubTask):
+    # Applicant types are attached to opportunity summaries
+    depends_on = (TransformOpportunitySummary,)
+
+    def __init__(self, task: Task, use_sql_engine: bool = False):
+        super().__init__(task)
+
+        # Whether to transform all of the records with a few set-based
+        # SQL statements, rather than processing each one with the ORM
+        self.use_sql_engine = use_sql_engine
+
     def transform_records(self) -> None:
+        if self.use_sql_engine:
+            logger.info("Processing forecast and synopsis applicant types with SQL")
+            for mapping in [FORECAST_LINK_MAPPING, SYNOPSIS_LINK_MAPPING]:
+                self.transform_link_records_with_sql(mapping, transform_constants.APPLICANT_TYPE)
+            return
+
         link_table = LinkOpportunitySummaryApplicantType
         relationship_load_value = OpportunitySummary.link_applicant_types
 
@@ -6,6 +6,7 @@ import src.data_migration.transformation.transform_util as transform_util
 from src.data_migration.transformation.subtask.abstract_transform_subtask import (
     AbstractTransformSubTask,
 )
+from src.data_migration.transformation.subtask.transform_opportunity import TransformOpportunity
 from src.db.models.opportunity_models import Opportunity, OpportunityAssistanceListing
 from src.db.models.staging.opportunity import TopportunityCfda
 
@@ -13,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 
 class TransformAssistanceListing(AbstractTransformSubTask):
+    # Assistance listings are attached to opportunities
+    depends_on = (TransformOpportunity,)
+
     def transform_records(self) -> None:
         assistance_listings: list[
             Tuple[TopportunityCfda, OpportunityAssistanceListing | None, Opportunity | None]
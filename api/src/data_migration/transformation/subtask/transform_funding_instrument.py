@@ -1,23 +1,68 @@
 import logging
 from typing import Sequence, Tuple
 
+import src.data_migration.transformation.link_sql as link_sql
 import src.data_migration.transformation.transform_constants as transform_constants
 import src.data_migration.transformation.transform_util as transform_util
 from src.data_migration.transformation.subtask.abstract_transform_subtask import (
     AbstractTransformSubTask,
 )
+from src.data_migration.transformation.subtask.transform_opportunity_summary import (
+    TransformOpportunitySummary,
+)
 from src.db.models.opportunity_models import (
     LinkOpportunitySummaryFundingInstrument,
     OpportunitySummary,
 )
 from src.db.models.staging.forecast import TfundinstrForecast
 from src.db.models.staging.synopsis import TfundinstrSynopsis
+from src.task.task import Task
 
 logger = logging.getLogger(__name__)
 
+FORECAST_LINK_MAPPING = link_sql.LinkTableMapping(
+    source_model=TfundinstrForecast,
+    source_legacy_id_column="fi_frcst_id",
+    source_code_column="fi_id",
+    link_model=LinkOpportunitySummaryFundingInstrument,
+    link_legacy_id_column="legacy_funding_instrument_id",
+    link_lookup_column="funding_instrument_id",
+    lookup_map=transform_util.FUNDING_INSTRUMENT_MAP,
+    is_forecast=True,
+)
+
+SYNOPSIS_LINK_MAPPING = link_sql.LinkTableMapping(
+    source_model=TfundinstrSynopsis,
+    source_legacy_id_column="fi_syn_id",
+    source_code_column="fi_id",
+    link_model=LinkOpportunitySummaryFundingInstrument,
+    link_legacy_id_column="legacy_funding_instrument_id",
+    link_lookup_column="funding_instrument_id",
+    lookup_map=transform_util.FUNDING_INSTRUMENT_MAP,
+    is_forecast=False,
+)
+
 
 class TransformFundingInstrument(AbstractTransformSubTask):
+    # Funding instruments are attached to opportunity summaries
+    depends_on = (TransformOpportunitySummary,)
+
+    def __init__(self, task: Task, use_sql_engine: bool = False):
+        super().__init__(task)
+
+        # Whether to transform all of the records with a few set-based
+        # SQL statements, rather than processing each one with the ORM
+        self.use_sql_engine = use_sql_engine
+
     def transform_records(self) -> None:
+        if self.use_sql_engine:
+            logger.info("Processing forecast and synopsis funding instruments with SQL")
+            for mapping in [FORECAST_LINK_MAPPING, SYNOPSIS_LINK_MAPPING]:
+                self.transform_link_records_with_sql(
+                    mapping, transform_constants.FUNDING_INSTRUMENT
+                )
+            return
+
         link_table = LinkOpportunitySummaryFundingInstrument
         relationship_load_value = OpportunitySummary.link_funding_instruments
 
@@ -1,5 +1,8 @@
+import itertools
 import logging
-from typing import Tuple, cast
+from typing import Iterable, Sequence, Tuple, cast
+
+from sqlalchemy.exc import SQLAlchemyError
 
 import src.data_migration.transformation.transform_constants as transform_constants
 import src.data_migration.transformation.transform_util as transform_util
@@ -18,7 +21,12 @@ logger = logging.getLogger(__name__)
 
 class TransformOpportunity(AbstractTransformSubTask):
 
-    def __init__(self, task: Task, s3_config: S3Config | None = None):
+    def __init__(
+        self,
+        task: Task,
+        s3_config: S3Config | None = None,
+        bulk_upsert_chunk_size: int | None = None,
+    ):
         super().__init__(task)
 
         if s3_config is None:
@@ -26,6 +34,10 @@ class TransformOpportunity(AbstractTransformSubTask):
 
         self.s3_config = s3_config
 
+        # If set, opportunities are upserted in chunks of this size
+        # rather than merged into the session one at a time
+        self.bulk_upsert_chunk_size = bulk_upsert_chunk_size
+
     def transform_records(self) -> None:
         # Fetch all opportunities that were modified
         # Alongside that, grab the existing opportunity record
@@ -35,6 +47,10 @@ class TransformOpportunity(AbstractTransformSubTask):
             [Topportunity.opportunity_id == Opportunity.opportunity_id],
         )
 
+        if self.bulk_upsert_chunk_size is not None:
+            self.process_opportunities_in_bulk(opportunities, self.bulk_upsert_chunk_size)
+            return
+
         for source_opportunity, target_opportunity in opportunities:
             try:
                 self.process_opportunity(source_opportunity, target_opportunity)
@@ -48,6 +64,93 @@ class TransformOpportunity(AbstractTransformSubTask):
                     extra={"opportunity_id": source_opportunity.opportunity_id},
                 )
 
+    def process_opportunities_in_bulk(
+        self,
+        opportunities: Iterable[Tuple[Topportunity, Opportunity | None]],
+        chunk_size: int,
+    ) -> None:
+        for chunk in itertools.batched(opportunities, chunk_size):
+            upsert_records = []
+
+            for source_opportunity, target_opportunity in chunk:
+                # Deleted opportunities and ones being published have attachments to
+                # cleanup or move in s3, so those are always processed one at a time
+                if source_opportunity.is_deleted or (
+                    target_opportunity is not None
+                    and target_opportunity.is_draft
+                    and source_opportunity.is_draft == "N"
+                ):
+                    self.process_opportunity_isolated(source_opportunity, target_opportunity)
+                else:
+                    upsert_records.append((source_opportunity, target_opportunity))
+
+            if upsert_records:
+                self.upsert_opportunity_chunk(upsert_records)
+
+    def upsert_opportunity_chunk(
+        self, records: Sequence[Tuple[Topportunity, Opportunity | None]]
+    ) -> None:
+        try:
+            with self.db_session.begin_nested():
+                self.bulk_upsert(
+                    [
+                        transform_util.transform_opportunity(source_opportunity, target_opportunity)
+                        for source_opportunity, target_opportunity in records
+                    ]
+                )
+                self.bulk_mark_transformed(
+                    [source_opportunity for source_opportunity, _ in records]
+                )
+        except (ValueError, SQLAlchemyError):
+            # Process each record of the chunk separately so that
+            # only the records that actually fail are left unprocessed
+            logger.warning(
+                "Failed to upsert chunk of opportunities, processing them one at a time",
+                exc_info=True,
+                extra={"chunk_size": len(records)},
+            )
+            for source_opportunity, target_opportunity in records:
+                self.process_opportunity_isolated(source_opportunity, target_opportunity)
+            return
+
+        insert_count = sum(1 for _, target_opportunity in records if target_opportunity is None)
+        self.increment(
+            transform_constants.Metrics.TOTAL_RECORDS_PROCESSED,
+            len(records),
+            prefix=transform_constants.OPPORTUNITY,
+        )
+        if insert_count > 0:
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_INSERTED,
+                insert_count,
+                prefix=transform_constants.OPPORTUNITY,
+            )
+        if insert_count < len(records):
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_UPDATED,
+                len(records) - insert_count,
+                prefix=transform_constants.OPPORTUNITY,
+            )
+        logger.info("Upserted chunk of opportunities", extra={"chunk_size": len(records)})
+
+    def process_opportunity_isolated(
+        self, source_opportunity: Topportunity, target_opportunity: Opportunity | None
+    ) -> None:
+        """Process a single opportunity in a savepoint, so that if it fails, including
+        when it's written to the DB, the rest of the opportunities are unaffected"""
+        try:
+            with self.db_session.begin_nested():
+                self.process_opportunity(source_opportunity, target_opportunity)
+        except (ValueError, SQLAlchemyError):
+            self.increment(
+                transform_constants.Metrics.TOTAL_ERROR_COUNT,
+                prefix=transform_constants.OPPORTUNITY,
+            )
+            logger.exception(
+                "Failed to process opportunity",
+                extra={"opportunity_id": source_opportunity.opportunity_id},
+            )
+
     def process_opportunity(
         self, source_opportunity: Topportunity, target_opportunity: Opportunity | None
     ) -> None:
@@ -68,8 +171,12 @@ class TransformOpportunity(AbstractTransformSubTask):
 
             # Cleanup the attachments from s3
             if target_opportunity is not None:
-                for attachment in target_opportunity.opportunity_attachments:
-                    file_util.delete_file(attachment.file_location)
+                file_util.delete_files(
+                    [
+                        attachment.file_location
+                        for attachment in target_opportunity.opportunity_attachments
+                    ]
+                )
 
         else:
             # To avoid incrementing metrics for records we fail to transform, record
@@ -100,18 +207,29 @@ class TransformOpportunity(AbstractTransformSubTask):
                 # then we need to move all of its attachments to the public bucket
                 # from the draft s3 bucket.
                 if was_draft and transformed_opportunity.is_draft is False:
-                    for attachment in cast(Opportunity, target_opportunity).opportunity_attachments:
-                        # Determine the new path
+                    attachments = cast(Opportunity, target_opportunity).opportunity_attachments
+
+                    # Determine the new paths
+                    s3_paths = []
+                    for attachment in attachments:
                         file_name = attachment_util.adjust_legacy_file_name(attachment.file_name)
-                        s3_path = attachment_util.get_s3_attachment_path(
-                            file_name,
-                            attachment.attachment_id,
-                            transformed_opportunity,
-                            self.s3_config,
+                        s3_paths.append(
+                            attachment_util.get_s3_attachment_path(
+                                file_name,
+                                attachment.attachment_id,
+                                transformed_opportunity,
+                                self.s3_config,
+                            )
                         )
 
-                        # Move the file
-                        file_util.move_file(attachment.file_location, s3_path)
+                    # Move the files all at once
+                    file_util.move_files(
+                        [
+                            (attachment.file_location, s3_path)
+                            for attachment, s3_path in zip(attachments, s3_paths, strict=True)
+                        ]
+                    )
+                    for attachment, s3_path in zip(attachments, s3_paths, strict=True):
                         attachment.file_location = s3_path
 
         logger.info("Processed opportunity", extra=extra)
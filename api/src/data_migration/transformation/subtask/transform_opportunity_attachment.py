@@ -1,5 +1,13 @@
+import dataclasses
 import logging
-from typing import Sequence
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterator, Sequence
+
+from pydantic import Field
+from sqlalchemy import LargeBinary, func, select
+from sqlalchemy.orm import defer
 
 import src.data_migration.transformation.transform_constants as transform_constants
 import src.data_migration.transformation.transform_util as transform_util
@@ -7,6 +15,7 @@ from src.adapters.aws import S3Config
 from src.data_migration.transformation.subtask.abstract_transform_subtask import (
     AbstractTransformSubTask,
 )
+from src.data_migration.transformation.subtask.transform_opportunity import TransformOpportunity
 from src.db.models.opportunity_models import Opportunity, OpportunityAttachment
 from src.db.models.staging.attachment import TsynopsisAttachment
 from src.services.opportunity_attachments import attachment_util
@@ -24,8 +33,31 @@ class TransformOpportunityAttachmentConfig(PydanticBaseEnvConfig):
 
     transform_opportunity_attachment_batch_size: int = 100
 
+    # How many chunks of attachments can be uploaded to s3 at once. While these upload,
+    # the next chunks are read from the database, up to twice this many in memory.
+    transform_opportunity_attachment_max_workers: int = 4
+
+    # Attachments are read from the database and uploaded to s3 in chunks of
+    # this size, which can't be smaller than the minimum s3 multipart upload part
+    transform_opportunity_attachment_chunk_size_bytes: int = Field(
+        8 * 1024 * 1024, ge=file_util.S3_MIN_PART_SIZE_BYTES
+    )
+
+
+@dataclasses.dataclass
+class PendingAttachmentUpload:
+    """An attachment that has been transformed, but is still being uploaded to s3"""
+
+    source_attachment: TsynopsisAttachment
+    transformed_attachment: OpportunityAttachment
+    is_insert: bool
+    prior_attachment_location: str | None
+    writer: file_util.ConcurrentFileWriter
+
 
 class TransformOpportunityAttachment(AbstractTransformSubTask):
+    # Attachments are attached to opportunities
+    depends_on = (TransformOpportunity,)
 
     def __init__(self, task: Task, s3_config: S3Config | None = None):
         super().__init__(task)
@@ -40,6 +72,10 @@ class TransformOpportunityAttachment(AbstractTransformSubTask):
         self.total_attachments_processed = 0
         self.has_unprocessed_records = True
 
+        # Used for calculating the upload throughput across all batches
+        self.total_bytes_uploaded = 0
+        self.total_upload_duration_sec = 0.0
+
     def has_more_to_process(self) -> bool:
         return self.has_unprocessed_records
 
@@ -54,6 +90,8 @@ class TransformOpportunityAttachment(AbstractTransformSubTask):
             # to avoid running out of memory.
             batch_size=self.attachment_config.transform_opportunity_attachment_batch_size,
             limit=self.attachment_config.transform_opportunity_attachment_batch_size,
+            # The files are streamed from the database as they're uploaded instead
+            options=[defer(TsynopsisAttachment.file_lob)],
         )
 
         records_processed = self.process_opportunity_attachment_group(records)
@@ -77,36 +115,89 @@ class TransformOpportunityAttachment(AbstractTransformSubTask):
             tuple[TsynopsisAttachment, OpportunityAttachment | None, Opportunity | None]
         ],
     ) -> int:
+        start = time.monotonic()
+        max_workers = self.attachment_config.transform_opportunity_attachment_max_workers
 
         records_processed = 0
-        for source_attachment, target_attachment, opportunity in records:
-            try:
-                # Note we increment first in case there are errors, want it to always increment
-                records_processed += 1
-                self.total_attachments_processed += 1
-
-                self.process_opportunity_attachment(
-                    source_attachment, target_attachment, opportunity
-                )
-            except ValueError:
-                self.increment(
-                    transform_constants.Metrics.TOTAL_ERROR_COUNT,
-                    prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
-                )
-                logger.exception(
-                    "Failed to process opportunity attachment",
-                    extra=transform_util.get_log_extra_opportunity_attachment(source_attachment),
-                )
+        pending_uploads: list[PendingAttachmentUpload] = []
+
+        # While the upload of one attachment is in progress, we carry on reading the
+        # next from the database. The semaphore limits how many chunks are in memory.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            semaphore = threading.BoundedSemaphore(max_workers * 2)
+
+            for source_attachment, target_attachment, opportunity in records:
+                try:
+                    # Note we increment first in case there are errors, want it to always increment
+                    records_processed += 1
+                    self.total_attachments_processed += 1
+
+                    pending_upload = self.start_opportunity_attachment(
+                        source_attachment, target_attachment, opportunity, executor, semaphore
+                    )
+                    if pending_upload is not None:
+                        pending_uploads.append(pending_upload)
+                except ValueError:
+                    self._handle_attachment_error(source_attachment)
+
+            for pending_upload in pending_uploads:
+                try:
+                    self.finish_opportunity_attachment(pending_upload)
+                except ValueError:
+                    self._handle_attachment_error(pending_upload.source_attachment)
+
+        self.total_upload_duration_sec += time.monotonic() - start
+        if self.total_upload_duration_sec > 0:
+            self.set_metrics(
+                {
+                    f"{transform_constants.OPPORTUNITY_ATTACHMENT}.bytes_uploaded_per_sec": round(
+                        self.total_bytes_uploaded / self.total_upload_duration_sec
+                    )
+                }
+            )
 
         return records_processed
 
+    def _handle_attachment_error(self, source_attachment: TsynopsisAttachment) -> None:
+        self.increment(
+            transform_constants.Metrics.TOTAL_ERROR_COUNT,
+            prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
+        )
+        logger.exception(
+            "Failed to process opportunity attachment",
+            extra=transform_util.get_log_extra_opportunity_attachment(source_attachment),
+        )
+
     def process_opportunity_attachment(
         self,
         source_attachment: TsynopsisAttachment,
         target_attachment: OpportunityAttachment | None,
         opportunity: Opportunity | None,
     ) -> None:
+        """Process a single attachment, waiting for its upload to finish"""
+        with ThreadPoolExecutor(
+            max_workers=self.attachment_config.transform_opportunity_attachment_max_workers
+        ) as executor:
+            pending_upload = self.start_opportunity_attachment(
+                source_attachment, target_attachment, opportunity, executor
+            )
+
+            if pending_upload is not None:
+                self.finish_opportunity_attachment(pending_upload)
 
+    def start_opportunity_attachment(
+        self,
+        source_attachment: TsynopsisAttachment,
+        target_attachment: OpportunityAttachment | None,
+        opportunity: Opportunity | None,
+        executor: Executor,
+        semaphore: threading.Semaphore | None = None,
+    ) -> PendingAttachmentUpload | None:
+        """Process an attachment up to starting its upload to s3, which is returned
+        to be finished by finish_opportunity_attachment once the upload completes.
+
+        Deletes have nothing to upload, and are processed entirely here.
+        """
         self.increment(
             transform_constants.Metrics.TOTAL_RECORDS_PROCESSED,
             prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
@@ -127,57 +218,109 @@ class TransformOpportunityAttachment(AbstractTransformSubTask):
             if target_attachment is not None:
                 file_util.delete_file(target_attachment.file_location)
 
-        elif opportunity is None:
+            logger.info("Processed opportunity attachment", extra=extra)
+            source_attachment.transformed_at = self.transform_time
+            return None
+
+        if opportunity is None:
             # This shouldn't be possible as the incoming data has foreign keys, but as a safety net
             # we'll make sure the opportunity actually exists
             raise ValueError(
                 "Opportunity attachment cannot be processed as the opportunity for it does not exist"
             )
 
-        else:
-            # To avoid incrementing metrics for records we fail to transform, record
-            # here whether it's an insert/update and we'll increment after transforming
-            is_insert = target_attachment is None
+        # To avoid incrementing metrics for records we fail to transform, record
+        # here whether it's an insert/update and we'll increment after transforming
+        is_insert = target_attachment is None
 
-            prior_attachment_location = (
-                target_attachment.file_location if target_attachment else None
-            )
+        prior_attachment_location = target_attachment.file_location if target_attachment else None
 
-            logger.info("Transforming and upserting opportunity attachment", extra=extra)
+        logger.info("Transforming and upserting opportunity attachment", extra=extra)
 
-            transformed_opportunity_attachment = transform_opportunity_attachment(
-                source_attachment, target_attachment, opportunity, self.s3_config
-            )
+        transformed_opportunity_attachment = transform_opportunity_attachment(
+            source_attachment, target_attachment, opportunity, self.s3_config
+        )
 
-            # Write the file to s3
-            write_file(source_attachment, transformed_opportunity_attachment)
-
-            # If this was an update, and the file name changed
-            # Cleanup the old file from s3.
-            if (
-                prior_attachment_location is not None
-                and prior_attachment_location != transformed_opportunity_attachment.file_location
-            ):
-                file_util.delete_file(prior_attachment_location)
-
-            logger.info("Transforming and upserting opportunity attachment", extra=extra)
-
-            if is_insert:
-                self.increment(
-                    transform_constants.Metrics.TOTAL_RECORDS_INSERTED,
-                    prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
-                )
-                self.db_session.add(transformed_opportunity_attachment)
-            else:
-                self.increment(
-                    transform_constants.Metrics.TOTAL_RECORDS_UPDATED,
-                    prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
-                )
-                self.db_session.merge(transformed_opportunity_attachment)
+        # Start writing the file to s3
+        writer = file_util.ConcurrentFileWriter(
+            transformed_opportunity_attachment.file_location, executor, semaphore
+        )
+        for chunk in self.stream_file_lob(source_attachment):
+            writer.write(chunk)
+        writer.close()
+
+        return PendingAttachmentUpload(
+            source_attachment=source_attachment,
+            transformed_attachment=transformed_opportunity_attachment,
+            is_insert=is_insert,
+            prior_attachment_location=prior_attachment_location,
+            writer=writer,
+        )
+
+    def finish_opportunity_attachment(self, pending_upload: PendingAttachmentUpload) -> None:
+        """Wait for an attachment to finish uploading, and then upsert it"""
+        source_attachment = pending_upload.source_attachment
+        transformed_opportunity_attachment = pending_upload.transformed_attachment
+        extra = transform_util.get_log_extra_opportunity_attachment(source_attachment)
+
+        bytes_uploaded = pending_upload.writer.result()
+        self.total_bytes_uploaded += bytes_uploaded
+        self.increment(
+            transform_constants.Metrics.TOTAL_BYTES_UPLOADED,
+            bytes_uploaded,
+            prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
+        )
+
+        # If this was an update, and the file name changed
+        # Cleanup the old file from s3.
+        if (
+            pending_upload.prior_attachment_location is not None
+            and pending_upload.prior_attachment_location
+            != transformed_opportunity_attachment.file_location
+        ):
+            file_util.delete_file(pending_upload.prior_attachment_location)
+
+        if pending_upload.is_insert:
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_INSERTED,
+                prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
+            )
+            self.db_session.add(transformed_opportunity_attachment)
+        else:
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_UPDATED,
+                prefix=transform_constants.OPPORTUNITY_ATTACHMENT,
+            )
+            self.db_session.merge(transformed_opportunity_attachment)
 
         logger.info("Processed opportunity attachment", extra=extra)
         source_attachment.transformed_at = self.transform_time
 
+    def stream_file_lob(self, source_attachment: TsynopsisAttachment) -> Iterator[bytes]:
+        """Read the file of an attachment from the database a chunk at a time,
+        rather than loading the whole file into memory at once"""
+        chunk_size = self.attachment_config.transform_opportunity_attachment_chunk_size_bytes
+
+        # Note that substr is 1-indexed
+        offset = 1
+        while True:
+            chunk = self.db_session.scalar(
+                select(
+                    func.substr(TsynopsisAttachment.file_lob, offset, chunk_size, type_=LargeBinary)
+                ).where(TsynopsisAttachment.syn_att_id == source_attachment.syn_att_id)
+            )
+
+            if chunk is None:
+                raise ValueError("Attachment is null, cannot copy")
+
+            if chunk:
+                yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+
+            offset += chunk_size
+
 
 def transform_opportunity_attachment(
     source_attachment: TsynopsisAttachment,
@@ -222,14 +365,3 @@ def transform_opportunity_attachment(
     )
 
     return target_attachment
-
-
-def write_file(
-    source_attachment: TsynopsisAttachment, destination_attachment: OpportunityAttachment
-) -> None:
-
-    if source_attachment.file_lob is None:
-        raise ValueError("Attachment is null, cannot copy")
-
-    with file_util.open_stream(destination_attachment.file_location, "wb") as outfile:
-        outfile.write(source_attachment.file_lob)
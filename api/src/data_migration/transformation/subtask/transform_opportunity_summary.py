@@ -1,19 +1,34 @@
+import itertools
 import logging
-from typing import Sequence, Tuple
+from typing import Iterable, Sequence, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
 
 import src.data_migration.transformation.transform_constants as transform_constants
 import src.data_migration.transformation.transform_util as transform_util
 from src.data_migration.transformation.subtask.abstract_transform_subtask import (
     AbstractTransformSubTask,
 )
+from src.data_migration.transformation.subtask.transform_opportunity import TransformOpportunity
 from src.db.models.opportunity_models import Opportunity, OpportunitySummary
 from src.db.models.staging.forecast import Tforecast
 from src.db.models.staging.synopsis import Tsynopsis
+from src.task.task import Task
 
 logger = logging.getLogger(__name__)
 
 
 class TransformOpportunitySummary(AbstractTransformSubTask):
+    # Summaries are attached to opportunities
+    depends_on = (TransformOpportunity,)
+
+    def __init__(self, task: Task, bulk_upsert_chunk_size: int | None = None):
+        super().__init__(task)
+
+        # If set, opportunity summaries are upserted in chunks of this
+        # size rather than merged into the session one at a time
+        self.bulk_upsert_chunk_size = bulk_upsert_chunk_size
+
     def transform_records(self) -> None:
         logger.info("Processing opportunity summaries")
         logger.info("Processing synopsis records")
@@ -46,6 +61,10 @@ class TransformOpportunitySummary(AbstractTransformSubTask):
             Tuple[transform_constants.SourceSummary, OpportunitySummary | None, Opportunity | None]
         ],
     ) -> None:
+        if self.bulk_upsert_chunk_size is not None:
+            self.process_opportunity_summaries_in_bulk(records, self.bulk_upsert_chunk_size)
+            return
+
         for source_summary, target_summary, opportunity in records:
             try:
                 self.process_opportunity_summary(source_summary, target_summary, opportunity)
@@ -59,6 +78,119 @@ class TransformOpportunitySummary(AbstractTransformSubTask):
                     extra=transform_util.get_log_extra_summary(source_summary),
                 )
 
+    def process_opportunity_summaries_in_bulk(
+        self,
+        records: Iterable[
+            Tuple[transform_constants.SourceSummary, OpportunitySummary | None, Opportunity | None]
+        ],
+        chunk_size: int,
+    ) -> None:
+        for chunk in itertools.batched(records, chunk_size):
+            upsert_records = []
+
+            for source_summary, target_summary, opportunity in chunk:
+                # Deletes cascade to the summary's other records, and records without an
+                # opportunity are either orphans or errors, so these are processed one at a time
+                if source_summary.is_deleted or opportunity is None:
+                    self.process_opportunity_summary_isolated(
+                        source_summary, target_summary, opportunity
+                    )
+                else:
+                    upsert_records.append((source_summary, target_summary, opportunity))
+
+            if upsert_records:
+                self.upsert_opportunity_summary_chunk(upsert_records)
+
+    def upsert_opportunity_summary_chunk(
+        self,
+        records: Sequence[
+            Tuple[transform_constants.SourceSummary, OpportunitySummary | None, Opportunity | None]
+        ],
+    ) -> None:
+        try:
+            with self.db_session.begin_nested():
+                self.bulk_upsert(
+                    [
+                        self.transform_opportunity_summary_for_upsert(
+                            source_summary, target_summary
+                        )
+                        for source_summary, target_summary, _ in records
+                    ]
+                )
+                self.bulk_mark_transformed([source_summary for source_summary, _, _ in records])
+        except (ValueError, SQLAlchemyError):
+            # Process each record of the chunk separately so that
+            # only the records that actually fail are left unprocessed
+            logger.warning(
+                "Failed to upsert chunk of opportunity summaries, processing them one at a time",
+                exc_info=True,
+                extra={"chunk_size": len(records)},
+            )
+            for source_summary, target_summary, opportunity in records:
+                self.process_opportunity_summary_isolated(
+                    source_summary, target_summary, opportunity
+                )
+            return
+
+        insert_count = sum(1 for _, target_summary, _ in records if target_summary is None)
+        self.increment(
+            transform_constants.Metrics.TOTAL_RECORDS_PROCESSED,
+            len(records),
+            prefix=transform_constants.OPPORTUNITY_SUMMARY,
+        )
+        if insert_count > 0:
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_INSERTED,
+                insert_count,
+                prefix=transform_constants.OPPORTUNITY_SUMMARY,
+            )
+        if insert_count < len(records):
+            self.increment(
+                transform_constants.Metrics.TOTAL_RECORDS_UPDATED,
+                len(records) - insert_count,
+                prefix=transform_constants.OPPORTUNITY_SUMMARY,
+            )
+        logger.info("Upserted chunk of opportunity summaries", extra={"chunk_size": len(records)})
+
+    def transform_opportunity_summary_for_upsert(
+        self,
+        source_summary: transform_constants.SourceSummary,
+        target_summary: OpportunitySummary | None,
+    ) -> OpportunitySummary:
+        transformed_opportunity_summary = transform_util.transform_opportunity_summary(
+            source_summary, target_summary
+        )
+
+        # Postgres checks not-null constraints before it finds the conflicting row,
+        # so an upsert needs the columns identifying an existing summary set as well
+        if target_summary is not None:
+            transformed_opportunity_summary.opportunity_id = target_summary.opportunity_id
+            transformed_opportunity_summary.is_forecast = target_summary.is_forecast
+            transformed_opportunity_summary.revision_number = target_summary.revision_number
+
+        return transformed_opportunity_summary
+
+    def process_opportunity_summary_isolated(
+        self,
+        source_summary: transform_constants.SourceSummary,
+        target_summary: OpportunitySummary | None,
+        opportunity: Opportunity | None,
+    ) -> None:
+        """Process a single opportunity summary in a savepoint, so that if it fails, including
+        when it's written to the DB, the rest of the opportunity summaries are unaffected"""
+        try:
+            with self.db_session.begin_nested():
+                self.process_opportunity_summary(source_summary, target_summary, opportunity)
+        except (ValueError, SQLAlchemyError):
+            self.increment(
+                transform_constants.Metrics.TOTAL_ERROR_COUNT,
+                prefix=transform_constants.OPPORTUNITY_SUMMARY,
+            )
+            logger.exception(
+                "Failed to process opportunity summary",
+                extra=transform_util.get_log_extra_summary(source_summary),
+            )
+
     def process_opportunity_summary(
         self,
         source_summary: transform_constants.SourceSummary,
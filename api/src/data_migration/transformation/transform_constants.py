@@ -49,6 +49,8 @@ class Metrics(StrEnum):
     TOTAL_HISTORICAL_ORPHANS_SKIPPED = "total_historical_orphans_skipped"
     TOTAL_DELETE_ORPHANS_SKIPPED = "total_delete_orphans_skipped"
 
+    TOTAL_BYTES_UPLOADED = "total_bytes_uploaded"
+
     TOTAL_ERROR_COUNT = "total_error_count"
 
 
@@ -1,10 +1,16 @@
 import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 
+import sqlalchemy
 from pydantic_settings import SettingsConfigDict
 
 import src.data_migration.transformation.transform_constants as transform_constants
 from src.adapters import db
+from src.data_migration.transformation.subtask.abstract_transform_subtask import (
+    AbstractTransformSubTask,
+)
 from src.data_migration.transformation.subtask.transform_agency import (
     TransformAgency,
     TransformAgencyHierarchy,
@@ -28,6 +34,7 @@ from src.data_migration.transformation.subtask.transform_opportunity_attachment
 from src.data_migration.transformation.subtask.transform_opportunity_summary import (
     TransformOpportunitySummary,
 )
+from src.task.checkpoint import PipelineCheckpoints
 from src.task.task import Task
 from src.util import datetime_util
 from src.util.env_config import PydanticBaseEnvConfig
@@ -49,6 +56,22 @@ class TransformOracleDataTaskConfig(PydanticBaseEnvConfig):
         False  # TRANSFORM_ORACLE_DATA_ENABLE_OPPORTUNITY_ATTACHMENT
     )
 
+    # Transform the applicant type, funding category and funding instrument
+    # link tables with set-based SQL rather than row by row with the ORM
+    use_sql_link_transforms: bool = False  # TRANSFORM_ORACLE_DATA_USE_SQL_LINK_TRANSFORMS
+
+    # Upsert opportunities and opportunity summaries in chunks of this
+    # size, rather than merging each into the session one at a time
+    bulk_upsert_chunk_size: int | None = None  # TRANSFORM_ORACLE_DATA_BULK_UPSERT_CHUNK_SIZE
+
+    # Fetch and commit the records of each subtask in batches of this size, rather than
+    # in a single transaction, keeping memory bounded for large backfills
+    commit_batch_size: int | None = None  # TRANSFORM_ORACLE_DATA_COMMIT_BATCH_SIZE
+
+    # How many subtasks can run at once, each on its own DB connection,
+    # once the subtasks they depend on have finished
+    max_workers: int = 1  # TRANSFORM_ORACLE_DATA_MAX_WORKERS
+
 
 class TransformOracleDataTask(Task):
     Metrics = transform_constants.Metrics
@@ -58,6 +81,7 @@ class TransformOracleDataTask(Task):
         db_session: db.Session,
         transform_time: datetime | None = None,
         transform_config: TransformOracleDataTaskConfig | None = None,
+        checkpoints: PipelineCheckpoints | None = None,
     ) -> None:
         super().__init__(db_session)
 
@@ -68,29 +92,132 @@ class TransformOracleDataTask(Task):
         if transform_config is None:
             transform_config = TransformOracleDataTaskConfig()
         self.transform_config = transform_config
+        self.checkpoints = checkpoints
 
     def run_task(self) -> None:
+        subtasks = self.get_subtasks()
+
+        if self.transform_config.max_workers <= 1:
+            for subtask in subtasks:
+                self.run_subtask(subtask)
+            return
+
+        start = time.perf_counter()
+        self.run_subtasks_concurrently(subtasks)
+        self.set_metrics({"subtasks_duration_sec": round(time.perf_counter() - start, 3)})
+
+    def get_subtasks(self) -> list[AbstractTransformSubTask]:
+        """Get the enabled subtasks, in the order they run when not run concurrently"""
+        subtasks: list[AbstractTransformSubTask] = []
+
         if self.transform_config.enable_opportunity:
-            TransformOpportunity(self).run()
+            subtasks.append(
+                TransformOpportunity(
+                    self, bulk_upsert_chunk_size=self.transform_config.bulk_upsert_chunk_size
+                )
+            )
 
         if self.transform_config.enable_assistance_listing:
-            TransformAssistanceListing(self).run()
+            subtasks.append(TransformAssistanceListing(self))
 
         if self.transform_config.enable_opportunity_summary:
-            TransformOpportunitySummary(self).run()
+            subtasks.append(
+                TransformOpportunitySummary(
+                    self, bulk_upsert_chunk_size=self.transform_config.bulk_upsert_chunk_size
+                )
+            )
 
         if self.transform_config.enable_applicant_type:
-            TransformApplicantType(self).run()
+            subtasks.append(
+                TransformApplicantType(
+                    self, use_sql_engine=self.transform_config.use_sql_link_transforms
+                )
+            )
 
         if self.transform_config.enable_funding_category:
-            TransformFundingCategory(self).run()
+            subtasks.append(
+                TransformFundingCategory(
+                    self, use_sql_engine=self.transform_config.use_sql_link_transforms
+                )
+            )
 
         if self.transform_config.enable_funding_instrument:
-            TransformFundingInstrument(self).run()
+            subtasks.append(
+                TransformFundingInstrument(
+                    self, use_sql_engine=self.transform_config.use_sql_link_transforms
+                )
+            )
 
         if self.transform_config.enable_agency:
-            TransformAgency(self).run()
-            TransformAgencyHierarchy(self).run()
+            subtasks.append(TransformAgency(self))
+            subtasks.append(TransformAgencyHierarchy(self))
 
         if self.transform_config.enable_opportunity_attachment:
-            TransformOpportunityAttachment(self).run()
+            subtasks.append(TransformOpportunityAttachment(self))
+
+        return subtasks
+
+    def run_subtasks_concurrently(self, subtasks: list[AbstractTransformSubTask]) -> None:
+        """Run each subtask as soon as the subtasks it depends on have finished
+
+        Subtasks run on separate sessions, so ones that don't depend on each
+        other run at the same time. If a subtask fails, no further subtasks are
+        started, and the error is raised once the running subtasks finish.
+        """
+        engine = self.db_session.get_bind()
+
+        pending = {type(subtask): subtask for subtask in subtasks}
+        running: dict[Future, type[AbstractTransformSubTask]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.transform_config.max_workers) as executor:
+            while pending or running:
+                # A dependency that isn't enabled for this run is treated as done
+                unfinished = set(pending) | set(running.values())
+                ready = [
+                    subtask_type
+                    for subtask_type in pending
+                    if not unfinished.intersection(subtask_type.depends_on)
+                ]
+
+                if not ready and not running:
+                    subtask_names = ", ".join(subtask_type.__name__ for subtask_type in pending)
+                    raise Exception(f"Subtasks have circular dependencies: {subtask_names}")
+
+                for subtask_type in ready:
+                    subtask = pending.pop(subtask_type)
+                    future = executor.submit(self.run_subtask_in_new_session, subtask, engine)
+                    running[future] = subtask_type
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    # Raise the error of a failed subtask, which stops any more being started
+                    future.result()
+
+    def run_subtask_in_new_session(
+        self,
+        subtask: AbstractTransformSubTask,
+        engine: sqlalchemy.engine.Engine | sqlalchemy.engine.Connection,
+    ) -> None:
+        with db.Session(bind=engine, expire_on_commit=False) as db_session:
+            subtask.db_session = db_session
+            self.run_subtask(subtask)
+
+    def run_subtask(self, subtask: AbstractTransformSubTask) -> None:
+        """Run a subtask, unless a previous run being resumed already completed it"""
+        if self.checkpoints is not None and self.checkpoints.is_complete(
+            self.cls_name(), subtask.cls_name()
+        ):
+            logger.info("Skipping subtask %s, already completed", subtask.cls_name())
+            self.increment("count.skipped_subtasks")
+            return
+
+        subtask.run()
+
+        if self.checkpoints is not None:
+            self.checkpoints.mark_complete(
+                subtask.db_session,
+                self.cls_name(),
+                subtask.cls_name(),
+                job_id=self.job.job_id if self.job is not None else None,
+            )
@@ -1,4 +1,5 @@
-from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index, Text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.adapters.db.type_decorators.postgres_type_decorators import LookupColumn
@@ -19,3 +20,29 @@ class ExtractMetadata(ApiSchemaTable, TimestampMixin):
     file_name: Mapped[str]
     file_path: Mapped[str]
     file_size_bytes: Mapped[int] = mapped_column(BigInteger)
+
+    # For delta extracts, the full extract that the changes build upon
+    base_extract_metadata_id: Mapped[int | None] = mapped_column(
+        BigInteger, ForeignKey(extract_metadata_id)
+    )
+
+
+class ExtractTombstone(ApiSchemaTable, TimestampMixin):
+    """The primary key of a row deleted from a table extracted for analytics
+
+    Rows are only added by a trigger on each of the extracted tables, and an
+    incremental extract reads those created since the previous one to find what
+    was deleted, rather than comparing every key in the table.
+    """
+
+    __tablename__ = "extract_tombstone"
+
+    __table_args__ = (
+        Index("extract_tombstone_table_name_created_at_idx", "table_name", "created_at"),
+        ApiSchemaTable.__table_args__,
+    )
+
+    extract_tombstone_id = mapped_column(BigInteger, primary_key=True)
+    table_name: Mapped[str]
+    # The values of the deleted row's primary key columns, in the order of the table's primary key
+    primary_key: Mapped[list[str]] = mapped_column(ARRAY(Text))
@@ -123,6 +123,12 @@ EXTRACT_TYPE_CONFIG = LookupConfig(
     [
         LookupStr(ExtractType.OPPORTUNITIES_JSON, 1),
         LookupStr(ExtractType.OPPORTUNITIES_CSV, 2),
+        LookupStr(ExtractType.OPPORTUNITIES_JSON_GZIP, 3),
+        LookupStr(ExtractType.OPPORTUNITIES_CSV_GZIP, 4),
+        LookupStr(ExtractType.OPPORTUNITIES_JSON_ZSTD, 5),
+        LookupStr(ExtractType.OPPORTUNITIES_CSV_ZSTD, 6),
+        LookupStr(ExtractType.OPPORTUNITIES_PARQUET, 7),
+        LookupStr(ExtractType.OPPORTUNITIES_DELTA_JSON, 8),
     ]
 )
 
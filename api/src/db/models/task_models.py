@@ -1,6 +1,7 @@
 import uuid
+from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import TIMESTAMP, ForeignKey
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -20,3 +21,35 @@ class JobLog(ApiSchemaTable, TimestampMixin):
         ForeignKey(LkJobStatus.job_status_id),
     )
     metrics: Mapped[dict | None] = mapped_column(JSONB)
+
+
+class LegacyLoadWatermark(ApiSchemaTable, TimestampMixin):
+    """Tracks how far each legacy table has been loaded into its staging table"""
+
+    __tablename__ = "legacy_load_watermark"
+
+    table_name: Mapped[str] = mapped_column(primary_key=True)
+    # The latest last_upd_date (or created_date if never updated) of the rows in the
+    # staging table. Legacy timestamps have no timezone, so neither does this.
+    watermark: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=False))
+    # When the staging table was last fully compared against the legacy table,
+    # which is the only time deleted rows are detected
+    last_full_load_at: Mapped[datetime | None]
+
+
+class JobCheckpoint(ApiSchemaTable, TimestampMixin):
+    """Records a stage of a pipeline, or a table or subtask within it, completing
+
+    A pipeline that is rerun to resume after a failure skips the
+    stages and steps completed since it last successfully finished.
+    """
+
+    __tablename__ = "job_checkpoint"
+
+    job_checkpoint_id: Mapped[uuid.UUID] = mapped_column(UUID, primary_key=True, default=uuid.uuid4)
+    pipeline: Mapped[str] = mapped_column(index=True)
+    stage: Mapped[str]
+    # The table or subtask within the stage, if the checkpoint isn't for the whole stage
+    step: Mapped[str | None]
+    job_id: Mapped[uuid.UUID | None] = mapped_column(UUID, ForeignKey(JobLog.job_id))
+    completed_at: Mapped[datetime]
@@ -7,7 +7,7 @@ from src.api.route_utils import raise_flask_error
 from src.db.models.agency_models import Agency
 from src.db.models.opportunity_models import Opportunity, OpportunityAttachment
 from src.util.env_config import PydanticBaseEnvConfig
-from src.util.file_util import convert_public_s3_to_cdn_url, pre_sign_file_location
+from src.util.file_util import convert_public_s3_to_cdn_url, pre_sign_file_locations
 
 
 class AttachmentConfig(PydanticBaseEnvConfig):
@@ -43,8 +43,9 @@ def _fetch_opportunity(
 def pre_sign_opportunity_file_location(
     opp_atts: list,
 ) -> list[OpportunityAttachment]:
-    for opp_att in opp_atts:
-        opp_att.download_path = pre_sign_file_location(opp_att.file_location)
+    download_paths = pre_sign_file_locations([opp_att.file_location for opp_att in opp_atts])
+    for opp_att, download_path in zip(opp_atts, download_paths, strict=True):
+        opp_att.download_path = download_path
 
     return opp_atts
 
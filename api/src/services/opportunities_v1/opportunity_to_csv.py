@@ -1,8 +1,5 @@
 import csv
-import io
-from typing import Sequence
-
-from src.util.dict_util import flatten_dict
+from typing import Any, Callable, Iterable, TextIO
 
 CSV_FIELDS = [
     "opportunity_id",
@@ -47,39 +44,83 @@ CSV_FIELDS = [
     # which can help improve readability of other fields
     "summary_description",
 ]
-# Same as above, but faster lookup
-CSV_FIELDS_SET = set(CSV_FIELDS)
+
+# Fields which come from the top-level of the opportunity, every
+# other field comes from the nested summary object. Note that
+# created_at/updated_at exist in both, the top-level values are used.
+OPPORTUNITY_FIELDS = {
+    "opportunity_id",
+    "opportunity_number",
+    "opportunity_title",
+    "opportunity_status",
+    "agency_code",
+    "category",
+    "category_explanation",
+    "opportunity_assistance_listings",
+    "agency_name",
+    "top_level_agency_name",
+    "created_at",
+    "updated_at",
+}
 
 
-def _process_assistance_listing(assistance_listings: list[dict]) -> str:
+def _process_assistance_listing(assistance_listings: list[dict] | None) -> str | None:
+    if assistance_listings is None:
+        return None
+
     return ";".join(
         [f"{a['assistance_listing_number']}|{a['program_title']}" for a in assistance_listings]
     )
 
 
-def opportunities_to_csv(opportunities: Sequence[dict], output: io.StringIO) -> None:
-    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, quoting=csv.QUOTE_ALL)
-    writer.writeheader()
+def _process_list(values: list[str] | None) -> str | None:
+    if values is None:
+        return None
+
+    return ";".join(values)
+
+
+# Any fields that need converting before being written to the CSV
+CSV_FIELD_PROCESSORS: dict[str, Callable[[Any], Any]] = {
+    "opportunity_assistance_listings": _process_assistance_listing,
+    "funding_instruments": _process_list,
+    "funding_categories": _process_list,
+    "applicant_types": _process_list,
+}
+
+
+def _build_row_extractor() -> Callable[[dict], list]:
+    """
+    Build a function that converts a serialized opportunity into a CSV row.
+
+    Where each field lives is worked out once here rather than for every
+    opportunity, so converting a row is just a dictionary lookup per column.
+    """
+    # Each column is (is_top_level, field_name, processor)
+    columns = [
+        (field in OPPORTUNITY_FIELDS, field, CSV_FIELD_PROCESSORS.get(field))
+        for field in CSV_FIELDS
+    ]
+
+    def extract_row(opportunity: dict) -> list:
+        summary = opportunity.get("summary") or {}
 
-    for opportunity in opportunities:
-        opp = flatten_dict(opportunity)
+        row = []
+        for is_top_level, field, processor in columns:
+            value = opportunity.get(field) if is_top_level else summary.get(field)
+            if processor is not None:
+                value = processor(value)
+            row.append(value)
 
-        out_opportunity = {}
-        for k, v in opp.items():
-            # Remove prefixes from nested data structures
-            k = k.removeprefix("summary.")
-            k = k.removeprefix("assistance_listings.")
+        return row
 
-            # Remove fields we haven't configured
-            if k not in CSV_FIELDS_SET:
-                continue
+    return extract_row
 
-            if k == "opportunity_assistance_listings":
-                v = _process_assistance_listing(v)
 
-            if k in ["funding_instruments", "funding_categories", "applicant_types"]:
-                v = ";".join(v)
+opportunity_to_csv_row = _build_row_extractor()
 
-            out_opportunity[k] = v
 
-        writer.writerow(out_opportunity)
+def opportunities_to_csv(opportunities: Iterable[dict], output: TextIO) -> None:
+    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+    writer.writerow(CSV_FIELDS)
+    writer.writerows(opportunity_to_csv_row(opportunity) for opportunity in opportunities)
@@ -0,0 +1,91 @@
+from typing import Sequence
+
+import pyarrow as pa
+
+from src.services.opportunities_v1.opportunity_to_csv import OPPORTUNITY_FIELDS
+
+# Same columns as the CSV extract, but with proper types rather than everything
+# as strings, and with the multi-valued fields kept as lists instead of being
+# joined into a single delimited string.
+PARQUET_SCHEMA = pa.schema(
+    [
+        ("opportunity_id", pa.int64()),
+        ("opportunity_number", pa.string()),
+        ("opportunity_title", pa.string()),
+        ("opportunity_status", pa.string()),
+        ("agency_code", pa.string()),
+        ("category", pa.string()),
+        ("category_explanation", pa.string()),
+        ("post_date", pa.date32()),
+        ("close_date", pa.date32()),
+        ("close_date_description", pa.string()),
+        ("archive_date", pa.date32()),
+        ("is_cost_sharing", pa.bool_()),
+        ("expected_number_of_awards", pa.int64()),
+        ("estimated_total_program_funding", pa.int64()),
+        ("award_floor", pa.int64()),
+        ("award_ceiling", pa.int64()),
+        ("additional_info_url", pa.string()),
+        ("additional_info_url_description", pa.string()),
+        (
+            "opportunity_assistance_listings",
+            pa.list_(
+                pa.struct(
+                    [
+                        ("assistance_listing_number", pa.string()),
+                        ("program_title", pa.string()),
+                    ]
+                )
+            ),
+        ),
+        ("funding_instruments", pa.list_(pa.string())),
+        ("funding_categories", pa.list_(pa.string())),
+        ("funding_category_description", pa.string()),
+        ("applicant_types", pa.list_(pa.string())),
+        ("applicant_eligibility_description", pa.string()),
+        ("agency_name", pa.string()),
+        ("top_level_agency_name", pa.string()),
+        ("agency_contact_description", pa.string()),
+        ("agency_email_address", pa.string()),
+        ("agency_email_address_description", pa.string()),
+        ("is_forecast", pa.bool_()),
+        ("forecasted_post_date", pa.date32()),
+        ("forecasted_close_date", pa.date32()),
+        ("forecasted_close_date_description", pa.string()),
+        ("forecasted_award_date", pa.date32()),
+        ("forecasted_project_start_date", pa.date32()),
+        ("fiscal_year", pa.int64()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("updated_at", pa.timestamp("us", tz="UTC")),
+        ("summary_description", pa.string()),
+    ]
+)
+
+
+def opportunities_to_parquet_table(opportunities: Sequence[dict]) -> pa.Table:
+    """
+    Convert a batch of serialized opportunities (the output of OpportunityV1Schema)
+    into a pyarrow Table matching PARQUET_SCHEMA. Each call is intended to
+    produce a single row group of a Parquet file.
+    """
+    columns: dict[str, list] = {field.name: [] for field in PARQUET_SCHEMA}
+
+    for opportunity in opportunities:
+        summary = opportunity.get("summary") or {}
+
+        for name, values in columns.items():
+            source = opportunity if name in OPPORTUNITY_FIELDS else summary
+            values.append(source.get(name))
+
+    arrays = []
+    for field in PARQUET_SCHEMA:
+        values = columns[field.name]
+
+        # Dates and timestamps are serialized as ISO-8601 strings,
+        # which Arrow can parse directly when casting
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            arrays.append(pa.array(values, pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+
+    return pa.Table.from_arrays(arrays, schema=PARQUET_SCHEMA)
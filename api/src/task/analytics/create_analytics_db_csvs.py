@@ -1,14 +1,23 @@
+import gzip
+import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from enum import StrEnum
+from typing import Any
 
 import click
 import sqlalchemy
 from pydantic import Field
+from smart_open.compression import NO_COMPRESSION
 
 import src.adapters.db as db
 import src.adapters.db.flask_db as flask_db
+import src.util.datetime_util as datetime_util
 from src.db.models import metadata as api_metadata
+from src.db.models.extract_models import ExtractTombstone
 from src.task.ecs_background_task import ecs_background_task
 from src.task.task import Task
 from src.task.task_blueprint import task_blueprint
@@ -25,18 +34,32 @@ TABLES_TO_EXTRACT = [
     "lk_opportunity_status",
 ]
 
+# Describes the files of the most recent extract, and is what an incremental
+# extract uses to know what changed since then.
+MANIFEST_FILE_NAME = "extract_manifest.json"
+# Every extract also keeps its own copy of the manifest, so that the loader can
+# follow the chain of incremental extracts back to the last one it applied.
+EXTRACT_MANIFEST_FILE_NAME_FORMAT = "extract_manifest-{extract_id}.json"
+
 
 @task_blueprint.cli.command(
     "create-analytics-db-csvs",
     help="Create extract CSVs of our database tables that analytics can use",
 )
 @click.option("--tables-to-extract", "-t", help="Tables to extract to a CSV file", multiple=True)
+@click.option(
+    "--incremental/--full",
+    default=False,
+    help="Only extract rows changed since the previous extract, along with the keys of deleted rows",
+)
 @flask_db.with_db_session()
 @ecs_background_task(task_name="create-analytics-db-csvs")
-def create_analytics_db_csvs(db_session: db.Session, tables_to_extract: list[str]) -> None:
+def create_analytics_db_csvs(
+    db_session: db.Session, tables_to_extract: list[str], incremental: bool
+) -> None:
     logger.info("Create extract CSV file start")
 
-    CreateAnalyticsDbCsvsTask(db_session, tables_to_extract).run()
+    CreateAnalyticsDbCsvsTask(db_session, tables_to_extract, is_incremental=incremental).run()
 
     logger.info("Create extract CSV file complete")
 
@@ -49,20 +72,61 @@ class CreateAnalyticsDbCsvsConfig(PydanticBaseEnvConfig):
     # for testing right now
     db_schema: str | None = Field(None, alias="API_ANALYTICS_DB_SCHEMA")
 
+    # API_ANALYTICS_DB_EXTRACTS_MAX_WORKERS
+    # How many tables to extract at once, each on its own DB connection
+    max_workers: int = Field(default=4, alias="API_ANALYTICS_DB_EXTRACTS_MAX_WORKERS")
+
+    # API_ANALYTICS_DB_EXTRACTS_ENABLE_GZIP
+    enable_gzip: bool = Field(default=False, alias="API_ANALYTICS_DB_EXTRACTS_ENABLE_GZIP")
+
+    # API_ANALYTICS_DB_EXTRACTS_INCREMENTAL_OVERLAP_MINUTES
+    # How far before the previous watermark an incremental extract starts from. A row's
+    # updated_at is set before its transaction commits, so a transaction still in progress
+    # during the previous extract can commit rows older than the watermark it recorded.
+    # Re-extracting a few rows twice is harmless as the analytics side upserts them.
+    incremental_overlap_minutes: int = Field(
+        default=60, alias="API_ANALYTICS_DB_EXTRACTS_INCREMENTAL_OVERLAP_MINUTES"
+    )
+
+
+@dataclass
+class TableExtract:
+    table_name: str
+    output_path: str
+    row_count: int
+    # Size of the CSV as produced by the DB, before any compression
+    bytes_extracted: int
+    file_size_bytes: int
+    duration: float
+
+    primary_key: list[str]
+    # The latest updated_at of the rows in the table, where the next
+    # incremental extract will pick up from
+    watermark: datetime | None
+    # For incremental extracts, the rows updated after this were extracted
+    changed_since: datetime | None
+    deleted_output_path: str | None = None
+    deleted_count: int = 0
+
 
 class CreateAnalyticsDbCsvsTask(Task):
 
     class Metrics(StrEnum):
         TABLE_COUNT = "table_count"
         ROW_COUNT = "row_count"
+        BYTES_EXTRACTED = "bytes_extracted"
+        FILE_SIZE_BYTES = "file_size_bytes"
+        DELETED_COUNT = "deleted_count"
 
     def __init__(
         self,
         db_session: db.Session,
         tables_to_extract: list[str] | None = None,
         config: CreateAnalyticsDbCsvsConfig | None = None,
+        is_incremental: bool = False,
     ) -> None:
         super().__init__(db_session)
+        self.is_incremental = is_incremental
 
         if tables_to_extract is None or len(tables_to_extract) == 0:
             tables_to_extract = TABLES_TO_EXTRACT
@@ -77,38 +141,322 @@ class CreateAnalyticsDbCsvsTask(Task):
         self.config = config
 
     def run_task(self) -> None:
-        for table in self.tables:
-            self.generate_csv(table)
+        self.extract_started_at = datetime_util.utcnow()
+        self.extract_id = self.extract_started_at.strftime("%Y%m%dT%H%M%S%f")
+
+        previous_manifest = self.fetch_previous_manifest()
+        if self.is_incremental and previous_manifest is None:
+            # Without knowing what the previous extract contained, we can't
+            # work out what changed, so all of the tables need extracting.
+            logger.warning("No usable previous extract found, running a full extract")
+            self.is_incremental = False
+
+        self.set_metrics({"is_incremental": self.is_incremental})
+
+        engine = self.db_session.get_bind().engine
+
+        # Each table is extracted on a separate connection, so to keep the extracts
+        # consistent with each other we export a snapshot from a transaction that is
+        # held open until every table is done, and have each extract import it.
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            snapshot_id = conn.execute(sqlalchemy.text("SELECT pg_export_snapshot()")).scalar_one()
+            logger.info("Exported snapshot for table extracts", extra={"snapshot_id": snapshot_id})
+
+            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self.generate_csv,
+                        table,
+                        engine,
+                        snapshot_id,
+                        (
+                            previous_manifest["tables"][table.name]
+                            if self.is_incremental and previous_manifest is not None
+                            else None
+                        ),
+                        (
+                            datetime.fromisoformat(previous_manifest["extracted_at"])
+                            if self.is_incremental and previous_manifest is not None
+                            else None
+                        ),
+                    )
+                    for table in self.tables
+                ]
+
+                # Metrics are only recorded here, on the main thread
+                table_extracts = []
+                for future in as_completed(futures):
+                    table_extract = future.result()
+                    self.record_table_extract(table_extract)
+                    table_extracts.append(table_extract)
+
+        # Only written once every table is extracted, so that a failed
+        # run doesn't leave the next incremental extract with a partial view
+        self.write_manifest(
+            table_extracts,
+            (
+                previous_manifest["extract_id"]
+                if self.is_incremental and previous_manifest is not None
+                else None
+            ),
+        )
+
+        # Tombstones from before this extract are no longer needed by the next one
+        self.delete_old_tombstones(engine)
+
+    def fetch_previous_manifest(self) -> dict | None:
+        manifest_path = file_util.join(self.config.file_path, MANIFEST_FILE_NAME)
+        if not file_util.file_exists(manifest_path):
+            return None
+
+        manifest = json.loads(file_util.read_file(manifest_path))
+
+        # A previous extract of only some tables can't be built upon for the others
+        if any(table.name not in manifest["tables"] for table in self.tables):
+            return None
+
+        # Nor can one that the loader has no way to chain the next extract to
+        if "extract_id" not in manifest:
+            return None
+
+        return manifest
+
+    def get_tombstone_table_name(self) -> str:
+        schema = (
+            ExtractTombstone.__table__.schema
+            if self.config.db_schema is None
+            else self.config.db_schema
+        )
+        return f"{schema}.{ExtractTombstone.__tablename__}"
+
+    def get_tombstone_cutoff(self, extracted_at: datetime) -> datetime:
+        # A tombstone's created_at is when its transaction started, so we go
+        # back by the same overlap as for updated_at to catch ones that were
+        # still being committed when the extract was taken.
+        return extracted_at - timedelta(minutes=self.config.incremental_overlap_minutes)
+
+    def delete_old_tombstones(self, engine: sqlalchemy.Engine) -> None:
+        with engine.begin() as conn:
+            result = conn.execute(
+                sqlalchemy.text(
+                    f"DELETE FROM {self.get_tombstone_table_name()}"
+                    " WHERE table_name = ANY(:table_names) AND created_at <= :cutoff"
+                ),
+                {
+                    "table_names": [table.name for table in self.tables],
+                    "cutoff": self.get_tombstone_cutoff(self.extract_started_at),
+                },
+            )
 
-    def generate_csv(self, table: sqlalchemy.Table) -> None:
-        """Generate the CSV file of a given table"""
-        output_path = file_util.join(self.config.file_path, f"{table.name}.csv")
+        logger.info("Deleted old extract tombstones", extra={"deleted_count": result.rowcount})
+
+    def generate_csv(
+        self,
+        table: sqlalchemy.Table,
+        engine: sqlalchemy.Engine,
+        snapshot_id: str,
+        previous_table_extract: dict | None = None,
+        previous_extracted_at: datetime | None = None,
+    ) -> TableExtract:
+        """
+        Generate the CSV file of a given table
+
+        If details of the previous extract of the table are passed in, only
+        the rows updated since then are extracted, along with a CSV of the
+        primary keys of any rows deleted since then. These are named after the
+        extract, so that they're still there for the loader if it has yet to
+        apply them when the next incremental extract runs.
+
+        Deleted rows are found from the tombstones a trigger on the table records,
+        so an incremental extract only reads the rows that changed rather than
+        every key in the table.
+        """
+        if previous_table_extract is not None:
+            file_name = f"{table.name}.changes-{self.extract_id}.csv"
+        else:
+            file_name = f"{table.name}.csv"
+        if self.config.enable_gzip:
+            file_name += ".gz"
+        output_path = file_util.join(self.config.file_path, file_name)
         log_extra = {
             "table_name": table.name,
             "output_path": output_path,
+            "is_incremental": previous_table_extract is not None,
         }
         logger.info("Generating CSV extract for table", extra=log_extra)
 
         start_time = time.monotonic()
+        bytes_extracted = 0
 
-        cursor = self.db_session.connection().connection.cursor()
         schema = table.schema if self.config.db_schema is None else self.config.db_schema
+        table_name = f"{schema}.{table.name}"
+        primary_key = [column.name for column in table.primary_key.columns]
 
-        with cursor.copy(
-            f"COPY {schema}.{table.name} TO STDOUT with (DELIMITER ',', FORMAT CSV, HEADER TRUE, FORCE_QUOTE *, encoding 'utf-8')"
-        ) as cursor_copy:
-            with file_util.open_stream(output_path, "wb") as outfile:
-                for data in cursor_copy:
-                    outfile.write(data)
+        changed_since = None
+        if previous_table_extract is not None and previous_table_extract["watermark"] is not None:
+            changed_since = datetime.fromisoformat(previous_table_extract["watermark"]) - timedelta(
+                minutes=self.config.incremental_overlap_minutes
+            )
 
-            row_count = cursor.rowcount
+        if changed_since is not None:
+            # COPY can't take parameters, but this is a value we generated rather than user input
+            where_clause = f"WHERE updated_at > '{changed_since.isoformat()}'::timestamptz"
+            query = f"(SELECT * FROM {table_name} {where_clause})"
+        else:
+            where_clause = ""
+            query = table_name
 
-        duration = round(time.monotonic() - start_time, 3)
-        self.increment(self.Metrics.TABLE_COUNT)
-        self.set_metrics({f"{table.name}.time": duration})
-        self.increment(self.Metrics.ROW_COUNT, row_count, prefix=table.name)
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            # Must be the first statement of the transaction
+            conn.execute(sqlalchemy.text(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'"))
+            cursor = conn.connection.cursor()
+
+            latest_updated_at = conn.execute(
+                sqlalchemy.text(f"SELECT max(updated_at) FROM {table_name} {where_clause}")
+            ).scalar_one()
+
+            with cursor.copy(
+                f"COPY {query} TO STDOUT with (DELIMITER ',', FORMAT CSV, HEADER TRUE, FORCE_QUOTE *, encoding 'utf-8')"
+            ) as cursor_copy:
+                # We compress the file ourselves rather than letting it be inferred
+                # from the extension so that we can count the bytes actually written
+                with file_util.open_stream(
+                    output_path, "wb", compression=NO_COMPRESSION
+                ) as raw_outfile:
+                    counter = file_util.ByteCountingWriter(raw_outfile)
+                    with (
+                        gzip.GzipFile(fileobj=counter, mode="wb")
+                        if self.config.enable_gzip
+                        else counter
+                    ) as outfile:
+                        for data in cursor_copy:
+                            bytes_extracted += len(data)
+                            outfile.write(data)
+
+                row_count = cursor.rowcount
+
+            deleted_output_path = None
+            deleted_count = 0
+            if previous_table_extract is not None and previous_extracted_at is not None:
+                deleted_output_path = file_util.join(
+                    self.config.file_path, f"{table.name}.deleted-{self.extract_id}.csv"
+                )
+                deleted_since = self.get_tombstone_cutoff(previous_extracted_at)
+                key_columns = ", ".join(
+                    f"primary_key[{i}] AS {column}" for i, column in enumerate(primary_key, 1)
+                )
+                with cursor.copy(
+                    f"COPY (SELECT DISTINCT {key_columns} FROM {self.get_tombstone_table_name()}"
+                    f" WHERE table_name = '{table.name}' AND created_at > '{deleted_since.isoformat()}'::timestamptz)"
+                    " TO STDOUT with (DELIMITER ',', FORMAT CSV, HEADER TRUE, FORCE_QUOTE *, encoding 'utf-8')"
+                ) as cursor_copy:
+                    with file_util.open_stream(deleted_output_path, "wb") as deleted_outfile:
+                        for data in cursor_copy:
+                            deleted_outfile.write(data)
+
+                deleted_count = cursor.rowcount
+
+        # The watermark only moves forward, and stays put if nothing changed
+        watermarks = [latest_updated_at]
+        if previous_table_extract is not None and previous_table_extract["watermark"] is not None:
+            watermarks.append(datetime.fromisoformat(previous_table_extract["watermark"]))
+        watermark = max((w for w in watermarks if w is not None), default=None)
+
+        table_extract = TableExtract(
+            table_name=table.name,
+            output_path=output_path,
+            row_count=row_count,
+            bytes_extracted=bytes_extracted,
+            file_size_bytes=counter.bytes_written,
+            duration=round(time.monotonic() - start_time, 3),
+            primary_key=primary_key,
+            watermark=watermark,
+            changed_since=changed_since,
+            deleted_output_path=deleted_output_path,
+            deleted_count=deleted_count,
+        )
 
         logger.info(
             "Generated CSV extract for table",
-            extra=log_extra | {"table_extract_duration_sec": duration, "row_count": row_count},
+            extra=log_extra
+            | {
+                "table_extract_duration_sec": table_extract.duration,
+                "row_count": row_count,
+                "deleted_count": table_extract.deleted_count,
+                "bytes_extracted": bytes_extracted,
+                "file_size_bytes": table_extract.file_size_bytes,
+            },
+        )
+
+        return table_extract
+
+    def write_manifest(
+        self, table_extracts: list[TableExtract], base_extract_id: str | None
+    ) -> None:
+        """
+        Write the manifest of this extract, both as the latest and under its own name
+
+        An incremental extract records the extract it holds the changes since as its
+        base, which is the one a loader must have applied before applying this one.
+        """
+        tables: dict[str, Any] = {}
+        for table_extract in sorted(table_extracts, key=lambda t: t.table_name):
+            tables[table_extract.table_name] = {
+                "file_name": file_util.get_file_name(table_extract.output_path),
+                "deleted_file_name": (
+                    file_util.get_file_name(table_extract.deleted_output_path)
+                    if table_extract.deleted_output_path is not None
+                    else None
+                ),
+                "primary_key": table_extract.primary_key,
+                "row_count": table_extract.row_count,
+                "deleted_count": table_extract.deleted_count,
+                "changed_since": (
+                    table_extract.changed_since.isoformat()
+                    if table_extract.changed_since is not None
+                    else None
+                ),
+                "watermark": (
+                    table_extract.watermark.isoformat()
+                    if table_extract.watermark is not None
+                    else None
+                ),
+            }
+
+        manifest = {
+            "extract_id": self.extract_id,
+            "base_extract_id": base_extract_id,
+            "extracted_at": self.extract_started_at.isoformat(),
+            "is_incremental": self.is_incremental,
+            "tables": tables,
+        }
+
+        # The extract's own manifest goes first, so the latest never points at one missing
+        for file_name in [
+            EXTRACT_MANIFEST_FILE_NAME_FORMAT.format(extract_id=self.extract_id),
+            MANIFEST_FILE_NAME,
+        ]:
+            manifest_path = file_util.join(self.config.file_path, file_name)
+            with file_util.open_stream(manifest_path, "w") as outfile:
+                json.dump(manifest, outfile, indent=4)
+
+    def record_table_extract(self, table_extract: TableExtract) -> None:
+        table_name = table_extract.table_name
+        # Avoid dividing by zero for tiny tables
+        duration = max(table_extract.duration, 0.001)
+
+        self.increment(self.Metrics.TABLE_COUNT)
+        self.increment(self.Metrics.ROW_COUNT, table_extract.row_count, prefix=table_name)
+        self.increment(
+            self.Metrics.BYTES_EXTRACTED, table_extract.bytes_extracted, prefix=table_name
+        )
+        self.increment(
+            self.Metrics.FILE_SIZE_BYTES, table_extract.file_size_bytes, prefix=table_name
+        )
+        self.set_metrics(
+            {
+                f"{table_name}.time": table_extract.duration,
+                f"{table_name}.rows_per_sec": round(table_extract.row_count / duration),
+                f"{table_name}.bytes_per_sec": round(table_extract.bytes_extracted / duration),
+            }
         )
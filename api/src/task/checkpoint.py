@@ -0,0 +1,81 @@
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+import src.adapters.db as db
+from src.db.models.task_models import JobCheckpoint
+from src.util import datetime_util
+
+logger = logging.getLogger(__name__)
+
+# The stage recorded once every stage of a pipeline has run
+PIPELINE_COMPLETE_STAGE = "pipeline_complete"
+
+
+class PipelineCheckpoints:
+    """
+    Tracks which stages of a multi-stage pipeline, and which tables or subtasks
+    within those stages, have completed.
+
+    Checkpoints are always recorded. When resuming, anything that completed since the
+    pipeline last finished successfully is considered done, so a rerun after a failure
+    only does the work that remains.
+    """
+
+    def __init__(self, db_session: db.Session, pipeline: str, resume: bool = False) -> None:
+        self.pipeline = pipeline
+        self.completed: set[tuple[str, str | None]] = set()
+
+        if resume:
+            with db_session.begin():
+                self.completed = self._fetch_completed_since_last_success(db_session)
+
+            logger.info(
+                "Resuming pipeline",
+                extra={"pipeline": pipeline, "completed_checkpoint_count": len(self.completed)},
+            )
+
+    def _fetch_completed_since_last_success(
+        self, db_session: db.Session
+    ) -> set[tuple[str, str | None]]:
+        last_success: datetime | None = db_session.scalar(
+            select(func.max(JobCheckpoint.completed_at)).where(
+                JobCheckpoint.pipeline == self.pipeline,
+                JobCheckpoint.stage == PIPELINE_COMPLETE_STAGE,
+            )
+        )
+
+        query = select(JobCheckpoint.stage, JobCheckpoint.step).where(
+            JobCheckpoint.pipeline == self.pipeline,
+            JobCheckpoint.stage != PIPELINE_COMPLETE_STAGE,
+        )
+        if last_success is not None:
+            query = query.where(JobCheckpoint.completed_at > last_success)
+
+        return {(stage, step) for stage, step in db_session.execute(query)}
+
+    def is_complete(self, stage: str, step: str | None = None) -> bool:
+        return (stage, step) in self.completed
+
+    def mark_complete(
+        self,
+        db_session: db.Session,
+        stage: str,
+        step: str | None = None,
+        job_id: uuid.UUID | None = None,
+    ) -> None:
+        db_session.add(
+            JobCheckpoint(
+                pipeline=self.pipeline,
+                stage=stage,
+                step=step,
+                job_id=job_id,
+                completed_at=datetime_util.utcnow(),
+            )
+        )
+        db_session.commit()
+
+    def mark_pipeline_complete(self, db_session: db.Session) -> None:
+        self.mark_complete(db_session, PIPELINE_COMPLETE_STAGE)
@@ -1,11 +1,19 @@
+import contextlib
+import gzip
+import io
 import json
 import logging
 import os
+from dataclasses import dataclass, field
 from enum import StrEnum
-from typing import Iterator, Sequence
+from typing import Any, BinaryIO, Iterable, Iterator, Sequence, TextIO, cast
 
+import click
+import pyarrow.parquet as pq
+import zstandard
 from pydantic import Field
-from sqlalchemy import select
+from smart_open.compression import NO_COMPRESSION
+from sqlalchemy import ColumnElement, select
 from sqlalchemy.orm import noload, selectinload
 
 import src.adapters.db as db
@@ -14,11 +22,20 @@ import src.util.file_util as file_util
 from src.api.opportunities_v1.opportunity_schemas import OpportunityV1Schema
 from src.constants.lookup_constants import ExtractType
 from src.db.models.extract_models import ExtractMetadata
-from src.db.models.opportunity_models import CurrentOpportunitySummary, Opportunity
+from src.db.models.opportunity_models import (
+    CurrentOpportunitySummary,
+    Opportunity,
+    OpportunityChangeAudit,
+)
 from src.services.opportunities_v1.opportunity_to_csv import opportunities_to_csv
+from src.services.opportunities_v1.opportunity_to_parquet import (
+    PARQUET_SCHEMA,
+    opportunities_to_parquet_table,
+)
 from src.task.ecs_background_task import ecs_background_task
 from src.task.task import Task
 from src.task.task_blueprint import task_blueprint
+from src.util import datetime_util
 from src.util.datetime_util import get_now_us_eastern_datetime
 from src.util.env_config import PydanticBaseEnvConfig
 
@@ -29,86 +46,369 @@ logger = logging.getLogger(__name__)
     "export-opportunity-data",
     help="Generate JSON and CSV files containing an export of all opportunity data",
 )
+@click.option(
+    "--full-export/--delta-export",
+    default=True,
+    help="Whether to export all opportunities, or only the changes since the previous extract",
+)
 @flask_db.with_db_session()
 @ecs_background_task(task_name="export-opportunity-data")
-def export_opportunity_data(db_session: db.Session) -> None:
-    ExportOpportunityDataTask(db_session).run()
+def export_opportunity_data(db_session: db.Session, full_export: bool) -> None:
+    ExportOpportunityDataTask(db_session, is_delta=not full_export).run()
 
 
 class ExportOpportunityDataConfig(PydanticBaseEnvConfig):
     file_path: str = Field(..., alias="PUBLIC_FILES_OPPORTUNITY_DATA_EXTRACTS_PATH")
 
+    # Additional formats to produce alongside the uncompressed JSON and CSV extracts
+    enable_gzip_extracts: bool = Field(default=False, alias="EXPORT_OPPORTUNITY_DATA_ENABLE_GZIP")
+    enable_zstd_extracts: bool = Field(default=False, alias="EXPORT_OPPORTUNITY_DATA_ENABLE_ZSTD")
+    enable_parquet_extract: bool = Field(
+        default=False, alias="EXPORT_OPPORTUNITY_DATA_ENABLE_PARQUET"
+    )
+
+    # Number of opportunities written per row group of the Parquet file
+    parquet_row_group_size: int = Field(
+        default=5000, alias="EXPORT_OPPORTUNITY_DATA_PARQUET_ROW_GROUP_SIZE"
+    )
+
+
+def get_id_manifest_path(json_file_path: str) -> str:
+    """
+    Get the path of the file listing every opportunity ID included as of a
+    given JSON extract. These are written alongside each full and delta JSON
+    extract so that the next delta can work out which opportunities were deleted.
+    """
+    return f"{json_file_path.removesuffix('.json')}.ids.json.gz"
+
+
+class ExtractCompression(StrEnum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+@dataclass
+class ExtractFile:
+    extract_type: ExtractType
+    file_name: str
+    file_path: str
+    compression: ExtractCompression | None = None
+
+    # Tracks the size of the file as it gets written
+    counter: file_util.ByteCountingWriter | None = field(default=None, init=False)
+
+    @property
+    def file_size_bytes(self) -> int:
+        if self.counter is None:
+            raise ValueError(f"Extract file {self.file_path} has not been written")
+        return self.counter.bytes_written
+
 
 class ExportOpportunityDataTask(Task):
     class Metrics(StrEnum):
         RECORDS_EXPORTED = "records_exported"
+        RECORDS_DELETED = "records_deleted"
 
     def __init__(
         self,
         db_session: db.Session,
         config: ExportOpportunityDataConfig | None = None,
+        is_delta: bool = False,
     ) -> None:
         super().__init__(db_session)
 
         if config is None:
             config = ExportOpportunityDataConfig()
         self.config = config
+        self.is_delta = is_delta
 
         self.current_timestamp = get_now_us_eastern_datetime().strftime("%Y-%m-%d_%H-%M-%S")
 
-        self.json_file = os.path.join(
-            config.file_path, f"opportunity_data-{self.current_timestamp}.json"
+        self.json_extracts = [self._build_extract_file(ExtractType.OPPORTUNITIES_JSON, "json")]
+        self.csv_extracts = [self._build_extract_file(ExtractType.OPPORTUNITIES_CSV, "csv")]
+
+        if config.enable_gzip_extracts:
+            self.json_extracts.append(
+                self._build_extract_file(
+                    ExtractType.OPPORTUNITIES_JSON_GZIP, "json.gz", ExtractCompression.GZIP
+                )
+            )
+            self.csv_extracts.append(
+                self._build_extract_file(
+                    ExtractType.OPPORTUNITIES_CSV_GZIP, "csv.gz", ExtractCompression.GZIP
+                )
+            )
+
+        if config.enable_zstd_extracts:
+            self.json_extracts.append(
+                self._build_extract_file(
+                    ExtractType.OPPORTUNITIES_JSON_ZSTD, "json.zst", ExtractCompression.ZSTD
+                )
+            )
+            self.csv_extracts.append(
+                self._build_extract_file(
+                    ExtractType.OPPORTUNITIES_CSV_ZSTD, "csv.zst", ExtractCompression.ZSTD
+                )
+            )
+
+        self.parquet_extract: ExtractFile | None = None
+        if config.enable_parquet_extract:
+            self.parquet_extract = self._build_extract_file(
+                ExtractType.OPPORTUNITIES_PARQUET, "parquet"
+            )
+
+        self.json_file = self.json_extracts[0].file_path
+        self.csv_file = self.csv_extracts[0].file_path
+
+        self.delta_extract = ExtractFile(
+            extract_type=ExtractType.OPPORTUNITIES_DELTA_JSON,
+            file_name=f"opportunity_data_delta-{self.current_timestamp}.json",
+            file_path=os.path.join(
+                config.file_path, f"opportunity_data_delta-{self.current_timestamp}.json"
+            ),
         )
-        self.csv_file = os.path.join(
-            config.file_path, f"opportunity_data-{self.current_timestamp}.csv"
+
+        self.exported_opportunity_ids: set[int] = set()
+
+        self.set_metrics(
+            {"csv_file": self.csv_file, "json_file": self.json_file, "is_delta": is_delta}
+            | {extract.extract_type: extract.file_path for extract in self.extract_files}
         )
 
-        self.set_metrics({"csv_file": self.csv_file, "json_file": self.json_file})
+    @property
+    def extract_files(self) -> list[ExtractFile]:
+        extract_files = self.json_extracts + self.csv_extracts
+        if self.parquet_extract is not None:
+            extract_files.append(self.parquet_extract)
+        return extract_files
+
+    def _build_extract_file(
+        self,
+        extract_type: ExtractType,
+        extension: str,
+        compression: ExtractCompression | None = None,
+    ) -> ExtractFile:
+        file_name = f"opportunity_data-{self.current_timestamp}.{extension}"
+        return ExtractFile(
+            extract_type=extract_type,
+            file_name=file_name,
+            file_path=os.path.join(self.config.file_path, file_name),
+            compression=compression,
+        )
 
     def run_task(self) -> None:
-        # Load records
-        schema = OpportunityV1Schema()
+        # Extracts are timestamped with when we started reading the data rather than
+        # when they finished being written so that the next delta extract overlaps
+        # with any changes made while this one was running instead of missing them.
+        self.extract_started_at = datetime_util.utcnow()
 
-        opportunities = []
-        for opp_batch in self.fetch_opportunities():
-            for record in opp_batch:
-                self.increment(self.Metrics.RECORDS_EXPORTED)
-                opportunities.append(schema.dump(record))
+        if self.is_delta:
+            previous_extract = self.fetch_previous_extract()
+
+            if previous_extract is not None and file_util.file_exists(
+                get_id_manifest_path(previous_extract.file_path)
+            ):
+                self.run_delta_export(previous_extract)
+                return
+
+            logger.warning(
+                "No previous extract to compute a delta from, creating a full extract instead"
+            )
+
+        self.run_full_export()
+
+    def run_full_export(self) -> None:
+        logger.info(
+            "Creating Opportunity extracts",
+            extra={"extract_paths": [extract.file_path for extract in self.extract_files]},
+        )
 
-        # Format data
-        data_to_export: dict = {
-            "metadata": {"file_generated_at": self.current_timestamp},
-            "opportunities": opportunities,
-        }
+        # Write every file in a single pass over the opportunities, streaming
+        # each batch out as it is fetched rather than holding the full dataset
+        # in memory. Each opportunity is only serialized to JSON / CSV once,
+        # and the resulting text is written to every file of that format.
+        with contextlib.ExitStack() as stack:
+            json_outfile = self.open_extract_files(stack, self.json_extracts)
+            csv_outfile = self.open_extract_files(stack, self.csv_extracts)
+
+            opportunities = self.write_opportunities_to_json(
+                self.serialize_opportunities(),
+                json_outfile,
+                {"metadata": {"file_generated_at": self.current_timestamp}},
+            )
 
-        # Export data
-        self.export_data_to_json(data_to_export)
-        self.export_opportunities_to_csv(opportunities)
+            if self.parquet_extract is not None:
+                parquet_outfile = self.open_binary_extract_file(stack, self.parquet_extract)
+                opportunities = self.write_opportunities_to_parquet(opportunities, parquet_outfile)
 
-        # Export data and create metadata entries
-        json_size = self.export_data_to_json(data_to_export)
-        csv_size = self.export_opportunities_to_csv(opportunities)
+            opportunities_to_csv(opportunities, csv_outfile)
 
         # Create metadata entries
-        json_metadata = ExtractMetadata(
-            extract_type=ExtractType.OPPORTUNITIES_JSON,
-            file_name=f"opportunity_data-{self.current_timestamp}.json",
-            file_path=self.json_file,
-            file_size_bytes=json_size,
+        for extract in self.extract_files:
+            self.db_session.add(
+                ExtractMetadata(
+                    extract_type=extract.extract_type,
+                    file_name=extract.file_name,
+                    file_path=extract.file_path,
+                    file_size_bytes=extract.file_size_bytes,
+                    created_at=self.extract_started_at,
+                )
+            )
+
+        self.write_id_manifest(self.json_file, self.exported_opportunity_ids)
+        self.db_session.commit()
+
+    def run_delta_export(self, previous_extract: ExtractMetadata) -> None:
+        """
+        Create an extract of just the opportunities that have been
+        added, changed or removed since the previous extract.
+        """
+        base_extract = previous_extract
+        if previous_extract.base_extract_metadata_id is not None:
+            base_extract = self.db_session.get_one(
+                ExtractMetadata, previous_extract.base_extract_metadata_id
+            )
+
+        logger.info(
+            "Creating Opportunity delta extract",
+            extra={
+                "delta_extract_path": self.delta_extract.file_path,
+                "previous_extract_path": previous_extract.file_path,
+                "base_extract_path": base_extract.file_path,
+            },
+        )
+
+        previous_opportunity_ids: set[int] = set(
+            json.loads(file_util.read_file(get_id_manifest_path(previous_extract.file_path)))
         )
+        current_opportunity_ids: set[int] = set(
+            self.db_session.scalars(
+                select(Opportunity.opportunity_id)
+                .join(CurrentOpportunitySummary)
+                .where(*self.get_exportable_opportunity_filters())
+            )
+        )
+        changed_opportunity_ids: set[int] = set(
+            self.db_session.scalars(
+                select(OpportunityChangeAudit.opportunity_id).where(
+                    OpportunityChangeAudit.updated_at > previous_extract.created_at
+                )
+            )
+        )
+
+        # Anything that changed and is still exportable, or that has become exportable
+        # since the last extract (eg. a draft being published) needs to be upserted.
+        # Deletions are anything that was exportable before but no longer is, which
+        # we can't get from the change audit as its rows are deleted with the opportunity.
+        upserted_opportunity_ids = (changed_opportunity_ids & current_opportunity_ids) | (
+            current_opportunity_ids - previous_opportunity_ids
+        )
+        deleted_opportunity_ids = previous_opportunity_ids - current_opportunity_ids
+        self.increment(self.Metrics.RECORDS_DELETED, len(deleted_opportunity_ids))
+
+        with contextlib.ExitStack() as stack:
+            outfile = self.open_extract_files(stack, [self.delta_extract])
+
+            opportunities = self.write_opportunities_to_json(
+                self.serialize_opportunities(upserted_opportunity_ids),
+                outfile,
+                {
+                    "metadata": {
+                        "file_generated_at": self.current_timestamp,
+                        "changes_since": previous_extract.created_at.isoformat(),
+                        "previous_extract_file_name": previous_extract.file_name,
+                        "base_extract_file_name": base_extract.file_name,
+                    },
+                    "deleted_opportunity_ids": sorted(deleted_opportunity_ids),
+                },
+                key="upserted_opportunities",
+            )
+            # Nothing else consumes the opportunities, so iterate
+            # over them here to write them to the file
+            for _ in opportunities:
+                pass
 
-        csv_metadata = ExtractMetadata(
-            extract_type=ExtractType.OPPORTUNITIES_CSV,
-            file_name=f"opportunity_data-{self.current_timestamp}.csv",
-            file_path=self.csv_file,
-            file_size_bytes=csv_size,
+        self.db_session.add(
+            ExtractMetadata(
+                extract_type=self.delta_extract.extract_type,
+                file_name=self.delta_extract.file_name,
+                file_path=self.delta_extract.file_path,
+                file_size_bytes=self.delta_extract.file_size_bytes,
+                base_extract_metadata_id=base_extract.extract_metadata_id,
+                created_at=self.extract_started_at,
+            )
         )
 
-        self.db_session.add(json_metadata)
-        self.db_session.add(csv_metadata)
+        self.write_id_manifest(self.delta_extract.file_path, current_opportunity_ids)
         self.db_session.commit()
 
-    def fetch_opportunities(self) -> Iterator[Sequence[Opportunity]]:
+    def fetch_previous_extract(self) -> ExtractMetadata | None:
+        """Fetch the most recent full or delta JSON extract"""
+        return self.db_session.scalars(
+            select(ExtractMetadata)
+            .where(
+                ExtractMetadata.extract_type.in_(
+                    [ExtractType.OPPORTUNITIES_JSON, ExtractType.OPPORTUNITIES_DELTA_JSON]
+                )
+            )
+            .order_by(ExtractMetadata.created_at.desc(), ExtractMetadata.extract_metadata_id.desc())
+            .limit(1)
+        ).first()
+
+    def write_id_manifest(self, json_file_path: str, opportunity_ids: set[int]) -> None:
+        with file_util.open_stream(get_id_manifest_path(json_file_path), "w") as outfile:
+            json.dump(sorted(opportunity_ids), outfile)
+
+    def open_binary_extract_file(
+        self, stack: contextlib.ExitStack, extract: ExtractFile
+    ) -> file_util.ByteCountingWriter:
+        """
+        Open an extract file for writing. The byte counter wraps the raw
+        file so that the size we track is the size of the file as stored,
+        after any compression.
+        """
+        # We handle compression ourselves so that we can count the compressed bytes
+        stream = stack.enter_context(
+            file_util.open_stream(extract.file_path, "wb", compression=NO_COMPRESSION)
+        )
+        extract.counter = file_util.ByteCountingWriter(stream)
+        return extract.counter
+
+    def open_extract_files(
+        self, stack: contextlib.ExitStack, extracts: list[ExtractFile]
+    ) -> TextIO:
+        """
+        Open a set of extract files that all share the same content
+        and return a single text stream that writes to all of them.
+        """
+        streams: list[Any] = []
+        for extract in extracts:
+            counter = self.open_binary_extract_file(stack, extract)
+
+            match extract.compression:
+                case ExtractCompression.GZIP:
+                    streams.append(gzip.GzipFile(fileobj=counter, mode="wb"))
+                case ExtractCompression.ZSTD:
+                    # The counter supports the write/flush calls the compressor
+                    # makes, it just isn't typed as a full IO object
+                    compressor = zstandard.ZstdCompressor()
+                    streams.append(compressor.stream_writer(cast(BinaryIO, counter), closefd=False))
+                case _:
+                    streams.append(counter)
+
+        return stack.enter_context(
+            io.TextIOWrapper(file_util.MultiStreamWriter(streams), encoding="utf-8")
+        )
+
+    def get_exportable_opportunity_filters(self) -> list[ColumnElement[bool]]:
+        return [
+            Opportunity.is_draft.is_(False),
+            CurrentOpportunitySummary.opportunity_status.isnot(None),
+        ]
+
+    def fetch_opportunities(
+        self, opportunity_ids: set[int] | None = None
+    ) -> Iterator[Sequence[Opportunity]]:
         """
         Fetch the opportunities in batches. The iterator returned
         will give you each individual batch to be processed.
@@ -116,39 +416,83 @@ class ExportOpportunityDataTask(Task):
         Fetches all opportunities where:
             * is_draft = False
             * current_opportunity_summary is not None
+
+        Optionally limited to a specific set of opportunity IDs.
         """
-        return (
-            self.db_session.execute(
-                select(Opportunity)
-                .join(CurrentOpportunitySummary)
-                .where(
-                    Opportunity.is_draft.is_(False),
-                    CurrentOpportunitySummary.opportunity_status.isnot(None),
-                )
-                .options(selectinload("*"), noload(Opportunity.all_opportunity_summaries))
-                .execution_options(yield_per=5000)
-            )
-            .scalars()
-            .partitions()
+        stmt = (
+            select(Opportunity)
+            .join(CurrentOpportunitySummary)
+            .where(*self.get_exportable_opportunity_filters())
+            .options(selectinload("*"), noload(Opportunity.all_opportunity_summaries))
+            .execution_options(yield_per=5000)
         )
 
-    def export_data_to_json(self, data_to_export: dict) -> int:
-        # create the json file
-        logger.info(
-            "Creating Opportunity JSON extract", extra={"json_extract_path": self.json_file}
-        )
-        json_object = json.dumps(data_to_export, indent=4)
-        with file_util.open_stream(self.json_file, "w") as outfile:
-            outfile.write(json_object)
+        if opportunity_ids is not None:
+            stmt = stmt.where(Opportunity.opportunity_id.in_(opportunity_ids))
+
+        return self.db_session.execute(stmt).scalars().partitions()
+
+    def serialize_opportunities(self, opportunity_ids: set[int] | None = None) -> Iterator[dict]:
+        """Fetch and serialize each opportunity to export, one at a time"""
+        schema = OpportunityV1Schema()
 
-        return len(json_object.encode("utf-8"))
+        for opp_batch in self.fetch_opportunities(opportunity_ids):
+            for record in opp_batch:
+                self.increment(self.Metrics.RECORDS_EXPORTED)
+                self.exported_opportunity_ids.add(record.opportunity_id)
+                yield schema.dump(record)
 
-    def export_opportunities_to_csv(self, opportunities: Sequence[dict]) -> int:
-        # create the csv file
-        logger.info("Creating Opportunity CSV extract", extra={"csv_extract_path": self.csv_file})
+    def write_opportunities_to_json(
+        self,
+        opportunities: Iterable[dict],
+        outfile: TextIO,
+        header: dict,
+        key: str = "opportunities",
+    ) -> Iterator[dict]:
+        """
+        Incrementally write the opportunities to the JSON file as an array,
+        yielding each opportunity back after it has been written so the
+        same pass can feed other writers.
+
+        The output is equivalent to json.dumps(..., indent=4) of:
+
+            {**header, key: [...]}
+        """
+        # Write the header as an object, but leave it open
+        # so the array of opportunities can be added to it
+        outfile.write(json.dumps(header, indent=4).removesuffix("\n}"))
+        outfile.write(f",\n    {json.dumps(key)}: [")
+
+        has_records = False
+        for opportunity in opportunities:
+            outfile.write(",\n        " if has_records else "\n        ")
+            # json.dumps escapes any newlines within values, so the only
+            # newlines in the output are from the indentation itself
+            outfile.write(json.dumps(opportunity, indent=4).replace("\n", "\n        "))
+            has_records = True
+
+            yield opportunity
+
+        # An empty array is written as [] to match json.dumps
+        outfile.write("\n    ]\n}" if has_records else "]\n}")
+
+    def write_opportunities_to_parquet(
+        self, opportunities: Iterable[dict], outfile: file_util.ByteCountingWriter
+    ) -> Iterator[dict]:
+        """
+        Incrementally write the opportunities to the Parquet file, one row
+        group at a time, yielding each opportunity back so the same pass
+        can feed other writers.
+        """
+        batch: list[dict] = []
+        with pq.ParquetWriter(outfile, PARQUET_SCHEMA, compression="zstd") as writer:
+            for opportunity in opportunities:
+                batch.append(opportunity)
+                yield opportunity
 
-        with file_util.open_stream(self.csv_file, "w") as outfile:
-            opportunities_to_csv(opportunities, outfile)
+                if len(batch) >= self.config.parquet_row_group_size:
+                    writer.write_table(opportunities_to_parquet_table(batch))
+                    batch = []
 
-        csv_size = file_util.get_file_length_bytes(self.csv_file)
-        return csv_size
+            if batch:
+                writer.write_table(opportunities_to_parquet_table(batch))
@@ -22,6 +22,8 @@ class SubTask(abc.ABC, metaclass=abc.ABCMeta):
 
     def __init__(self, task: Task):
         self.task = task
+        # Set when the subtask runs alongside others, each with a session of its own
+        self._db_session: db.Session | None = None
 
     def run(self) -> None:
         try:
@@ -62,8 +64,14 @@ class SubTask(abc.ABC, metaclass=abc.ABCMeta):
     def db_session(self) -> db.Session:
         # Property to make it so the subtask can reference the db_session
         # as if it were the task itself
+        if self._db_session is not None:
+            return self._db_session
         return self.task.db_session
 
+    @db_session.setter
+    def db_session(self, db_session: db.Session) -> None:
+        self._db_session = db_session
+
     @property
     def metrics(self) -> dict[str, Any]:
         return self.task.metrics
@@ -1,5 +1,6 @@
 import abc
 import logging
+import threading
 import time
 from enum import StrEnum
 from typing import Any
@@ -29,6 +30,9 @@ class Task(abc.ABC, metaclass=abc.ABCMeta):
     def __init__(self, db_session: db.Session) -> None:
         self.db_session = db_session
         self.metrics: dict[str, Any] = {}
+        # Tasks that do their work across several threads all record
+        # metrics here, so updates to them need to be serialized
+        self.metrics_lock = threading.RLock()
         self.job: JobLog | None = None
 
     def run(self) -> None:
@@ -72,13 +76,15 @@ class Task(abc.ABC, metaclass=abc.ABCMeta):
         self.set_metrics(zero_metrics_dict)
 
     def set_metrics(self, metrics: dict[str, Any]) -> None:
-        self.metrics.update(**metrics)
+        with self.metrics_lock:
+            self.metrics.update(**metrics)
 
     def increment(self, name: str, value: int = 1, prefix: str | None = None) -> None:
-        if name not in self.metrics:
-            self.metrics[name] = 0
+        with self.metrics_lock:
+            if name not in self.metrics:
+                self.metrics[name] = 0
 
-        self.metrics[name] += value
+            self.metrics[name] += value
 
         if prefix is not None:
             # Rather than re-implement the above, just re-use the function without a prefix
@@ -1,14 +1,22 @@
+import concurrent.futures
+import io
+import itertools
 import os
 import shutil
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Iterable, Sequence, cast
 from urllib.parse import urlparse
 
 import botocore.client
 import smart_open
 from botocore.config import Config
+from smart_open.compression import INFER_FROM_EXTENSION
 
-from src.adapters.aws import S3Config, get_boto_session, get_s3_client
+from src.adapters.aws import S3Config, get_cached_s3_client, get_default_s3_config
+from src.adapters.aws.s3_adapter import DEFAULT_S3_MAX_POOL_CONNECTIONS
 
 ##################################
 # Path parsing utils
@@ -46,10 +54,31 @@ def join(*parts: str) -> str:
 #  File operations
 ##################################
 
+# The smallest size of an S3 multipart upload part, other than the last part
+S3_MIN_PART_SIZE_BYTES = 5 * 1024 * 1024
 
-def open_stream(path: str | Path, mode: str = "r", encoding: str | None = None) -> Any:
+# The most keys a single S3 DeleteObjects request can delete
+S3_MAX_DELETE_OBJECTS_KEYS = 1000
+
+# How many files the batch operations below copy at once
+DEFAULT_BATCH_MAX_WORKERS = 10
+
+
+def open_stream(
+    path: str | Path,
+    mode: str = "r",
+    encoding: str | None = None,
+    compression: str = INFER_FROM_EXTENSION,
+) -> Any:
+    """
+    Open a file on S3 or local disk
+
+    By default, files with a compressed extension (eg. .gz or .zst)
+    are transparently (de)compressed. Pass compression="disable" to
+    read or write the raw bytes instead.
+    """
     if is_s3_path(path):
-        s3_client = get_s3_client()
+        s3_client = get_cached_s3_client()
 
         so_config = Config(
             max_pool_connections=10,
@@ -59,14 +88,94 @@ def open_stream(path: str | Path, mode: str = "r", encoding: str | None = None)
         )
         so_transport_params = {"client_kwargs": {"config": so_config}, "client": s3_client}
 
-        return smart_open.open(path, mode, transport_params=so_transport_params, encoding=encoding)
+        return smart_open.open(
+            path,
+            mode,
+            transport_params=so_transport_params,
+            encoding=encoding,
+            compression=compression,
+        )
     else:
-        return smart_open.open(path, mode, encoding=encoding)
+        return smart_open.open(path, mode, encoding=encoding, compression=compression)
+
+
+class PresignedUrlCache:
+    """
+    Cache of presigned URLs, keyed by the file location and expiry bucket
+
+    Time is split into buckets the length of the fraction of a URL's duration it can be
+    reused for. A URL is signed the first time it's requested in a bucket, and then reused
+    for the rest of the bucket, so every URL handed out still has at least the remaining
+    fraction of its duration left before it expires.
+    """
+
+    def __init__(self) -> None:
+        self._urls: OrderedDict[tuple[str, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_paths: Sequence[str], now: float | None = None) -> list[str]:
+        s3_config = get_default_s3_config()
+
+        reuse_duration = (
+            s3_config.presigned_s3_duration * s3_config.presigned_url_cache_reuse_fraction
+        )
+        s3_client = get_cached_s3_client(s3_config)
+
+        if reuse_duration <= 0:
+            # Caching is disabled
+            return [
+                _pre_sign_file_location(file_path, s3_config, s3_client) for file_path in file_paths
+            ]
+
+        if now is None:
+            now = time.time()
+        expiry_bucket = int(now // reuse_duration)
+
+        with self._lock:
+            urls = {
+                file_path: self._urls.get((file_path, expiry_bucket)) for file_path in file_paths
+            }
+
+        # Sign outside of the lock, a URL signed twice at once is harmless
+        signed_urls = {
+            file_path: _pre_sign_file_location(file_path, s3_config, s3_client)
+            for file_path, url in urls.items()
+            if url is None
+        }
+
+        with self._lock:
+            for file_path, url in signed_urls.items():
+                self._urls[(file_path, expiry_bucket)] = url
+
+            # Mark the URLs as recently used, and drop the least recently used
+            for file_path in urls:
+                self._urls.move_to_end((file_path, expiry_bucket))
+            while len(self._urls) > s3_config.presigned_url_cache_max_size:
+                self._urls.popitem(last=False)
+
+        urls.update(signed_urls)
+        return [cast(str, urls[file_path]) for file_path in file_paths]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._urls.clear()
+
+
+presigned_url_cache = PresignedUrlCache()
 
 
 def pre_sign_file_location(file_path: str) -> str:
-    s3_config = S3Config()
-    s3_client = get_s3_client(s3_config, get_boto_session())
+    return presigned_url_cache.get([file_path])[0]
+
+
+def pre_sign_file_locations(file_paths: Sequence[str]) -> list[str]:
+    """Presign several file locations, in the same order"""
+    return presigned_url_cache.get(file_paths)
+
+
+def _pre_sign_file_location(
+    file_path: str, s3_config: S3Config, s3_client: botocore.client.BaseClient
+) -> str:
     bucket, key = split_s3_url(file_path)
     pre_sign_file_loc = s3_client.generate_presigned_url(
         "get_object",
@@ -85,7 +194,7 @@ def pre_sign_file_location(file_path: str) -> str:
 def get_file_length_bytes(path: str) -> int:
     if is_s3_path(path):
         s3_client = (
-            get_s3_client()
+            get_cached_s3_client()
         )  # from our aws utils - handles some of the weird localstack stuff
 
         bucket, key = split_s3_url(path)
@@ -106,7 +215,7 @@ def copy_file(source_path: str | Path, destination_path: str | Path) -> None:
         raise Exception("Cannot download/upload between disk and S3 using this method")
 
     if is_source_s3:
-        s3_client = get_s3_client()
+        s3_client = get_cached_s3_client()
 
         source_bucket, source_path = split_s3_url(source_path)
         dest_bucket, dest_path = split_s3_url(destination_path)
@@ -122,7 +231,7 @@ def delete_file(path: str | Path) -> None:
     if is_s3_path(path):
         bucket, s3_path = split_s3_url(path)
 
-        s3_client = get_s3_client()
+        s3_client = get_cached_s3_client()
         s3_client.delete_object(Bucket=bucket, Key=s3_path)
     else:
         os.remove(path)
@@ -145,10 +254,112 @@ def move_file(source_path: str | Path, destination_path: str | Path) -> None:
         os.renames(source_path, destination_path)
 
 
+def _is_s3_transfer(source_path: str | Path, destination_path: str | Path) -> bool:
+    # This isn't a download or upload method
+    # Don't allow "copying" between mismatched locations
+    is_source_s3 = is_s3_path(source_path)
+    if is_source_s3 != is_s3_path(destination_path):
+        raise Exception("Cannot download/upload between disk and S3 using this method")
+
+    return is_source_s3
+
+
+def delete_files(paths: Iterable[str | Path]) -> None:
+    """
+    Delete several files from s3 or local disk
+
+    Files on s3 are deleted with as few DeleteObjects
+    requests as possible, each deleting up to 1000 files.
+    """
+    s3_keys_by_bucket: dict[str, list[str]] = {}
+    for path in paths:
+        if is_s3_path(path):
+            bucket, key = split_s3_url(path)
+            s3_keys_by_bucket.setdefault(bucket, []).append(key)
+        else:
+            os.remove(path)
+
+    if not s3_keys_by_bucket:
+        return
+
+    s3_client = get_cached_s3_client()
+    for bucket, keys in s3_keys_by_bucket.items():
+        for batch in itertools.batched(keys, S3_MAX_DELETE_OBJECTS_KEYS):
+            response = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+
+            # Like delete_object, keys that don't exist aren't errors
+            errors = response.get("Errors", [])
+            if errors:
+                raise Exception(
+                    f"Failed to delete {len(errors)} files from s3 bucket {bucket}, first error: {errors[0]}"
+                )
+
+
+def copy_files(
+    paths: Sequence[tuple[str | Path, str | Path]],
+    max_workers: int = DEFAULT_BATCH_MAX_WORKERS,
+) -> None:
+    """
+    Copy several files, each given as a (source, destination) pair
+
+    Files on s3 are copied in parallel, using the transfer manager
+    of a client shared across the threads.
+    """
+    s3_paths = []
+    for source_path, destination_path in paths:
+        if _is_s3_transfer(source_path, destination_path):
+            s3_paths.append((source_path, destination_path))
+        else:
+            copy_file(source_path, destination_path)
+
+    if not s3_paths:
+        return
+
+    # Shared by every thread, with at least a connection for each of them
+    s3_client = get_cached_s3_client(
+        max_pool_connections=max(max_workers, DEFAULT_S3_MAX_POOL_CONNECTIONS)
+    )
+
+    def copy(path_pair: tuple[str | Path, str | Path]) -> None:
+        source_bucket, source_key = split_s3_url(path_pair[0])
+        dest_bucket, dest_key = split_s3_url(path_pair[1])
+        s3_client.copy({"Bucket": source_bucket, "Key": source_key}, dest_bucket, dest_key)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the results so any errors are raised
+        list(executor.map(copy, s3_paths))
+
+
+def move_files(
+    paths: Sequence[tuple[str | Path, str | Path]],
+    max_workers: int = DEFAULT_BATCH_MAX_WORKERS,
+) -> None:
+    """
+    Move several files, each given as a (source, destination) pair
+
+    Files on s3 are copied in parallel, and then deleted in bulk.
+    """
+    s3_paths = []
+    for source_path, destination_path in paths:
+        if _is_s3_transfer(source_path, destination_path):
+            s3_paths.append((source_path, destination_path))
+        else:
+            os.renames(source_path, destination_path)
+
+    if not s3_paths:
+        return
+
+    copy_files(s3_paths, max_workers)
+    delete_files([source_path for source_path, _ in s3_paths])
+
+
 def file_exists(path: str | Path) -> bool:
     """Get whether a file exists or not"""
     if is_s3_path(path):
-        s3_client = get_s3_client()
+        s3_client = get_cached_s3_client()
 
         bucket, key = split_s3_url(path)
 
@@ -162,6 +373,206 @@ def file_exists(path: str | Path) -> bool:
     return Path(path).exists()
 
 
+class ByteCountingWriter(io.BufferedIOBase):
+    """
+    Write-only binary stream that passes everything written to it
+    through to an underlying stream while keeping a running count
+    of the bytes written.
+
+    Useful for knowing the size of a file as it is written rather
+    than needing to look it up afterwards (eg. with a HEAD request to S3).
+    Can be wrapped in an io.TextIOWrapper to write text.
+    """
+
+    def __init__(self, stream: Any):
+        super().__init__()
+        self.stream = stream
+        self.bytes_written = 0
+
+    @property
+    def name(self) -> Any:
+        return getattr(self.stream, "name", None)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        size = memoryview(data).nbytes
+        self.stream.write(data)
+        self.bytes_written += size
+        return size
+
+    def flush(self) -> None:
+        super().flush()
+        self.stream.flush()
+
+
+class MultiStreamWriter(io.BufferedIOBase):
+    """
+    Write-only binary stream that writes everything written
+    to it to each of several underlying streams.
+
+    Closing this stream closes each of the underlying streams,
+    which for compressed streams writes out any trailing data.
+    """
+
+    def __init__(self, streams: list[Any]):
+        super().__init__()
+        self.streams = streams
+
+    @property
+    def name(self) -> Any:
+        return None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        for stream in self.streams:
+            stream.write(data)
+        return memoryview(data).nbytes
+
+    def flush(self) -> None:
+        super().flush()
+        for stream in self.streams:
+            stream.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        # Flushes everything before marking this stream as closed
+        super().close()
+        for stream in self.streams:
+            stream.close()
+
+
+class ConcurrentFileWriter:
+    """
+    Write a file to S3 or local disk a chunk at a time, with
+    the chunks uploaded to S3 in the background on a thread pool.
+
+    A file that is a single chunk is uploaded with one PutObject request,
+    otherwise each chunk is uploaded as a part of a multipart upload, so every
+    chunk except the last must be at least S3_MIN_PART_SIZE_BYTES.
+
+    Writes don't wait for the upload, call result() once the file is
+    closed to wait for it to finish. If a semaphore is passed in, each
+    write holds it until its chunk is uploaded, which bounds how many
+    chunks are waiting in memory across every writer sharing it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        executor: concurrent.futures.Executor,
+        semaphore: threading.Semaphore | None = None,
+    ):
+        self.path = path
+        self.executor = executor
+        self.semaphore = semaphore
+        self.bytes_written = 0
+
+        self.is_s3 = is_s3_path(path)
+        self._local_file: BinaryIO | None = None
+        if self.is_s3:
+            self._bucket, self._key = split_s3_url(path)
+            self._s3_client = get_cached_s3_client()
+
+        # The first chunk is held until we know whether a multipart upload is needed
+        self._first_chunk: bytes | None = None
+        self._upload_id: str | None = None
+        self._futures: list[concurrent.futures.Future] = []
+
+    def write(self, data: bytes) -> None:
+        self.bytes_written += len(data)
+
+        if not self.is_s3:
+            self._get_local_file().write(data)
+            return
+
+        if self._upload_id is None:
+            if self._first_chunk is None:
+                self._first_chunk = data
+                return
+
+            self._upload_id = self._s3_client.create_multipart_upload(
+                Bucket=self._bucket, Key=self._key
+            )["UploadId"]
+            self._submit(self._upload_part, 1, self._first_chunk)
+            self._first_chunk = None
+
+        self._submit(self._upload_part, len(self._futures) + 1, data)
+
+    def close(self) -> None:
+        """Finish writing the file, the upload may still be in progress"""
+        if not self.is_s3:
+            self._get_local_file().close()
+        elif self._upload_id is None:
+            self._submit(self._put_object, self._first_chunk or b"")
+            self._first_chunk = None
+
+    def result(self) -> int:
+        """Wait for the upload to finish, returning the number of bytes written"""
+        concurrent.futures.wait(self._futures)
+
+        try:
+            parts = [future.result() for future in self._futures]
+
+            if self._upload_id is not None:
+                self._s3_client.complete_multipart_upload(
+                    Bucket=self._bucket,
+                    Key=self._key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except Exception:
+            # Don't leave the parts of a failed multipart upload in the bucket
+            if self._upload_id is not None:
+                self._s3_client.abort_multipart_upload(
+                    Bucket=self._bucket, Key=self._key, UploadId=self._upload_id
+                )
+            raise
+
+        return self.bytes_written
+
+    def _get_local_file(self) -> BinaryIO:
+        if self._local_file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._local_file = open(self.path, "wb")
+
+        return self._local_file
+
+    def _submit(self, fn: Any, *args: Any) -> None:
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            if self.semaphore is not None:
+                self.semaphore.release()
+            raise
+
+        if self.semaphore is not None:
+            future.add_done_callback(lambda _: self.semaphore.release())  # type: ignore[union-attr]
+
+        self._futures.append(future)
+
+    def _upload_part(self, part_number: int, data: bytes) -> dict:
+        response = self._s3_client.upload_part(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _put_object(self, data: bytes) -> None:
+        self._s3_client.put_object(Bucket=self._bucket, Key=self._key, Body=data)
+
+
 def read_file(path: str | Path, mode: str = "r", encoding: str | None = None) -> str:
     """Simple function for just getting all of the contents of a file"""
     with open_stream(path, mode, encoding) as input_file:
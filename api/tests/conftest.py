@@ -16,7 +16,7 @@ import src.app as app_entry
 import src.auth.login_gov_jwt_auth as login_gov_jwt_auth
 import tests.src.db.models.factories as factories
 from src.adapters import search
-from src.adapters.aws import S3Config
+from src.adapters.aws import S3Config, reset_s3_client_cache
 from src.adapters.oauth.login_gov.mock_login_gov_oauth_client import MockLoginGovOauthClient
 from src.auth.api_jwt_auth import create_jwt_for_user
 from src.constants.schema import Schemas
@@ -25,6 +25,7 @@ from src.db.models.foreign import metadata as foreign_metadata
 from src.db.models.lookup.sync_lookup_values import sync_lookup_values
 from src.db.models.opportunity_models import Opportunity
 from src.db.models.staging import metadata as staging_metadata
+from src.util import file_util
 from src.util.local import load_local_env_vars
 from tests.lib import db_testing
 from tests.lib.auth_test_utils import mock_oauth_endpoint
@@ -351,8 +352,14 @@ def reset_aws_env_vars(monkeypatch):
 @pytest.fixture
 def mock_s3(reset_aws_env_vars):
     # https://docs.getmoto.org/en/stable/docs/configuration/index.html#whitelist-services
+    # Clients and presigned URLs are cached for the process, clear them
+    # so nothing made against another endpoint is reused while mocking
+    reset_s3_client_cache()
+    file_util.presigned_url_cache.clear()
     with moto.mock_aws(config={"core": {"service_whitelist": ["s3"]}}):
         yield boto3.resource("s3")
+    reset_s3_client_cache()
+    file_util.presigned_url_cache.clear()
 
 
 @pytest.fixture
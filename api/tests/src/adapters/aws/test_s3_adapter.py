@@ -0,0 +1,53 @@
+import os
+
+from src.adapters.aws.s3_adapter import (
+    get_cached_s3_client,
+    reset_s3_client_cache,
+    s3_client_cache_stats,
+)
+
+
+def test_get_cached_s3_client(mock_s3_bucket, s3_config):
+    s3_client = get_cached_s3_client()
+    assert s3_client_cache_stats.constructions == 1
+    assert s3_client_cache_stats.hits == 0
+
+    # The same client is reused, both for the default config and one with the same endpoint
+    assert get_cached_s3_client() is s3_client
+    assert get_cached_s3_client(s3_config) is s3_client
+    assert s3_client_cache_stats.constructions == 1
+    assert s3_client_cache_stats.hits == 2
+
+    # A client with a bigger pool is a separate client
+    pooled_client = get_cached_s3_client(max_pool_connections=100)
+    assert pooled_client is not s3_client
+    assert pooled_client.meta.config.max_pool_connections == 100
+    assert s3_client_cache_stats.constructions == 2
+
+    # The cached client works like any other
+    s3_client.put_object(Bucket=mock_s3_bucket, Key="test.txt", Body=b"hello")
+    assert pooled_client.head_object(Bucket=mock_s3_bucket, Key="test.txt")["ContentLength"] == 5
+
+    reset_s3_client_cache()
+    assert get_cached_s3_client() is not s3_client
+    assert s3_client_cache_stats.constructions == 1
+
+
+def test_get_cached_s3_client_after_fork(mock_s3):
+    s3_client = get_cached_s3_client()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The child shouldn't reuse the client of its parent
+        is_reused = get_cached_s3_client() is s3_client
+        os.write(write_fd, b"1" if is_reused else b"0")
+        os._exit(0)
+
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"0"
+    os.close(read_fd)
+
+    # The parent still has its cache
+    assert get_cached_s3_client() is s3_client
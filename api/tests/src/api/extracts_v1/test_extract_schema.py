@@ -64,6 +64,7 @@ def test_response_schema_single(sample_extract_metadata):
     assert extract_metadata["extract_type"] == "opportunities_csv"
     assert extract_metadata["download_path"] == "http://www.example.com"
     assert extract_metadata["file_size_bytes"] == 2048
+    assert extract_metadata["base_extract_metadata_id"] is None
 
 
 def test_response_schema_list(sample_extract_metadata):
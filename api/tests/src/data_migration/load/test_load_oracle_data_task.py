@@ -3,6 +3,7 @@
 #
 
 import datetime
+import uuid
 
 import freezegun
 import pytest
@@ -11,6 +12,8 @@ import sqlalchemy
 import src.db.models.foreign
 import src.db.models.staging
 from src.data_migration.load import load_oracle_data_task
+from src.db.models.task_models import LegacyLoadWatermark
+from src.task.checkpoint import PipelineCheckpoints
 from tests.conftest import BaseTestClass
 from tests.src.db.models.factories import ForeignTopportunityFactory, StagingTopportunityFactory
 
@@ -58,7 +61,10 @@ class TestLoadOracleData(BaseTestClass):
     def staging_tables(self):
         return {t.name: t for t in src.db.models.staging.metadata.tables.values()}
 
-    def test_load_data(self, db_session, foreign_tables, staging_tables, enable_factory_create):
+    @pytest.mark.parametrize("bulk_transfer", [False, True])
+    def test_load_data(
+        self, db_session, foreign_tables, staging_tables, enable_factory_create, bulk_transfer
+    ):
         time1 = datetime.datetime(2024, 1, 20, 7, 15, 0)
         time2 = datetime.datetime(2024, 1, 20, 7, 15, 1)
         time3 = datetime.datetime(2024, 4, 10, 22, 0, 1)
@@ -107,7 +113,11 @@ class TestLoadOracleData(BaseTestClass):
         )
 
         task = load_oracle_data_task.LoadOracleDataTask(
-            db_session, foreign_tables, staging_tables, ["topportunity"]
+            db_session,
+            foreign_tables,
+            staging_tables,
+            ["topportunity"],
+            bulk_transfer=bulk_transfer,
         )
         task.run()
 
@@ -181,3 +191,191 @@ class TestLoadOracleData(BaseTestClass):
         assert task.metrics["count.delete.total"] == 0
         assert task.metrics["count.insert.total"] == 100
         assert task.metrics["count.update.total"] == 0
+
+    def test_mark_deleted_chunked(
+        self, db_session, foreign_tables, staging_tables, enable_factory_create
+    ):
+        time1 = datetime.datetime(2024, 1, 20, 7, 15, 0)
+
+        source_table = foreign_tables["topportunity"]
+        destination_table = staging_tables["topportunity"]
+
+        db_session.execute(sqlalchemy.delete(source_table))
+        db_session.execute(sqlalchemy.delete(destination_table))
+
+        for opportunity_id in range(1, 11):
+            StagingTopportunityFactory.create(
+                opportunity_id=opportunity_id, cfdas=[], last_upd_date=time1
+            )
+            # Every third row has been deleted from the source table
+            if opportunity_id % 3 != 0:
+                ForeignTopportunityFactory.create(
+                    opportunity_id=opportunity_id, cfdas=[], last_upd_date=time1
+                )
+
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session, foreign_tables, staging_tables, ["topportunity"], delete_chunk_size=4
+        )
+        task.run()
+
+        deleted_ids = db_session.scalars(
+            sqlalchemy.select(destination_table.c.opportunity_id).where(
+                destination_table.c.is_deleted.is_(True)
+            )
+        )
+        assert set(deleted_ids) == {3, 6, 9}
+
+        assert task.metrics["count.delete.topportunity"] == 3
+        assert task.metrics["count.delete.chunk.topportunity"] == "1,1,1"
+        assert task.metrics["count.delete.checked.topportunity"] == 10
+        assert task.metrics["count.insert.topportunity"] == 0
+
+    def test_load_data_concurrently(
+        self, db_session, foreign_tables, staging_tables, enable_factory_create
+    ):
+        time1 = datetime.datetime(2024, 1, 20, 7, 15, 0)
+
+        source_table = foreign_tables["topportunity"]
+        destination_table = staging_tables["topportunity"]
+
+        db_session.execute(sqlalchemy.delete(source_table))
+        db_session.execute(sqlalchemy.delete(destination_table))
+        db_session.execute(sqlalchemy.delete(staging_tables["tsynopsis_hist"]))
+
+        source_records = ForeignTopportunityFactory.create_batch(
+            size=20, last_upd_date=time1, cfdas=[]
+        )
+
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session,
+            foreign_tables,
+            staging_tables,
+            ["topportunity", "tsynopsis_hist"],
+            max_workers=2,
+        )
+        task.run()
+
+        assert set(
+            db_session.scalars(sqlalchemy.select(destination_table.c.opportunity_id))
+        ) == set([record.opportunity_id for record in source_records])
+
+        assert task.metrics["count.insert.topportunity"] == 20
+        assert task.metrics["count.insert.tsynopsis_hist"] == 0
+        assert task.metrics["count.insert.total"] == 20
+        assert "time.load.topportunity" in task.metrics
+        assert "time.load.tsynopsis_hist" in task.metrics
+
+    def test_load_data_incremental(
+        self, db_session, foreign_tables, staging_tables, enable_factory_create
+    ):
+        time1 = datetime.datetime(2024, 1, 20, 7, 15, 0)
+        time2 = datetime.datetime(2024, 3, 1, 12, 0, 0)
+        old_time = datetime.datetime(2023, 6, 1, 9, 0, 0)
+
+        source_table = foreign_tables["topportunity"]
+        destination_table = staging_tables["topportunity"]
+
+        db_session.execute(sqlalchemy.delete(source_table))
+        db_session.execute(sqlalchemy.delete(destination_table))
+        db_session.execute(sqlalchemy.delete(LegacyLoadWatermark))
+
+        ForeignTopportunityFactory.create_batch(
+            size=5, last_upd_date=time1, created_date=time1, cfdas=[]
+        )
+
+        # Without a watermark, the first incremental load is a full load
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session, foreign_tables, staging_tables, ["topportunity"], is_incremental=True
+        )
+        task.run()
+
+        assert task.metrics["is_incremental.topportunity"] is False
+        assert task.metrics["count.insert.topportunity"] == 5
+        watermark = db_session.get(LegacyLoadWatermark, "topportunity")
+        assert watermark.watermark == time1
+        assert watermark.last_full_load_at is not None
+
+        # A row changed after the watermark is picked up, but a row that appears
+        # with older dates, or one that's deleted, waits for the next full load
+        ForeignTopportunityFactory.create(last_upd_date=time2, created_date=time2, cfdas=[])
+        ForeignTopportunityFactory.create(last_upd_date=old_time, created_date=old_time, cfdas=[])
+        db_session.execute(
+            sqlalchemy.delete(source_table).where(source_table.c.last_upd_date == time1)
+        )
+        db_session.commit()
+
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session, foreign_tables, staging_tables, ["topportunity"], is_incremental=True
+        )
+        task.run()
+
+        assert task.metrics["is_incremental.topportunity"] is True
+        assert task.metrics["count.insert.topportunity"] == 1
+        assert "count.delete.topportunity" not in task.metrics
+        assert db_session.query(destination_table).count() == 6
+        db_session.expire_all()
+        assert db_session.get(LegacyLoadWatermark, "topportunity").watermark == time2
+
+        # Once a full load is due, the table is fully compared again
+        watermark = db_session.get(LegacyLoadWatermark, "topportunity")
+        watermark.last_full_load_at = watermark.last_full_load_at - datetime.timedelta(days=2)
+        db_session.commit()
+
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session, foreign_tables, staging_tables, ["topportunity"], is_incremental=True
+        )
+        task.run()
+
+        assert task.metrics["is_incremental.topportunity"] is False
+        assert task.metrics["count.insert.topportunity"] == 1
+        assert task.metrics["count.delete.topportunity"] == 5
+
+    def test_load_data_resumed(
+        self, db_session, foreign_tables, staging_tables, enable_factory_create
+    ):
+        source_table = foreign_tables["topportunity"]
+        destination_table = staging_tables["topportunity"]
+
+        db_session.execute(sqlalchemy.delete(source_table))
+        db_session.execute(sqlalchemy.delete(destination_table))
+        ForeignTopportunityFactory.create_batch(size=3, cfdas=[])
+
+        pipeline = f"test-load-{uuid.uuid4()}"
+        checkpoints = PipelineCheckpoints(db_session, pipeline)
+        checkpoints.mark_complete(db_session, "LoadOracleDataTask", "topportunity_cfda")
+
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session,
+            foreign_tables,
+            staging_tables,
+            ["topportunity", "topportunity_cfda"],
+            checkpoints=PipelineCheckpoints(db_session, pipeline, resume=True),
+        )
+        task.run()
+
+        # The table completed by the previous run is skipped, and the other is loaded
+        assert task.metrics["count.skipped_tables"] == 1
+        assert "count.insert.topportunity_cfda" not in task.metrics
+        assert task.metrics["count.insert.topportunity"] == 3
+
+        # Both are now complete for a further resumed run
+        resumed = PipelineCheckpoints(db_session, pipeline, resume=True)
+        assert resumed.is_complete("LoadOracleDataTask", "topportunity") is True
+        assert resumed.is_complete("LoadOracleDataTask", "topportunity_cfda") is True
+
+    def test_get_table_load_order(self, db_session, foreign_tables, staging_tables):
+        task = load_oracle_data_task.LoadOracleDataTask(
+            db_session,
+            foreign_tables,
+            staging_tables,
+            ["topportunity", "tsynopsis", "tsynopsis_hist", "tforecast_hist"],
+            max_workers=2,
+        )
+
+        table_names = task.get_table_load_order()
+        assert set(table_names[:2]) == {"tsynopsis_hist", "tforecast_hist"}
+        assert set(table_names[2:]) == {"topportunity", "tsynopsis"}
+
+        # Loading serially doesn't change the order
+        task.max_workers = 1
+        assert task.get_table_load_order() == list(task.foreign_tables)
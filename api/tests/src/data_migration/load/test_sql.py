@@ -2,6 +2,8 @@
 # Unit tests for src.data_migration.load.sql.
 #
 
+import datetime
+
 import pytest
 import sqlalchemy
 
@@ -66,6 +68,48 @@ def test_build_select_updated_rows_sql(source_table, destination_table):
     )
 
 
+def test_build_select_new_rows_sql_changed_since(source_table, destination_table):
+    select = sql.build_select_new_rows_sql(
+        source_table, destination_table, datetime.datetime(2024, 1, 1)
+    )
+    assert str(select) == (
+        "SELECT test_source_table.id1, test_source_table.id2 \n"
+        "FROM test_source_table \n"
+        "WHERE ((test_source_table.id1, test_source_table.id2) "
+        "NOT IN ("
+        "SELECT test_destination_table.id1, test_destination_table.id2 \n"
+        "FROM test_destination_table)) "
+        "AND (test_source_table.last_upd_date > :last_upd_date_1 "
+        "OR test_source_table.created_date > :created_date_1) "
+        "ORDER BY test_source_table.id1, test_source_table.id2"
+    )
+
+
+def test_build_select_updated_rows_sql_changed_since(source_table, destination_table):
+    select = sql.build_select_updated_rows_sql(
+        source_table, destination_table, datetime.datetime(2024, 1, 1)
+    )
+    assert str(select) == (
+        "SELECT test_destination_table.id1, test_destination_table.id2 \n"
+        "FROM test_destination_table "
+        "JOIN test_source_table ON "
+        "(test_destination_table.id1, test_destination_table.id2) = "
+        "(test_source_table.id1, test_source_table.id2) \n"
+        "WHERE coalesce(test_destination_table.last_upd_date, test_destination_table.created_date) < test_source_table.last_upd_date "
+        "AND test_source_table.last_upd_date > :last_upd_date_1 "
+        "ORDER BY test_source_table.id1, test_source_table.id2"
+    )
+
+
+def test_build_select_watermark_sql(destination_table):
+    select = sql.build_select_watermark_sql(destination_table)
+    assert str(select) == (
+        "SELECT max(coalesce(test_destination_table.last_upd_date, "
+        "test_destination_table.created_date)) AS max_1 \n"
+        "FROM test_destination_table"
+    )
+
+
 def test_build_insert_select_sql(source_table, destination_table):
     insert = sql.build_insert_select_sql(source_table, destination_table, [(1, 2), (3, 4), (5, 6)])
     assert str(insert) == (
@@ -90,13 +134,84 @@ def test_build_update_sql(source_table, destination_table):
     )
 
 
-def test_build_mark_deleted_sql(source_table, destination_table):
-    update = sql.build_mark_deleted_sql(source_table, destination_table)
+def test_build_select_changed_rows_sql(source_table, destination_table):
+    select = sql.build_select_changed_rows_sql(source_table, destination_table)
+    assert str(select) == (
+        "SELECT test_source_table.id1, test_source_table.id2, test_source_table.x, "
+        "test_source_table.last_upd_date, test_source_table.created_date \n"
+        "FROM test_source_table LEFT OUTER JOIN test_destination_table ON "
+        "(test_destination_table.id1, test_destination_table.id2) = "
+        "(test_source_table.id1, test_source_table.id2) \n"
+        "WHERE test_destination_table.id1 IS NULL OR "
+        "coalesce(test_destination_table.last_upd_date, test_destination_table.created_date) "
+        "< test_source_table.last_upd_date"
+    )
+
+
+def test_build_update_from_table_sql(source_table, destination_table):
+    transfer_table = sql.build_transfer_table(source_table)
+    update = sql.build_update_from_table_sql(transfer_table, destination_table)
+    assert str(update) == (
+        "UPDATE test_destination_table "
+        "SET id1=test_source_table_transfer.id1, id2=test_source_table_transfer.id2, "
+        "x=test_source_table_transfer.x, last_upd_date=test_source_table_transfer.last_upd_date, "
+        "created_date=test_source_table_transfer.created_date "
+        "FROM test_source_table_transfer "
+        "WHERE (test_destination_table.id1, test_destination_table.id2) = "
+        "(test_source_table_transfer.id1, test_source_table_transfer.id2)"
+    )
+
+
+def test_build_insert_missing_rows_sql(source_table, destination_table):
+    transfer_table = sql.build_transfer_table(source_table)
+    insert = sql.build_insert_missing_rows_sql(transfer_table, destination_table)
+    assert str(insert) == (
+        "INSERT INTO test_destination_table (id1, id2, x, last_upd_date, created_date, is_deleted) "
+        "SELECT test_source_table_transfer.id1, test_source_table_transfer.id2, "
+        "test_source_table_transfer.x, test_source_table_transfer.last_upd_date, "
+        "test_source_table_transfer.created_date, FALSE AS is_deleted \n"
+        "FROM test_source_table_transfer \n"
+        "WHERE NOT (EXISTS (SELECT * \n"
+        "FROM test_destination_table \n"
+        "WHERE (test_destination_table.id1, test_destination_table.id2) = "
+        "(test_source_table_transfer.id1, test_source_table_transfer.id2)))"
+    )
+
+
+def test_build_select_key_range_sql(destination_table):
+    select = sql.build_select_key_range_sql(destination_table, (1, 2), 10)
+    assert str(select) == (
+        "SELECT test_destination_table.id1, test_destination_table.id2 \n"
+        "FROM test_destination_table \n"
+        "WHERE test_destination_table.is_deleted = false "
+        "AND (test_destination_table.id1, test_destination_table.id2) > (:param_1, :param_2) "
+        "ORDER BY test_destination_table.id1, test_destination_table.id2\n"
+        " LIMIT :param_3"
+    )
+
+
+def test_build_insert_keys_in_range_sql(source_table):
+    key_table = sql.build_key_table(source_table)
+    insert = sql.build_insert_keys_in_range_sql(source_table, key_table, (1, 2), (5, 6))
+    assert str(insert) == (
+        "INSERT INTO test_source_table_keys (id1, id2) "
+        "SELECT test_source_table.id1, test_source_table.id2 \n"
+        "FROM test_source_table \n"
+        "WHERE test_source_table.id1 >= :id1_1 AND test_source_table.id1 <= :id1_2"
+    )
+
+
+def test_build_mark_deleted_in_range_sql(source_table, destination_table):
+    key_table = sql.build_key_table(source_table)
+    update = sql.build_mark_deleted_in_range_sql(key_table, destination_table, (1, 2), (5, 6))
     assert str(update) == (
         "UPDATE test_destination_table "
         "SET is_deleted=:is_deleted "
         "WHERE test_destination_table.is_deleted = false "
-        "AND ((test_destination_table.id1, test_destination_table.id2) "
-        "NOT IN (SELECT test_source_table.id1, test_source_table.id2 \n"
-        "FROM test_source_table))"
+        "AND (test_destination_table.id1, test_destination_table.id2) >= (:param_1, :param_2) "
+        "AND (test_destination_table.id1, test_destination_table.id2) <= (:param_3, :param_4) "
+        "AND NOT (EXISTS (SELECT * \n"
+        "FROM test_source_table_keys \n"
+        "WHERE (test_destination_table.id1, test_destination_table.id2) = "
+        "(test_source_table_keys.id1, test_source_table_keys.id2)))"
     )
@@ -1,6 +1,9 @@
+from datetime import datetime
+
 import pytest
 
 import src.data_migration.transformation.transform_constants as transform_constants
+import src.data_migration.transformation.transform_util as transform_util
 import tests.src.db.models.factories as f
 from src.constants.lookup_constants import ApplicantType
 from src.data_migration.transformation.subtask.transform_applicant_type import (
@@ -18,7 +21,14 @@ class TestTransformApplicantType(BaseTransformTestClass):
     def transform_applicant_type(self, transform_oracle_data_task):
         return TransformApplicantType(transform_oracle_data_task)
 
-    def test_process_applicant_types(self, db_session, transform_applicant_type):
+    # The set-based SQL engine is cross-checked against the ORM
+    # by processing the same scenarios and expecting the same results
+    @pytest.mark.parametrize("use_sql_engine", [False, True])
+    def test_process_applicant_types(self, db_session, transform_oracle_data_task, use_sql_engine):
+        transform_applicant_type = TransformApplicantType(
+            transform_oracle_data_task, use_sql_engine=use_sql_engine
+        )
+
         # Forecast scenarios
         opportunity_summary_forecast = f.OpportunitySummaryFactory.create(
             is_forecast=True, revision_number=None, no_link_values=True
@@ -187,6 +197,65 @@ class TestTransformApplicantType(BaseTransformTestClass):
         assert transform_constants.Metrics.TOTAL_ERROR_COUNT not in metrics
         assert metrics[transform_constants.Metrics.TOTAL_DELETE_ORPHANS_SKIPPED] == 1
 
+    def test_process_applicant_types_sql_engine_errors_and_duplicates(
+        self, db_session, transform_oracle_data_task
+    ):
+        transform_applicant_type = TransformApplicantType(
+            transform_oracle_data_task, use_sql_engine=True
+        )
+
+        opportunity_summary = f.OpportunitySummaryFactory.create(
+            is_forecast=False, revision_number=None, no_link_values=True
+        )
+        insert = setup_applicant_type(
+            create_existing=False,
+            opportunity_summary=opportunity_summary,
+            legacy_lookup_value="00",
+            source_values={
+                "created_date": datetime(2020, 3, 1, 12, 0, 0),
+                "last_upd_date": datetime(2024, 7, 4, 23, 30, 0),
+            },
+        )
+        # Same lookup value as the above, but a different legacy ID
+        duplicate = setup_applicant_type(
+            create_existing=False,
+            opportunity_summary=opportunity_summary,
+            legacy_lookup_value="00",
+        )
+        invalid_lookup_value = setup_applicant_type(
+            create_existing=False,
+            opportunity_summary=opportunity_summary,
+            legacy_lookup_value="xx",
+        )
+        no_opportunity_summary = f.StagingTapplicanttypesSynopsisFactory.create(
+            orphaned_record=True
+        )
+
+        transform_applicant_type.run_subtask()
+
+        # Only one of the duplicates gets inserted, the one with the lowest legacy ID
+        validate_applicant_type(
+            db_session, insert, expected_applicant_type=ApplicantType.STATE_GOVERNMENTS
+        )
+        validate_applicant_type(db_session, duplicate, expect_in_db=False)
+
+        # The timestamps are converted from US Eastern the same as the ORM does
+        link = opportunity_summary.link_applicant_types[0]
+        assert link.created_at == transform_util.convert_est_timestamp_to_utc(insert.created_date)
+        assert link.updated_at == transform_util.convert_est_timestamp_to_utc(insert.last_upd_date)
+
+        # Errored records are left to be picked up again next run
+        validate_applicant_type(
+            db_session, invalid_lookup_value, expect_in_db=False, was_processed=False
+        )
+        assert no_opportunity_summary.transformed_at is None
+
+        metrics = transform_applicant_type.metrics
+        assert metrics[transform_constants.Metrics.TOTAL_RECORDS_PROCESSED] == 4
+        assert metrics[transform_constants.Metrics.TOTAL_RECORDS_INSERTED] == 1
+        assert metrics[transform_constants.Metrics.TOTAL_DUPLICATE_RECORDS_SKIPPED] == 1
+        assert metrics[transform_constants.Metrics.TOTAL_ERROR_COUNT] == 2
+
     @pytest.mark.parametrize("is_forecast", [True, False])
     def test_process_applicant_type_but_no_opportunity_summary_non_hist(
         self,
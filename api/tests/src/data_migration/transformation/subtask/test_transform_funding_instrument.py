@@ -18,7 +18,16 @@ class TestTransformFundingInstrument(BaseTransformTestClass):
     def transform_funding_instrument(self, transform_oracle_data_task):
         return TransformFundingInstrument(transform_oracle_data_task)
 
-    def test_process_funding_instruments(self, db_session, transform_funding_instrument):
+    # The set-based SQL engine is cross-checked against the ORM
+    # by processing the same scenarios and expecting the same results
+    @pytest.mark.parametrize("use_sql_engine", [False, True])
+    def test_process_funding_instruments(
+        self, db_session, transform_oracle_data_task, use_sql_engine
+    ):
+        transform_funding_instrument = TransformFundingInstrument(
+            transform_oracle_data_task, use_sql_engine=use_sql_engine
+        )
+
         opportunity_summary_forecast = f.OpportunitySummaryFactory.create(
             is_forecast=True, revision_number=None, no_link_values=True
         )
@@ -2,6 +2,10 @@ import pytest
 
 import src.data_migration.transformation.transform_constants as transform_constants
 from src.data_migration.transformation.subtask.transform_opportunity import TransformOpportunity
+from src.data_migration.transformation.transform_oracle_data_task import (
+    TransformOracleDataTask,
+    TransformOracleDataTaskConfig,
+)
 from src.services.opportunity_attachments import attachment_util
 from src.util import file_util
 from tests.src.data_migration.transformation.conftest import (
@@ -170,3 +174,57 @@ class TestTransformOpportunity(BaseTransformTestClass):
         for attachment in attachments:
             assert attachment.file_location.startswith(s3_config.public_files_bucket_path) is True
             assert file_util.file_exists(attachment.file_location) is True
+
+
+class TestTransformOpportunityInBulk(TestTransformOpportunity):
+    # Rerun the above tests, upserting the opportunities in chunks. The chunk
+    # with the failing record falls back to processing them one at a time,
+    # so everything should behave the same as processing row by row.
+    @pytest.fixture()
+    def transform_opportunity(self, transform_oracle_data_task, truncate_staging_tables, s3_config):
+        return TransformOpportunity(transform_oracle_data_task, s3_config, bulk_upsert_chunk_size=3)
+
+
+class TestTransformOpportunityInCommitBatches(TestTransformOpportunity):
+    # Rerun the above tests, fetching and committing the opportunities in batches
+    # smaller than the number of records, which should behave the same as a single batch
+    @pytest.fixture()
+    def transform_oracle_data_task(
+        self, db_session, enable_factory_create, truncate_opportunities
+    ) -> TransformOracleDataTask:
+        return TransformOracleDataTask(
+            db_session, transform_config=TransformOracleDataTaskConfig(commit_batch_size=2)
+        )
+
+
+class TestTransformOpportunityCommitBatchMetrics(BaseTransformTestClass):
+    @pytest.fixture()
+    def transform_opportunity(
+        self,
+        db_session,
+        enable_factory_create,
+        truncate_opportunities,
+        truncate_staging_tables,
+        s3_config,
+    ):
+        transform_oracle_data_task = TransformOracleDataTask(
+            db_session, transform_config=TransformOracleDataTaskConfig(commit_batch_size=2)
+        )
+        return TransformOpportunity(transform_oracle_data_task, s3_config)
+
+    def test_commit_batch_metrics(self, db_session, transform_opportunity):
+        inserts = [setup_opportunity(create_existing=False) for _ in range(5)]
+
+        transform_opportunity.run_subtask()
+
+        for insert in inserts:
+            validate_opportunity(db_session, insert)
+            # The records were removed from the session once their batch was committed
+            assert insert not in db_session
+
+        metrics = transform_opportunity.metrics
+        assert metrics[transform_constants.Metrics.TOTAL_RECORDS_INSERTED] == 5
+        # 2 + 2 + 1 records, each batch was full until the last
+        assert metrics["TransformOpportunity_commit_batch_count"] == 3
+        assert metrics["TransformOpportunity_rows_per_sec"] > 0
+        assert metrics["TransformOpportunity_peak_rss_mb"] > 0
@@ -127,6 +127,13 @@ class TestTransformOpportunitySummary(BaseTransformTestClass):
         assert metrics[transform_constants.Metrics.TOTAL_RECORDS_UPDATED] == 4
         assert metrics[transform_constants.Metrics.TOTAL_DELETE_ORPHANS_SKIPPED] == 1
 
+        # Every inserted/updated file was uploaded
+        assert metrics[transform_constants.Metrics.TOTAL_BYTES_UPLOADED] == sum(
+            len(record.file_lob)
+            for record in [insert1, insert2, insert3, insert4, update1, update2, update3, update4]
+        )
+        assert metrics["opportunity_attachment.bytes_uploaded_per_sec"] > 0
+
         db_session.commit()  # commit to end any existing transactions as run_subtask starts a new one
         transform_opportunity_attachment.run_subtask()
         assert metrics[transform_constants.Metrics.TOTAL_RECORDS_PROCESSED] == 12
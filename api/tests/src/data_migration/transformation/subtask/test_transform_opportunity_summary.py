@@ -213,3 +213,12 @@ class TestTransformOpportunitySummary(BaseTransformTestClass):
         validate_opportunity_summary(db_session, source_record, expect_in_db=False)
         assert source_record.transformed_at is not None
         assert source_record.transformation_notes == "orphaned_historical_record"
+
+
+class TestTransformOpportunitySummaryInBulk(TestTransformOpportunitySummary):
+    # Rerun the above tests, upserting the summaries in chunks. The chunk
+    # with the failing record falls back to processing them one at a time,
+    # so everything should behave the same as processing row by row.
+    @pytest.fixture()
+    def transform_opportunity_summary(self, transform_oracle_data_task, truncate_staging_tables):
+        return TransformOpportunitySummary(transform_oracle_data_task, bulk_upsert_chunk_size=3)
@@ -1,8 +1,16 @@
+import time
+
 import pytest
 
 import tests.src.db.models.factories as f
 from src.constants.lookup_constants import ApplicantType, FundingCategory, FundingInstrument
-from src.data_migration.transformation.transform_oracle_data_task import TransformOracleDataTask
+from src.data_migration.transformation.subtask.abstract_transform_subtask import (
+    AbstractTransformSubTask,
+)
+from src.data_migration.transformation.transform_oracle_data_task import (
+    TransformOracleDataTask,
+    TransformOracleDataTaskConfig,
+)
 from src.db.models import staging
 from src.db.models.opportunity_models import Opportunity
 from tests.conftest import BaseTestClass
@@ -560,3 +568,69 @@ class TestTransformFullRunTask(BaseTestClass):
             f"opportunity_summary.{transform_oracle_data_task.Metrics.TOTAL_RECORDS_DELETED}": 1,
             transform_oracle_data_task.Metrics.TOTAL_DELETE_ORPHANS_SKIPPED: 3,
         }.items() <= transform_oracle_data_task.metrics.items()
+
+
+# Records when each of the subtasks below starts and finishes
+subtask_events: list[tuple[str, str]] = []
+
+
+class RecordingSubTask(AbstractTransformSubTask):
+    def transform_records(self) -> None:
+        subtask_events.append(("start", self.cls_name()))
+        time.sleep(0.1)
+        subtask_events.append(("end", self.cls_name()))
+
+
+class SubTaskA(RecordingSubTask):
+    pass
+
+
+class SubTaskB(RecordingSubTask):
+    pass
+
+
+class SubTaskC(RecordingSubTask):
+    depends_on = (SubTaskA,)
+
+
+class TestTransformSubtaskScheduling(BaseTestClass):
+    @pytest.fixture
+    def transform_oracle_data_task(self, db_session) -> TransformOracleDataTask:
+        subtask_events.clear()
+        return TransformOracleDataTask(
+            db_session, transform_config=TransformOracleDataTaskConfig(max_workers=3)
+        )
+
+    def test_run_subtasks_concurrently(self, transform_oracle_data_task):
+        task = transform_oracle_data_task
+        task.run_subtasks_concurrently([SubTaskC(task), SubTaskA(task), SubTaskB(task)])
+
+        # The independent subtasks ran at the same time
+        assert subtask_events.index(("start", "SubTaskB")) < subtask_events.index(
+            ("end", "SubTaskA")
+        )
+        # But a subtask only started once its dependencies were done
+        assert subtask_events.index(("start", "SubTaskC")) > subtask_events.index(
+            ("end", "SubTaskA")
+        )
+
+        for subtask_name in ["SubTaskA", "SubTaskB", "SubTaskC"]:
+            assert f"{subtask_name}_subtask_duration_sec" in task.metrics
+
+    def test_run_subtasks_concurrently_missing_dependency(self, transform_oracle_data_task):
+        # A dependency that isn't being run doesn't hold up the subtasks that depend on it
+        task = transform_oracle_data_task
+        task.run_subtasks_concurrently([SubTaskC(task)])
+
+        assert subtask_events == [("start", "SubTaskC"), ("end", "SubTaskC")]
+
+    def test_run_subtasks_concurrently_circular_dependency(
+        self, transform_oracle_data_task, monkeypatch
+    ):
+        task = transform_oracle_data_task
+        monkeypatch.setattr(SubTaskA, "depends_on", (SubTaskC,))
+
+        with pytest.raises(Exception, match="circular dependencies: SubTaskA, SubTaskC"):
+            task.run_subtasks_concurrently([SubTaskA(task), SubTaskC(task)])
+
+        assert subtask_events == []
@@ -0,0 +1,124 @@
+import csv
+import io
+
+from src.services.opportunities_v1.opportunity_to_csv import (
+    CSV_FIELDS,
+    opportunities_to_csv,
+    opportunity_to_csv_row,
+)
+from src.util.dict_util import flatten_dict
+
+
+def build_opportunity(opportunity_id: int = 1, **summary_fields) -> dict:
+    summary = {
+        "summary_description": 'A "quoted" description, with commas\nand a newline',
+        "is_cost_sharing": True,
+        "post_date": "2025-01-01",
+        "close_date": None,
+        "award_floor": 1000,
+        "funding_instruments": ["grant", "cooperative_agreement"],
+        "funding_categories": ["education"],
+        "applicant_types": [],
+        "is_forecast": False,
+        "fiscal_year": None,
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-02T00:00:00+00:00",
+    }
+    summary.update(summary_fields)
+
+    return {
+        "opportunity_id": opportunity_id,
+        "opportunity_number": f"ABC-{opportunity_id}",
+        "opportunity_title": "Research into 🚀 propulsion",
+        "agency": "US-ABC",
+        "agency_code": "US-ABC",
+        "agency_name": "Agency for Business and Commerce",
+        "top_level_agency_name": "Department of Commerce",
+        "category": "discretionary",
+        "category_explanation": None,
+        "opportunity_assistance_listings": [
+            {"assistance_listing_number": "12.345", "program_title": "Program A"},
+            {"assistance_listing_number": "67.890", "program_title": "Program B"},
+        ],
+        "summary": summary,
+        "opportunity_status": "posted",
+        "created_at": "2025-01-01T00:00:00+00:00",
+        "updated_at": "2025-01-02T00:00:00+00:00",
+    }
+
+
+def flatten_opportunity_to_csv_row(opportunity: dict) -> list:
+    # The original approach of flattening every opportunity
+    # to work out the columns, used to cross-check the output
+    row = {}
+    for k, v in flatten_dict(opportunity).items():
+        k = k.removeprefix("summary.")
+        if k not in CSV_FIELDS:
+            continue
+
+        if k == "opportunity_assistance_listings":
+            v = ";".join(f"{a['assistance_listing_number']}|{a['program_title']}" for a in v)
+        elif k in ["funding_instruments", "funding_categories", "applicant_types"]:
+            v = ";".join(v)
+
+        row[k] = v
+
+    return [row.get(field) for field in CSV_FIELDS]
+
+
+def test_opportunity_to_csv_row():
+    row = dict(zip(CSV_FIELDS, opportunity_to_csv_row(build_opportunity()), strict=True))
+
+    assert row["opportunity_id"] == 1
+    assert row["opportunity_number"] == "ABC-1"
+    assert row["opportunity_status"] == "posted"
+    assert row["award_floor"] == 1000
+    assert row["close_date"] is None
+    assert row["opportunity_assistance_listings"] == "12.345|Program A;67.890|Program B"
+    assert row["funding_instruments"] == "grant;cooperative_agreement"
+    assert row["applicant_types"] == ""
+    # The top-level timestamps are used rather than those of the summary
+    assert row["created_at"] == "2025-01-01T00:00:00+00:00"
+    assert row["updated_at"] == "2025-01-02T00:00:00+00:00"
+    # Fields missing from the opportunity are left empty
+    assert row["archive_date"] is None
+
+
+def test_opportunity_to_csv_row_null_lists():
+    opportunity = build_opportunity(funding_instruments=None)
+    opportunity["opportunity_assistance_listings"] = None
+
+    row = dict(zip(CSV_FIELDS, opportunity_to_csv_row(opportunity), strict=True))
+    assert row["funding_instruments"] is None
+    assert row["opportunity_assistance_listings"] is None
+
+
+def test_opportunity_to_csv_row_matches_flattened():
+    opportunities = [
+        build_opportunity(),
+        build_opportunity(2, funding_instruments=["other"], applicant_types=["state_governments"]),
+        {**build_opportunity(3), "opportunity_assistance_listings": [], "summary": {}},
+    ]
+
+    for opportunity in opportunities:
+        assert opportunity_to_csv_row(opportunity) == flatten_opportunity_to_csv_row(opportunity)
+
+
+def test_opportunities_to_csv():
+    output = io.StringIO()
+    opportunities_to_csv((build_opportunity(i) for i in range(1, 4)), output)
+
+    output.seek(0)
+    rows = list(csv.reader(output))
+    assert rows[0] == CSV_FIELDS
+    assert [row[0] for row in rows[1:]] == ["1", "2", "3"]
+
+    # Every value is quoted, including empty ones
+    lines = output.getvalue().splitlines()
+    assert lines[0].startswith('"opportunity_id","opportunity_number"')
+    assert lines[1].startswith('"1","ABC-1","Research into 🚀 propulsion","posted","US-ABC",')
+
+    record = dict(zip(CSV_FIELDS, rows[1], strict=True))
+    assert record["is_cost_sharing"] == "True"
+    assert record["close_date"] == ""
+    assert record["summary_description"] == 'A "quoted" description, with commas\nand a newline'
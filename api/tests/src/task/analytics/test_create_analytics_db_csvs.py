@@ -1,9 +1,14 @@
 import csv
+import json
 
 import pytest
+from sqlalchemy import select
 
 import src.util.file_util as file_util
+from src.db.models.extract_models import ExtractTombstone
 from src.task.analytics.create_analytics_db_csvs import (
+    EXTRACT_MANIFEST_FILE_NAME_FORMAT,
+    MANIFEST_FILE_NAME,
     CreateAnalyticsDbCsvsConfig,
     CreateAnalyticsDbCsvsTask,
 )
@@ -83,3 +88,161 @@ class TestCreateAnalyticsDbCsvsTask(BaseTestClass):
             [int(record["opportunity_summary_id"]) for record in csv_summaries]
         )
         assert opportunity_summary_ids == csv_opportunity_summary_ids
+
+
+class TestCreateAnalyticsDbCsvsTaskGzip(BaseTestClass):
+
+    @pytest.fixture(scope="class")
+    def opportunities(self, truncate_opportunities, enable_factory_create):
+        return OpportunityFactory.create_batch(size=5)
+
+    @pytest.fixture()
+    def task(self, db_session, mock_s3_bucket, test_api_schema):
+        config = CreateAnalyticsDbCsvsConfig(
+            API_ANALYTICS_DB_EXTRACTS_PATH=f"s3://{mock_s3_bucket}/table-extracts",
+            API_ANALYTICS_DB_SCHEMA=test_api_schema,
+            API_ANALYTICS_DB_EXTRACTS_ENABLE_GZIP=True,
+            API_ANALYTICS_DB_EXTRACTS_MAX_WORKERS=2,
+        )
+        return CreateAnalyticsDbCsvsTask(
+            db_session, ["opportunity", "lk_opportunity_status"], config
+        )
+
+    def test_create_analytics_db_csvs_gzip(self, db_session, task, opportunities):
+        task.run()
+
+        # The file is decompressed based on its extension when read
+        file_path = task.config.file_path + "/opportunity.csv.gz"
+        csv_opps = validate_file(file_path, len(opportunities))
+        assert set([o.opportunity_id for o in opportunities]) == set(
+            [int(record["opportunity_id"]) for record in csv_opps]
+        )
+
+        assert task.metrics[task.Metrics.TABLE_COUNT] == 2
+        assert task.metrics["opportunity.row_count"] == len(opportunities)
+        assert task.metrics["opportunity.file_size_bytes"] == file_util.get_file_length_bytes(
+            file_path
+        )
+        # The compressed file should be smaller than the CSV output from the DB
+        assert (
+            0
+            < task.metrics["opportunity.file_size_bytes"]
+            < task.metrics["opportunity.bytes_extracted"]
+        )
+        assert task.metrics["opportunity.rows_per_sec"] > 0
+
+
+class TestCreateAnalyticsDbCsvsTaskIncremental(BaseTestClass):
+
+    @pytest.fixture(scope="class")
+    def opportunities(self, truncate_opportunities, enable_factory_create):
+        return OpportunityFactory.create_batch(size=5, is_posted_summary=True)
+
+    @pytest.fixture()
+    def config(self, mock_s3_bucket, test_api_schema):
+        return CreateAnalyticsDbCsvsConfig(
+            API_ANALYTICS_DB_EXTRACTS_PATH=f"s3://{mock_s3_bucket}/table-extracts",
+            API_ANALYTICS_DB_SCHEMA=test_api_schema,
+            API_ANALYTICS_DB_EXTRACTS_INCREMENTAL_OVERLAP_MINUTES=0,
+        )
+
+    def test_create_analytics_db_csvs_incremental(self, db_session, config, opportunities):
+        # Without a previous extract, everything is extracted
+        task = CreateAnalyticsDbCsvsTask(db_session, config=config, is_incremental=True)
+        task.run()
+
+        assert task.metrics["is_incremental"] is False
+        validate_file(config.file_path + "/opportunity.csv", len(opportunities))
+
+        manifest = json.loads(file_util.read_file(config.file_path + "/" + MANIFEST_FILE_NAME))
+        assert manifest["is_incremental"] is False
+        assert manifest["base_extract_id"] is None
+        assert manifest["tables"]["opportunity"]["file_name"] == "opportunity.csv"
+        assert manifest["tables"]["opportunity"]["deleted_file_name"] is None
+        assert manifest["tables"]["opportunity"]["watermark"] is not None
+        first_extract_id = manifest["extract_id"]
+
+        updated_opportunity = opportunities[0]
+        updated_opportunity.opportunity_title = "An updated title"
+        deleted_opportunity = opportunities[1]
+        deleted_summary_id = deleted_opportunity.current_opportunity_summary.opportunity_summary_id
+        db_session.delete(deleted_opportunity)
+        # The trigger that records these is only created by the migrations,
+        # which the test schema isn't built from
+        db_session.add_all(
+            [
+                ExtractTombstone(
+                    table_name="opportunity",
+                    primary_key=[str(deleted_opportunity.opportunity_id)],
+                ),
+                ExtractTombstone(
+                    table_name="opportunity_summary", primary_key=[str(deleted_summary_id)]
+                ),
+                ExtractTombstone(
+                    table_name="current_opportunity_summary",
+                    primary_key=[str(deleted_opportunity.opportunity_id), str(deleted_summary_id)],
+                ),
+            ]
+        )
+        db_session.commit()
+
+        task = CreateAnalyticsDbCsvsTask(db_session, config=config, is_incremental=True)
+        task.run()
+        assert task.metrics["is_incremental"] is True
+        extract_id = task.extract_id
+
+        # Only the changed opportunity is extracted, to files named after the extract
+        csv_opps = validate_file(config.file_path + f"/opportunity.changes-{extract_id}.csv", 1)
+        assert int(csv_opps[0]["opportunity_id"]) == updated_opportunity.opportunity_id
+        assert csv_opps[0]["opportunity_title"] == "An updated title"
+        validate_file(config.file_path + f"/opportunity_summary.changes-{extract_id}.csv", 0)
+
+        # The full extract is left alone
+        validate_file(config.file_path + "/opportunity.csv", len(opportunities))
+
+        # And the keys of the deleted rows
+        deleted_opps = validate_file(config.file_path + f"/opportunity.deleted-{extract_id}.csv", 1)
+        assert deleted_opps[0] == {"opportunity_id": str(deleted_opportunity.opportunity_id)}
+        deleted_summaries = validate_file(
+            config.file_path + f"/opportunity_summary.deleted-{extract_id}.csv", 1
+        )
+        assert deleted_summaries[0] == {"opportunity_summary_id": str(deleted_summary_id)}
+        deleted_current_summaries = validate_file(
+            config.file_path + f"/current_opportunity_summary.deleted-{extract_id}.csv", 1
+        )
+        assert deleted_current_summaries[0] == {
+            "opportunity_id": str(deleted_opportunity.opportunity_id),
+            "opportunity_summary_id": str(deleted_summary_id),
+        }
+
+        manifest = json.loads(file_util.read_file(config.file_path + "/" + MANIFEST_FILE_NAME))
+        assert manifest["is_incremental"] is True
+        assert manifest["extract_id"] == extract_id
+        assert manifest["base_extract_id"] == first_extract_id
+        assert manifest["tables"]["opportunity"]["row_count"] == 1
+        assert manifest["tables"]["opportunity"]["deleted_count"] == 1
+        assert (
+            manifest["tables"]["opportunity"]["deleted_file_name"]
+            == f"opportunity.deleted-{extract_id}.csv"
+        )
+        assert manifest["tables"]["lk_opportunity_status"]["row_count"] == 0
+
+        # The extract keeps its own copy of the manifest
+        extract_manifest_path = (
+            config.file_path + "/" + EXTRACT_MANIFEST_FILE_NAME_FORMAT.format(extract_id=extract_id)
+        )
+        assert json.loads(file_util.read_file(extract_manifest_path)) == manifest
+
+        # The tombstones are cleaned up once extracted
+        assert db_session.execute(select(ExtractTombstone)).scalars().all() == []
+
+        # The next incremental extract builds on this one, without overwriting its files
+        task = CreateAnalyticsDbCsvsTask(db_session, config=config, is_incremental=True)
+        task.run()
+
+        manifest = json.loads(file_util.read_file(config.file_path + "/" + MANIFEST_FILE_NAME))
+        assert manifest["base_extract_id"] == extract_id
+        assert manifest["extract_id"] == task.extract_id != extract_id
+        validate_file(config.file_path + f"/opportunity.changes-{extract_id}.csv", 1)
+        validate_file(config.file_path + f"/opportunity.deleted-{extract_id}.csv", 1)
+        validate_file(config.file_path + f"/opportunity.deleted-{task.extract_id}.csv", 0)
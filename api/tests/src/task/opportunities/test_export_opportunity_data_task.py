@@ -1,18 +1,22 @@
 import csv
+import io
 import json
 
+import pyarrow.parquet as pq
 import pytest
 
 import src.util.file_util as file_util
 from src.api.opportunities_v1.opportunity_schemas import OpportunityV1Schema
 from src.constants.lookup_constants import ExtractType
 from src.db.models.extract_models import ExtractMetadata
+from src.services.opportunities_v1.opportunity_to_parquet import PARQUET_SCHEMA
 from src.task.opportunities.export_opportunity_data_task import (
     ExportOpportunityDataConfig,
     ExportOpportunityDataTask,
+    get_id_manifest_path,
 )
 from tests.conftest import BaseTestClass
-from tests.src.db.models.factories import OpportunityFactory
+from tests.src.db.models.factories import OpportunityChangeAuditFactory, OpportunityFactory
 
 
 class TestExportOpportunityDataTask(BaseTestClass):
@@ -94,7 +98,9 @@ class TestExportOpportunityDataTask(BaseTestClass):
         assert json_metadata.file_name.endswith(".json")
         assert json_metadata.file_name.startswith("opportunity_data-")
         assert json_metadata.file_path == export_opportunity_data_task.json_file
-        assert json_metadata.file_size_bytes > 0
+        assert json_metadata.file_size_bytes == file_util.get_file_length_bytes(
+            export_opportunity_data_task.json_file
+        )
 
         # Verify CSV metadata
         csv_metadata = next(
@@ -103,4 +109,186 @@ class TestExportOpportunityDataTask(BaseTestClass):
         assert csv_metadata.file_name.endswith(".csv")
         assert csv_metadata.file_name.startswith("opportunity_data-")
         assert csv_metadata.file_path == export_opportunity_data_task.csv_file
-        assert csv_metadata.file_size_bytes > 0
+        assert csv_metadata.file_size_bytes == file_util.get_file_length_bytes(
+            export_opportunity_data_task.csv_file
+        )
+
+
+class TestExportOpportunityDataTaskNoOpportunities(BaseTestClass):
+    def test_export_opportunity_data_task_no_opportunities(
+        self,
+        db_session,
+        truncate_opportunities,
+        enable_factory_create,
+        mock_s3_bucket,
+    ):
+        config = ExportOpportunityDataConfig(
+            PUBLIC_FILES_OPPORTUNITY_DATA_EXTRACTS_PATH=f"s3://{mock_s3_bucket}/"
+        )
+        export_opportunity_data_task = ExportOpportunityDataTask(db_session, config)
+
+        # Opportunities that won't get exported
+        OpportunityFactory.create_batch(size=2, is_draft=True)
+
+        export_opportunity_data_task.run()
+
+        assert (
+            export_opportunity_data_task.metrics[
+                export_opportunity_data_task.Metrics.RECORDS_EXPORTED
+            ]
+            == 0
+        )
+
+        with file_util.open_stream(export_opportunity_data_task.json_file, "r") as infile:
+            json_data = json.load(infile)
+            assert json_data["opportunities"] == []
+            assert (
+                json_data["metadata"]["file_generated_at"]
+                == export_opportunity_data_task.current_timestamp
+            )
+
+        with file_util.open_stream(export_opportunity_data_task.csv_file, "r") as infile:
+            reader = csv.DictReader(infile)
+            assert list(reader) == []
+
+
+class TestExportOpportunityDataTaskAllFormats(BaseTestClass):
+    def test_export_opportunity_data_task_all_formats(
+        self,
+        db_session,
+        truncate_opportunities,
+        enable_factory_create,
+        mock_s3_bucket,
+    ):
+        db_session.query(ExtractMetadata).delete()
+        db_session.commit()
+
+        opportunities = OpportunityFactory.create_batch(size=7, is_posted_summary=True)
+        expected_opportunity_ids = set([opp.opportunity_id for opp in opportunities])
+
+        config = ExportOpportunityDataConfig(
+            PUBLIC_FILES_OPPORTUNITY_DATA_EXTRACTS_PATH=f"s3://{mock_s3_bucket}/",
+            EXPORT_OPPORTUNITY_DATA_ENABLE_GZIP=True,
+            EXPORT_OPPORTUNITY_DATA_ENABLE_ZSTD=True,
+            EXPORT_OPPORTUNITY_DATA_ENABLE_PARQUET=True,
+            EXPORT_OPPORTUNITY_DATA_PARQUET_ROW_GROUP_SIZE=3,
+        )
+        task = ExportOpportunityDataTask(db_session, config)
+        task.run()
+
+        metadata_entries = db_session.query(ExtractMetadata).all()
+        assert set([m.extract_type for m in metadata_entries]) == set(ExtractType) - {
+            ExtractType.OPPORTUNITIES_DELTA_JSON
+        }
+
+        for metadata in metadata_entries:
+            # Sizes are of the file as stored, after any compression
+            assert metadata.file_size_bytes == file_util.get_file_length_bytes(metadata.file_path)
+
+        # The compressed files decompress to the exact same content as the plain files
+        plain_json = file_util.read_file(task.json_file)
+        plain_csv = file_util.read_file(task.csv_file)
+        for extract in task.json_extracts:
+            assert file_util.read_file(extract.file_path) == plain_json
+        for extract in task.csv_extracts:
+            assert file_util.read_file(extract.file_path) == plain_csv
+
+        # Parquet file is typed and split into row groups
+        assert task.parquet_extract is not None
+        parquet_file = pq.ParquetFile(
+            io.BytesIO(file_util.read_file(task.parquet_extract.file_path, "rb"))
+        )
+        assert parquet_file.metadata.num_row_groups == 3
+        assert parquet_file.schema_arrow == PARQUET_SCHEMA
+
+        table = parquet_file.read()
+        assert set(table.column("opportunity_id").to_pylist()) == expected_opportunity_ids
+
+
+class TestExportOpportunityDataTaskDelta(BaseTestClass):
+    def test_export_opportunity_data_task_delta(
+        self,
+        db_session,
+        truncate_opportunities,
+        enable_factory_create,
+        mock_s3_bucket,
+    ):
+        db_session.query(ExtractMetadata).delete()
+        db_session.commit()
+
+        config = ExportOpportunityDataConfig(
+            PUBLIC_FILES_OPPORTUNITY_DATA_EXTRACTS_PATH=f"s3://{mock_s3_bucket}/"
+        )
+
+        unchanged_opportunities = OpportunityFactory.create_batch(size=3, is_posted_summary=True)
+        updated_opportunity = OpportunityFactory.create(is_posted_summary=True)
+        deleted_opportunity = OpportunityFactory.create(is_posted_summary=True)
+        unpublished_opportunity = OpportunityFactory.create(is_posted_summary=True)
+        deleted_opportunity_id = deleted_opportunity.opportunity_id
+
+        # Without a previous extract to build on, a full extract is made instead
+        first_task = ExportOpportunityDataTask(db_session, config, is_delta=True)
+        first_task.run()
+
+        full_metadata = (
+            db_session.query(ExtractMetadata)
+            .filter(ExtractMetadata.extract_type == ExtractType.OPPORTUNITIES_JSON)
+            .one()
+        )
+        assert file_util.file_exists(get_id_manifest_path(full_metadata.file_path))
+        assert (
+            db_session.query(ExtractMetadata)
+            .filter(ExtractMetadata.extract_type == ExtractType.OPPORTUNITIES_DELTA_JSON)
+            .count()
+            == 0
+        )
+
+        # Make some changes after the full extract
+        OpportunityChangeAuditFactory.create(opportunity=updated_opportunity)
+        unpublished_opportunity.is_draft = True
+        OpportunityChangeAuditFactory.create(opportunity=unpublished_opportunity)
+        db_session.delete(deleted_opportunity)
+        new_opportunity = OpportunityFactory.create(is_posted_summary=True)
+        # Drafts don't get exported even if they're new
+        OpportunityFactory.create(is_draft=True)
+        db_session.commit()
+
+        delta_task = ExportOpportunityDataTask(db_session, config, is_delta=True)
+        delta_task.run()
+
+        assert delta_task.metrics[delta_task.Metrics.RECORDS_EXPORTED] == 2
+        assert delta_task.metrics[delta_task.Metrics.RECORDS_DELETED] == 2
+
+        delta_metadata = (
+            db_session.query(ExtractMetadata)
+            .filter(ExtractMetadata.extract_type == ExtractType.OPPORTUNITIES_DELTA_JSON)
+            .one()
+        )
+        assert delta_metadata.file_path == delta_task.delta_extract.file_path
+        assert delta_metadata.file_name.startswith("opportunity_data_delta-")
+        assert delta_metadata.base_extract_metadata_id == full_metadata.extract_metadata_id
+        assert delta_metadata.file_size_bytes == file_util.get_file_length_bytes(
+            delta_metadata.file_path
+        )
+
+        with file_util.open_stream(delta_metadata.file_path, "r") as infile:
+            delta_data = json.load(infile)
+
+        assert delta_data["metadata"]["base_extract_file_name"] == full_metadata.file_name
+        assert delta_data["metadata"]["previous_extract_file_name"] == full_metadata.file_name
+        assert set(
+            [record["opportunity_id"] for record in delta_data["upserted_opportunities"]]
+        ) == {updated_opportunity.opportunity_id, new_opportunity.opportunity_id}
+        assert delta_data["deleted_opportunity_ids"] == sorted(
+            [deleted_opportunity_id, unpublished_opportunity.opportunity_id]
+        )
+
+        errors = OpportunityV1Schema(many=True).validate(delta_data["upserted_opportunities"])
+        assert len(errors) == 0
+
+        # The delta records every opportunity that's current so the next delta can build on it
+        manifest = json.loads(file_util.read_file(get_id_manifest_path(delta_metadata.file_path)))
+        assert set(manifest) == set(
+            [opp.opportunity_id for opp in unchanged_opportunities]
+            + [updated_opportunity.opportunity_id, new_opportunity.opportunity_id]
+        )
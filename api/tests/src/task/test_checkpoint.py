@@ -0,0 +1,46 @@
+import uuid
+
+import pytest
+
+from src.task.checkpoint import PipelineCheckpoints
+
+
+@pytest.fixture
+def pipeline():
+    # A unique pipeline name keeps the checkpoints of each test separate
+    return f"test-pipeline-{uuid.uuid4()}"
+
+
+def test_checkpoints_not_resumed(db_session, pipeline):
+    checkpoints = PipelineCheckpoints(db_session, pipeline)
+    checkpoints.mark_complete(db_session, "StageA", "table_a")
+
+    # Without resuming, nothing is skipped even though it was recorded
+    assert PipelineCheckpoints(db_session, pipeline).is_complete("StageA", "table_a") is False
+
+
+def test_checkpoints_resumed(db_session, pipeline):
+    checkpoints = PipelineCheckpoints(db_session, pipeline)
+    checkpoints.mark_complete(db_session, "StageA", "table_a")
+    checkpoints.mark_complete(db_session, "StageB")
+
+    resumed = PipelineCheckpoints(db_session, pipeline, resume=True)
+    assert resumed.is_complete("StageA", "table_a") is True
+    assert resumed.is_complete("StageA", "table_b") is False
+    assert resumed.is_complete("StageB") is True
+    assert resumed.is_complete("StageC") is False
+
+
+def test_checkpoints_reset_after_pipeline_completes(db_session, pipeline):
+    checkpoints = PipelineCheckpoints(db_session, pipeline)
+    checkpoints.mark_complete(db_session, "StageA", "table_a")
+    checkpoints.mark_pipeline_complete(db_session)
+
+    checkpoints = PipelineCheckpoints(db_session, pipeline, resume=True)
+    assert checkpoints.is_complete("StageA", "table_a") is False
+
+    # Only what completed after the last successful run is skipped
+    checkpoints.mark_complete(db_session, "StageA", "table_b")
+    resumed = PipelineCheckpoints(db_session, pipeline, resume=True)
+    assert resumed.is_complete("StageA", "table_a") is False
+    assert resumed.is_complete("StageA", "table_b") is True
@@ -1,4 +1,7 @@
+import concurrent.futures
+import io
 import os
+import threading
 
 import boto3
 import pytest
@@ -113,6 +116,60 @@ def test_get_file_length_bytes_s3_with_content(mock_s3_bucket):
     assert size == len(test_content)
 
 
+def test_byte_counting_writer(mock_s3_bucket):
+    file_path = f"s3://{mock_s3_bucket}/counted_file.txt"
+
+    # Include some multi-byte characters so the count differs from the string length
+    contents = "hello world - こんにちは\n" * 100
+    with file_util.open_stream(file_path, "wb") as outfile:
+        counter = file_util.ByteCountingWriter(outfile)
+        with io.TextIOWrapper(counter, encoding="utf-8") as text_outfile:
+            text_outfile.write(contents)
+
+    assert counter.bytes_written == len(contents.encode("utf-8"))
+    assert counter.bytes_written == file_util.get_file_length_bytes(file_path)
+    assert file_util.read_file(file_path, encoding="utf-8") == contents
+
+
+@pytest.mark.parametrize(
+    "chunk_sizes",
+    [
+        # Uploaded with a single PutObject
+        [],
+        [100],
+        # Uploaded as a multipart upload, with a smaller final part
+        [file_util.S3_MIN_PART_SIZE_BYTES, file_util.S3_MIN_PART_SIZE_BYTES, 100],
+    ],
+)
+def test_concurrent_file_writer_s3(mock_s3_bucket, chunk_sizes):
+    file_path = f"s3://{mock_s3_bucket}/concurrent_file.bin"
+    chunks = [os.urandom(chunk_size) for chunk_size in chunk_sizes]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        writer = file_util.ConcurrentFileWriter(file_path, executor, threading.Semaphore(2))
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+
+        assert writer.result() == sum(chunk_sizes)
+
+    assert file_util.read_file(file_path, "rb") == b"".join(chunks)
+
+
+def test_concurrent_file_writer_local_disk(tmp_path):
+    file_path = tmp_path / "subdir" / "concurrent_file.bin"
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        writer = file_util.ConcurrentFileWriter(file_path, executor)
+        writer.write(b"hello ")
+        writer.write(b"world")
+        writer.close()
+
+        assert writer.result() == 11
+
+    assert file_util.read_file(file_path, "rb") == b"hello world"
+
+
 def test_file_exists_local_filesystem(tmp_path):
     file_path1 = tmp_path / "test.txt"
     file_path2 = tmp_path / "test2.txt"
@@ -213,6 +270,123 @@ def test_move_file_local_disk(tmp_path):
     assert file_util.read_file(other_file_path) == contents
 
 
+def test_delete_files_s3(mock_s3_bucket, other_mock_s3_bucket, monkeypatch):
+    # Delete fewer keys per request, so the files span several requests
+    monkeypatch.setattr(file_util, "S3_MAX_DELETE_OBJECTS_KEYS", 2)
+
+    file_paths = [f"s3://{mock_s3_bucket}/file_{i}.txt" for i in range(5)] + [
+        f"s3://{other_mock_s3_bucket}/other_file.txt"
+    ]
+    for file_path in file_paths:
+        with file_util.open_stream(file_path, "w") as outfile:
+            outfile.write(f.fake.sentence(5))
+
+    kept_file_path = f"s3://{mock_s3_bucket}/kept_file.txt"
+    with file_util.open_stream(kept_file_path, "w") as outfile:
+        outfile.write(f.fake.sentence(5))
+
+    # Files that don't exist are ignored, the same as delete_file
+    file_util.delete_files(file_paths + [f"s3://{mock_s3_bucket}/does_not_exist.txt"])
+
+    for file_path in file_paths:
+        assert file_util.file_exists(file_path) is False
+    assert file_util.file_exists(kept_file_path) is True
+
+
+def test_copy_and_move_files_s3(mock_s3_bucket, other_mock_s3_bucket):
+    contents = [f.fake.sentence(25) for _ in range(5)]
+    file_paths = [f"s3://{mock_s3_bucket}/file_{i}.txt" for i in range(5)]
+    for file_path, file_contents in zip(file_paths, contents, strict=True):
+        with file_util.open_stream(file_path, "w") as outfile:
+            outfile.write(file_contents)
+
+    copied_file_paths = [f"s3://{other_mock_s3_bucket}/copied_{i}.txt" for i in range(5)]
+    file_util.copy_files(list(zip(file_paths, copied_file_paths, strict=True)), max_workers=2)
+
+    moved_file_paths = [f"s3://{other_mock_s3_bucket}/moved_{i}.txt" for i in range(5)]
+    file_util.move_files(list(zip(file_paths, moved_file_paths, strict=True)), max_workers=2)
+
+    for file_path, copied_file_path, moved_file_path, file_contents in zip(
+        file_paths, copied_file_paths, moved_file_paths, contents, strict=True
+    ):
+        assert file_util.file_exists(file_path) is False
+        assert file_util.read_file(copied_file_path) == file_contents
+        assert file_util.read_file(moved_file_path) == file_contents
+
+
+def test_copy_and_move_files_local_disk(tmp_path):
+    file_paths = [tmp_path / f"file_{i}.txt" for i in range(3)]
+    for file_path in file_paths:
+        with file_util.open_stream(file_path, "w") as outfile:
+            outfile.write("hello")
+
+    copied_file_paths = [tmp_path / "copies" / f"file_{i}.txt" for i in range(3)]
+    file_util.copy_files(list(zip(file_paths, copied_file_paths, strict=True)))
+
+    moved_file_paths = [tmp_path / "moved" / f"file_{i}.txt" for i in range(3)]
+    file_util.move_files(list(zip(file_paths, moved_file_paths, strict=True)))
+
+    file_util.delete_files(copied_file_paths)
+
+    for file_path, copied_file_path, moved_file_path in zip(
+        file_paths, copied_file_paths, moved_file_paths, strict=True
+    ):
+        assert file_util.file_exists(file_path) is False
+        assert file_util.file_exists(copied_file_path) is False
+        assert file_util.read_file(moved_file_path) == "hello"
+
+
+def test_copy_files_mismatched_locations(tmp_path, mock_s3_bucket):
+    with pytest.raises(Exception, match="Cannot download/upload between disk and S3"):
+        file_util.copy_files([(tmp_path / "file.txt", f"s3://{mock_s3_bucket}/file.txt")])
+
+
+def test_pre_sign_file_locations_cache(mock_s3_bucket, monkeypatch):
+    signed_file_paths = []
+    pre_sign_file_location = file_util._pre_sign_file_location
+
+    def record_pre_sign_file_location(file_path, s3_config, s3_client):
+        signed_file_paths.append(file_path)
+        return pre_sign_file_location(file_path, s3_config, s3_client)
+
+    monkeypatch.setattr(file_util, "_pre_sign_file_location", record_pre_sign_file_location)
+
+    file_path1 = f"s3://{mock_s3_bucket}/file1.txt"
+    file_path2 = f"s3://{mock_s3_bucket}/file2.txt"
+    file_path3 = f"s3://{mock_s3_bucket}/file3.txt"
+
+    # By default, URLs last 2 hours and are reused for the first hour
+    now = 1_000 * 3600
+
+    # Each file is only signed once, even if it's in the list more than once
+    urls = file_util.presigned_url_cache.get([file_path1, file_path2, file_path1], now=now)
+    assert signed_file_paths == [file_path1, file_path2]
+    assert urls[0] == urls[2]
+    assert "file1.txt" in urls[0]
+    assert "file2.txt" in urls[1]
+
+    # Later in the same hour, the signed URLs are reused
+    assert file_util.presigned_url_cache.get([file_path2, file_path3], now=now + 3599) == [
+        urls[1],
+        file_util.presigned_url_cache.get([file_path3], now=now)[0],
+    ]
+    assert signed_file_paths == [file_path1, file_path2, file_path3]
+
+    # In the next hour they're signed again
+    file_util.presigned_url_cache.get([file_path1], now=now + 3600)
+    assert signed_file_paths == [file_path1, file_path2, file_path3, file_path1]
+
+
+def test_pre_sign_file_locations_cache_disabled(mock_s3_bucket, monkeypatch):
+    monkeypatch.setenv("PRESIGNED_URL_CACHE_REUSE_FRACTION", "0")
+
+    file_path = f"s3://{mock_s3_bucket}/file.txt"
+    file_util.pre_sign_file_locations([file_path])
+    assert file_util.presigned_url_cache._urls == {}
+
+    assert "file.txt" in file_util.pre_sign_file_location(file_path)
+
+
 @pytest.mark.parametrize(
     "s3_path,cdn_url,expected",
     [